@@ -0,0 +1,5 @@
+"""
+Benchmark scripts for startup time, database access paths and concurrency.
+
+Run from the project root, e.g. ``python -m benchmarks.import_time``.
+"""
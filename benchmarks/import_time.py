@@ -0,0 +1,134 @@
+"""
+Import-time benchmark.
+
+Imports each module in a fresh interpreter with ``python -X importtime``,
+parses the timing lines from stderr and reports the total import cost and the
+heaviest dependencies. Modules with a budget fail the run when they exceed it,
+so startup regressions in the check scripts and tests are caught early.
+"""
+from typing import Dict, List, Optional
+from pathlib import Path
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Budget per module in milliseconds (cumulative import time). None = report only.
+IMPORT_BUDGETS_MS: Dict[str, Optional[float]] = {
+    'src.models.database_models': 600,
+    'src.utils.monitoring': 100,
+    'src.data_processing.data_preparation': 800,
+    'src.data_processing.workflow': None,  # Prefect dominates, reported for reference
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Parse ``-X importtime`` output into records with self/cumulative microseconds and nesting depth.
+    """
+    records = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            records.append({
+                'module': match.group(4),
+                'self_us': int(match.group(1)),
+                'cumulative_us': int(match.group(2)),
+                'depth': (len(match.group(3)) - 1) // 2
+            })
+    return records
+
+
+def measure_import(module: str, runs: int = 3) -> Dict:
+    """
+    Import module in fresh interpreters and return the fastest run's report.
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+        records = parse_importtime(result.stderr)
+        total = max(r['cumulative_us'] for r in records if r['module'] == module)
+        if best is None or total < best['total_us']:
+            best = {'module': module, 'total_us': total, 'records': records}
+    return best
+
+
+def build_report(measurement: Dict, top: int = 10) -> Dict:
+    """
+    Summarize one measurement: total time, the heaviest direct dependencies and self-time imports.
+    """
+    records = measurement['records']
+    # Children are printed before their parent, so the target's subtree is the
+    # run of more deeply nested records directly preceding its own line.
+    # The first record is the real load; later ones only wrap parent packages.
+    end = next(i for i, r in enumerate(records) if r['module'] == measurement['module'])
+    depth = records[end]['depth']
+    start = end
+    while start > 0 and records[start - 1]['depth'] > depth:
+        start -= 1
+    records = records[start:end + 1]
+    top_level = [r for r in records if r['depth'] == depth + 1]
+    return {
+        'module': measurement['module'],
+        'total_ms': measurement['total_us'] / 1000,
+        'heaviest_dependencies': [
+            {'module': r['module'], 'cumulative_ms': r['cumulative_us'] / 1000}
+            for r in sorted(top_level, key=lambda r: r['cumulative_us'], reverse=True)[:top]
+        ],
+        'heaviest_self': [
+            {'module': r['module'], 'self_ms': r['self_us'] / 1000}
+            for r in sorted(records, key=lambda r: r['self_us'], reverse=True)[:top]
+        ]
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure import time of project modules")
+    parser.add_argument('modules', nargs='*', help="Modules to measure (default: all budgeted modules)")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    modules = args.modules or list(IMPORT_BUDGETS_MS)
+    reports = []
+    over_budget = []
+    for module in modules:
+        report = build_report(measure_import(module, args.runs), args.top)
+        budget = IMPORT_BUDGETS_MS.get(module)
+        report['budget_ms'] = budget
+        reports.append(report)
+
+        status = ''
+        if budget is not None:
+            status = 'OK' if report['total_ms'] <= budget else 'OVER BUDGET'
+            if report['total_ms'] > budget:
+                over_budget.append(module)
+        print(f"\n{module}: {report['total_ms']:.1f} ms"
+              + (f" (budget {budget:.0f} ms, {status})" if budget is not None else ''))
+        print("-" * 50)
+        for dep in report['heaviest_dependencies']:
+            print(f"  {dep['cumulative_ms']:8.1f} ms  {dep['module']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    if over_budget:
+        print(f"\nOver budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
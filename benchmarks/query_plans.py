@@ -0,0 +1,156 @@
+"""
+Query plan and latency benchmark for the main access paths.
+
+Runs the balance, statement and per-customer lookups against the configured
+database, records each query's EXPLAIN (ANALYZE, BUFFERS) plan summary and
+its latency over repeated runs, and writes the result as JSON. Run it once
+before and once after a schema change (e.g. new indexes) and compare:
+
+    python -m benchmarks.query_plans --output before.json
+    alembic upgrade head
+    python -m benchmarks.query_plans --output after.json
+    python -m benchmarks.query_plans --compare before.json after.json
+"""
+from datetime import timedelta
+from typing import Dict, List
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+
+from src.models.database_models import get_engine
+
+QUERIES: Dict[str, str] = {
+    'balance': """
+        SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE account_id = :account_id
+    """,
+    'statement': """
+        SELECT transaction_id, amount, currency, timestamp, transaction_type
+        FROM transactions
+        WHERE account_id = :account_id AND timestamp >= :start AND timestamp < :end
+        ORDER BY timestamp
+    """,
+    'customer_accounts': """
+        SELECT id, account_number, type FROM accounts WHERE customer_id = :customer_id
+    """,
+    'customer_recent_transactions': """
+        SELECT t.transaction_id, t.amount, t.timestamp
+        FROM transactions t
+        JOIN accounts a ON a.id = t.account_id
+        WHERE a.customer_id = :customer_id
+        ORDER BY t.timestamp DESC
+        LIMIT 50
+    """,
+    'transaction_lookup': """
+        SELECT * FROM transactions WHERE transaction_id = :transaction_id AND transaction_type = 'debit'
+    """,
+}
+
+
+def pick_parameters(connection) -> Dict:
+    """
+    Use the busiest account (and its customer) so the lookups touch realistic amounts of data.
+    """
+    row = connection.execute(text("""
+        SELECT t.account_id, a.customer_id, MAX(t.timestamp) AS last_timestamp, MIN(t.transaction_id) AS transaction_id
+        FROM transactions t
+        JOIN accounts a ON a.id = t.account_id
+        GROUP BY t.account_id, a.customer_id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """)).mappings().first()
+    if row is None:
+        raise RuntimeError("The transactions table is empty, nothing to benchmark")
+    return {
+        'account_id': row['account_id'],
+        'customer_id': row['customer_id'],
+        'transaction_id': row['transaction_id'],
+        'start': row['last_timestamp'] - timedelta(days=30),
+        'end': row['last_timestamp'] + timedelta(seconds=1),
+    }
+
+
+def _node_types(plan: Dict) -> List[str]:
+    nodes = [plan['Node Type'] + (f" on {plan['Index Name']}" if 'Index Name' in plan else '')]
+    for child in plan.get('Plans', []):
+        nodes.extend(_node_types(child))
+    return nodes
+
+
+def measure_query(connection, sql: str, params: Dict, runs: int) -> Dict:
+    """
+    Return the plan summary and latency statistics of one query.
+    """
+    statement = text(sql)
+    bound = {name: value for name, value in params.items() if f':{name}' in sql}
+    explain = connection.execute(
+        text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql), bound
+    ).scalar()[0]
+    plan = explain['Plan']
+
+    connection.execute(statement, bound).fetchall()  # Warm-up
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        connection.execute(statement, bound).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    return {
+        'nodes': _node_types(plan),
+        'planning_ms': explain.get('Planning Time'),
+        'execution_ms': explain.get('Execution Time'),
+        'shared_hit_blocks': plan.get('Shared Hit Blocks'),
+        'shared_read_blocks': plan.get('Shared Read Blocks'),
+        'median_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }
+
+
+def run(runs: int = 20) -> Dict:
+    with get_engine().connect() as connection:
+        params = pick_parameters(connection)
+        results = {name: measure_query(connection, sql, params, runs) for name, sql in QUERIES.items()}
+    return {'parameters': {key: str(value) for key, value in params.items()}, 'queries': results}
+
+
+def compare(before: Dict, after: Dict) -> None:
+    print(f"{'query':<30} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name, old in before['queries'].items():
+        new = after['queries'].get(name)
+        if new is None:
+            continue
+        speedup = old['median_ms'] / new['median_ms'] if new['median_ms'] else float('inf')
+        print(f"{name:<30} {old['median_ms']:>10.3f} {new['median_ms']:>10.3f} {speedup:>7.1f}x")
+        if old['nodes'] != new['nodes']:
+            print(f"    plan: {' > '.join(old['nodes'])}")
+            print(f"       -> {' > '.join(new['nodes'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record query plans and latencies for the main lookups")
+    parser.add_argument('--runs', type=int, default=20, help="Timed executions per query")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            compare(json.load(before), json.load(after))
+        return
+
+    results = run(args.runs)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    for name, result in results['queries'].items():
+        print(f"{name:<30} median {result['median_ms']:>8.3f} ms  p95 {result['p95_ms']:>8.3f} ms  "
+              f"{' > '.join(result['nodes'])}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
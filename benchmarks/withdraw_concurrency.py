@@ -0,0 +1,119 @@
+"""
+Withdrawal concurrency benchmark.
+
+Runs Account.withdraw from an increasing number of client threads against the
+legacy schema and reports throughput per client count. With --hot every
+client hits the same account, which shows the cost of row-level contention;
+otherwise clients spread over --accounts accounts and throughput should grow
+with the client count up to the pool size. After each run the balances are
+checked for overdrafts and reconciled against SUM(amount).
+
+Needs a database with the legacy schema (src/database/migrations, incl. V4).
+"""
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import random
+import sys
+import threading
+import time
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# The legacy models import their siblings as top-level packages
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+from models.account import Account  # noqa: E402
+from models.bank import Bank  # noqa: E402
+from models.customer import Customer  # noqa: E402
+
+BENCHMARK_BANKNR = '9999'
+BENCHMARK_SSN = '000000-0000'
+
+
+def setup_accounts(count: int, opening_balance: int) -> List[str]:
+    """
+    Create (or reuse) the benchmark accounts and top them up to opening_balance.
+    """
+    bank = Bank().create("Benchmark Bank", BENCHMARK_BANKNR)
+    customer = Customer().create("Benchmark Customer", BENCHMARK_SSN)
+    numbers = []
+    for i in range(count):
+        account = Account().create(customer, bank, "Benchmark", f"{i:06d}")
+        missing = opening_balance - account.reconcile_balance()
+        if missing > 0:
+            account.deposit(missing)
+        numbers.append(account.nr)
+    return numbers
+
+
+def run_clients(account_numbers: List[str], clients: int, duration: float, amount: int) -> Dict:
+    """
+    Withdraw amount from random accounts in clients threads for duration seconds.
+    """
+    succeeded = [0] * clients
+    rejected = [0] * clients
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        accounts = [Account().get(nr) for nr in account_numbers]
+        while time.perf_counter() < deadline:
+            if random.choice(accounts).withdraw(amount):
+                succeeded[index] += 1
+            else:
+                rejected[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'clients': clients,
+        'withdrawals': sum(succeeded),
+        'rejected': sum(rejected),
+        'ops_per_second': (sum(succeeded) + sum(rejected)) / elapsed
+    }
+
+
+def check_invariants(account_numbers: List[str]) -> int:
+    """
+    Return the number of accounts that are overdrawn or whose stored balance drifted.
+    """
+    problems = 0
+    for nr in account_numbers:
+        account = Account().get(nr)
+        stored = account.get_balance()
+        if account.reconcile_balance() != stored or stored + account.credit < 0:
+            problems += 1
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent withdrawals")
+    parser.add_argument('--clients', default='1,2,4,8', help="Comma separated client counts")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per client count")
+    parser.add_argument('--accounts', type=int, default=64)
+    parser.add_argument('--hot', action='store_true', help="All clients use a single account")
+    parser.add_argument('--amount', type=int, default=1)
+    parser.add_argument('--opening-balance', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    account_numbers = setup_accounts(1 if args.hot else args.accounts, args.opening_balance)
+    results = []
+    for clients in (int(c) for c in args.clients.split(',')):
+        result = run_clients(account_numbers, clients, args.duration, args.amount)
+        results.append(result)
+        baseline = results[0]['ops_per_second']
+        print(f"{clients:>3} clients: {result['ops_per_second']:8.0f} ops/s "
+              f"({result['ops_per_second'] / baseline:4.1f}x), "
+              f"{result['withdrawals']} withdrawn, {result['rejected']} rejected")
+
+    problems = check_invariants(account_numbers)
+    print(f"Invariant check: {'OK' if problems == 0 else f'{problems} accounts overdrawn or drifted'}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
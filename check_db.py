@@ -1,20 +1,30 @@
+import argparse
+
+from sqlalchemy import select
+
 from src.models.database_models import session_scope, Customer, Account, Transaction
+from src.models.streaming import count_rows
 
-def check_database():
+def check_database(exact: bool = False):
     with session_scope() as session:
-        customer_count = session.query(Customer).count()
-        account_count = session.query(Account).count()
-        transaction_count = session.query(Transaction).count()
+        # Uppskattat antal från pg_class om inte --exact anges (COUNT(*) tar minuter på stora tabeller)
+        customer_count = count_rows(session, Customer, exact=exact)
+        account_count = count_rows(session, Account, exact=exact)
+        transaction_count = count_rows(session, Transaction, exact=exact)
+        prefix = "" if exact else "ca. "
         
-        print(f"Antal kunder i databasen: {customer_count}")
-        print(f"Antal konton i databasen: {account_count}")
-        print(f"Antal transaktioner i databasen: {transaction_count}")
+        print(f"Antal kunder i databasen: {prefix}{customer_count}")
+        print(f"Antal konton i databasen: {prefix}{account_count}")
+        print(f"Antal transaktioner i databasen: {prefix}{transaction_count}")
         
         if customer_count > 0:
             # Kolla några exempel på kunder
             print("\nExempel på kunder:")
-            for customer in session.query(Customer).limit(3):
+            for customer in session.scalars(select(Customer).limit(3)):
                 print(f"- {customer.name}: {customer.phone}")
 
 if __name__ == "__main__":
-    check_database() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Visa antal rader i databasen")
+    parser.add_argument('--exact', action='store_true', help="Räkna exakt med COUNT(*) istället för statistik")
+    args = parser.parse_args()
+    check_database(exact=args.exact)
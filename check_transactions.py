@@ -1,16 +1,32 @@
+import argparse
+
+from sqlalchemy import select
+
 from src.models.database_models import Transaction, session_scope
+from src.models.streaming import count_rows, stream_query
 
-def check_transactions():
+def check_transactions(exact: bool = False, list_all: bool = False):
     with session_scope() as session:
-        transactions = session.query(Transaction).all()
-        print(f'Antal transaktioner: {len(transactions)}')
+        # Antalet hämtas från statistiken, inga transaktionsobjekt laddas
+        count = count_rows(session, Transaction, exact=exact)
+        print(f'Antal transaktioner: {"" if exact else "ca. "}{count}')
         
-        if transactions:
+        if count > 0:
             print('\nExempel på transaktioner:')
-            for t in transactions[:5]:
+            query = select(Transaction).order_by(Transaction.id)
+            if list_all:
+                # Server-side cursor: bara en batch i minnet åt gången
+                transactions = stream_query(session, query)
+            else:
+                transactions = session.scalars(query.limit(5))
+            for t in transactions:
                 print(f'- {t.transaction_id}: {t.amount} {t.currency} ({t.transaction_type})')
         else:
             print('\nInga transaktioner hittades.')
 
 if __name__ == '__main__':
-    check_transactions() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Visa transaktioner i databasen")
+    parser.add_argument('--exact', action='store_true', help="Räkna exakt med COUNT(*) istället för statistik")
+    parser.add_argument('--all', dest='list_all', action='store_true', help="Lista alla transaktioner (strömmas)")
+    args = parser.parse_args()
+    check_transactions(exact=args.exact, list_all=args.list_all)
@@ -0,0 +1,42 @@
+"""add account balances
+
+Revision ID: 3b7e91c4d2a5
+Revises: fd400d2b9aae
+Create Date: 2026-10-19 10:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e91c4d2a5'
+down_revision: Union[str, None] = 'fd400d2b9aae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('account_balances',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.PrimaryKeyConstraint('account_id')
+    )
+
+    # Backfill from the existing transaction history
+    op.execute("""
+        INSERT INTO account_balances (account_id, balance, updated_at)
+        SELECT account_id, SUM(amount), now()
+        FROM transactions
+        GROUP BY account_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('account_balances')
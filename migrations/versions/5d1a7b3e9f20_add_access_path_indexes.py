@@ -0,0 +1,41 @@
+"""add access path indexes
+
+Revision ID: 5d1a7b3e9f20
+Revises: 8c2f4e6a1b93
+Create Date: 2026-10-19 13:41:06.207318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1a7b3e9f20'
+down_revision: Union[str, None] = '8c2f4e6a1b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The (transaction_id, transaction_type) unique constraint already exists
+    # (fd400d2b9aae); its index also serves lookups by transaction_id alone.
+    # CONCURRENTLY keeps the tables writable while the indexes build, but it
+    # cannot run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transactions_account_id_timestamp', 'transactions',
+                        ['account_id', 'timestamp'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_accounts_customer_id', 'accounts', ['customer_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_accounts_customer_id', table_name='accounts',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_account_id_timestamp', table_name='transactions',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,36 @@
+"""add export checkpoints
+
+Revision ID: 9a6e5d0c3f17
+Revises: 7f3b2c8e1a64
+Create Date: 2026-10-19 18:12:30.584127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6e5d0c3f17'
+down_revision: Union[str, None] = '7f3b2c8e1a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('export_checkpoints',
+    sa.Column('input_fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('batch_start', sa.Integer(), nullable=False),
+    sa.Column('batch_end', sa.Integer(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('input_fingerprint', 'table_name', 'batch_start', 'batch_end')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('export_checkpoints')
@@ -0,0 +1,103 @@
+"""partition transactions by month
+
+Revision ID: b4e8d2f71c06
+Revises: 5d1a7b3e9f20
+Create Date: 2026-10-19 15:02:48.913551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8d2f71c06'
+down_revision: Union[str, None] = '5d1a7b3e9f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("id, transaction_id, account_id, amount, currency, timestamp, sender_country, "
+           "sender_municipality, receiver_country, receiver_municipality, transaction_type, notes")
+
+# Months covered up front: from the oldest existing row through three months ahead
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    partition_month date;
+BEGIN
+    FOR partition_month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE((SELECT min(timestamp) FROM transactions_unpartitioned), now())),
+            date_trunc('month', GREATEST((SELECT max(timestamp) FROM transactions_unpartitioned),
+                                         now() + interval '3 months')),
+            interval '1 month')::date
+    LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                       'transactions_y' || to_char(partition_month, 'YYYY') || 'm' || to_char(partition_month, 'MM'),
+                       partition_month, (partition_month + interval '1 month')::date);
+    END LOOP;
+END $$;
+"""
+
+
+def _transaction_columns():
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('transactions_id_seq'::regclass)"), nullable=False),
+        sa.Column('transaction_id', sa.String(length=36), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('sender_country', sa.String(length=50), nullable=True),
+        sa.Column('sender_municipality', sa.String(length=50), nullable=True),
+        sa.Column('receiver_country', sa.String(length=50), nullable=True),
+        sa.Column('receiver_municipality', sa.String(length=50), nullable=True),
+        sa.Column('transaction_type', sa.String(length=20), nullable=False),
+        sa.Column('notes', sa.String(length=200), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Move the current table aside; its index-backed constraint names must be freed
+    op.rename_table('transactions', 'transactions_unpartitioned')
+    op.execute("ALTER INDEX transactions_pkey RENAME TO transactions_unpartitioned_pkey")
+    op.execute("ALTER INDEX transactions_transaction_id_type_key RENAME TO transactions_unpartitioned_id_type_key")
+    op.execute("ALTER INDEX ix_transactions_account_id_timestamp RENAME TO ix_transactions_unpartitioned_account_id_timestamp")
+
+    # The partition key has to be part of the primary key and of every unique constraint
+    op.create_table('transactions',
+    *_transaction_columns(),
+    sa.PrimaryKeyConstraint('id', 'timestamp'),
+    sa.UniqueConstraint('transaction_id', 'transaction_type', 'timestamp', name='transactions_transaction_id_type_key'),
+    postgresql_partition_by='RANGE (timestamp)'
+    )
+    op.create_index('ix_transactions_account_id_timestamp', 'transactions', ['account_id', 'timestamp'], unique=False)
+    # Keep the id sequence alive when the old table is dropped
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_unpartitioned")
+    op.drop_table('transactions_unpartitioned')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('transactions', 'transactions_partitioned')
+    op.execute("ALTER INDEX transactions_pkey RENAME TO transactions_partitioned_pkey")
+    op.execute("ALTER INDEX transactions_transaction_id_type_key RENAME TO transactions_partitioned_id_type_key")
+    op.execute("ALTER INDEX ix_transactions_account_id_timestamp RENAME TO ix_transactions_partitioned_account_id_timestamp")
+
+    op.create_table('transactions',
+    *_transaction_columns(),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_id', 'transaction_type', name='transactions_transaction_id_type_key')
+    )
+    op.create_index('ix_transactions_account_id_timestamp', 'transactions', ['account_id', 'timestamp'], unique=False)
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+
+    # Detached (archived) partitions are not part of the parent any more and are not copied back
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_partitioned")
+    op.execute("DROP TABLE transactions_partitioned CASCADE")
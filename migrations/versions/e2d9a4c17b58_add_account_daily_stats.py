@@ -0,0 +1,66 @@
+"""add account daily stats
+
+Revision ID: e2d9a4c17b58
+Revises: b4e8d2f71c06
+Create Date: 2026-10-19 16:21:05.338112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2d9a4c17b58'
+down_revision: Union[str, None] = 'b4e8d2f71c06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('account_daily_stats',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('stat_date', sa.Date(), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('outgoing_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('outgoing_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('min_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('max_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('international_count', sa.Integer(), nullable=False),
+    sa.Column('international_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.PrimaryKeyConstraint('account_id', 'stat_date')
+    )
+
+    # Backfill from the existing transaction history
+    op.execute("""
+        INSERT INTO account_daily_stats (account_id, stat_date, transaction_count, outgoing_count,
+                                         total_amount, outgoing_amount, min_amount, max_amount,
+                                         international_count, international_amount, updated_at)
+        SELECT account_id, timestamp::date,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE amount < 0),
+               SUM(amount),
+               COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0),
+               MIN(amount),
+               MAX(amount),
+               COUNT(*) FILTER (WHERE international),
+               COALESCE(SUM(abs(amount)) FILTER (WHERE international), 0),
+               now()
+        FROM (
+            SELECT account_id, timestamp, amount,
+                   COALESCE(sender_country, 'Sweden') <> 'Sweden'
+                   OR COALESCE(receiver_country, 'Sweden') <> 'Sweden' AS international
+            FROM transactions
+        ) t
+        GROUP BY account_id, timestamp::date
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('account_daily_stats')
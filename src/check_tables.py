@@ -1,52 +1,172 @@
-from models.database_models import session_scope, engine
-from sqlalchemy import inspect, text
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
 
-def check_database_tables():
-    """Kontrollerar vilka tabeller som finns i databasen och deras struktur"""
-    inspector = inspect(engine)
-    
-    # Lista alla tabeller
-    tables = inspector.get_table_names()
+from src.models.database_models import get_engine
+from src.models.streaming import count_rows
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Alla tabeller på en gång: storlek, uppskattat antal rader och vacuum-statistik.
+# En partitionerad tabell saknar egna rader, så dess värden summeras över partitionerna,
+# som själva inte listas
+TABLES_QUERY = text("""
+    SELECT c.relname AS table_name,
+           sum(GREATEST(l.reltuples, 0))::bigint AS estimated_rows,
+           sum(pg_table_size(l.oid)) AS table_bytes,
+           sum(pg_indexes_size(l.oid)) AS index_bytes,
+           sum(pg_total_relation_size(l.oid)) AS total_bytes,
+           sum(s.n_live_tup) AS live_tuples,
+           sum(s.n_dead_tup) AS dead_tuples,
+           max(GREATEST(s.last_vacuum, s.last_autovacuum)) AS last_vacuum,
+           max(GREATEST(s.last_analyze, s.last_autoanalyze)) AS last_analyze
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL pg_partition_tree(c.oid) t
+    JOIN pg_class l ON l.oid = t.relid
+    LEFT JOIN pg_stat_user_tables s ON s.relid = l.oid
+    WHERE n.nspname = :schema AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+      AND (t.isleaf OR t.relid = c.oid)
+    GROUP BY c.oid, c.relname
+    ORDER BY c.relname
+""")
+
+COLUMNS_QUERY = text("""
+    SELECT table_name, column_name, data_type, character_maximum_length, is_nullable
+    FROM information_schema.columns
+    WHERE table_schema = :schema
+    ORDER BY table_name, ordinal_position
+""")
+
+CONSTRAINTS_QUERY = text("""
+    SELECT cl.relname AS table_name, con.conname AS name, con.contype AS type,
+           pg_get_constraintdef(con.oid) AS definition, ref.relname AS referred_table
+    FROM pg_constraint con
+    JOIN pg_class cl ON cl.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = cl.relnamespace
+    LEFT JOIN pg_class ref ON ref.oid = con.confrelid
+    WHERE n.nspname = :schema
+    ORDER BY cl.relname, con.contype, con.conname
+""")
+
+INDEXES_QUERY = text("""
+    SELECT s.relname AS table_name, s.indexrelname AS name,
+           pg_relation_size(s.indexrelid) AS bytes, s.idx_scan AS scans,
+           pg_get_indexdef(s.indexrelid) AS definition
+    FROM pg_stat_user_indexes s
+    WHERE s.schemaname = :schema
+    ORDER BY s.relname, s.indexrelname
+""")
+
+CONSTRAINT_TYPES = {'p': 'primary key', 'f': 'foreign key', 'u': 'unique', 'c': 'check', 'x': 'exclusion'}
+
+
+def collect_catalog(connection, schema='public'):
+    """Samlar rapporten för alla tabeller med fyra katalogfrågor, oavsett antal tabeller"""
+    params = {'schema': schema}
+    tables = {
+        row['table_name']: dict(row, columns=[], constraints=[], indexes=[])
+        for row in connection.execute(TABLES_QUERY, params).mappings()
+    }
+    for row in connection.execute(COLUMNS_QUERY, params).mappings():
+        if row['table_name'] in tables:
+            tables[row['table_name']]['columns'].append(dict(row))
+    for row in connection.execute(CONSTRAINTS_QUERY, params).mappings():
+        if row['table_name'] in tables:
+            constraint = dict(row, type=CONSTRAINT_TYPES.get(row['type'], row['type']))
+            tables[row['table_name']]['constraints'].append(constraint)
+    for row in connection.execute(INDEXES_QUERY, params).mappings():
+        if row['table_name'] in tables:
+            tables[row['table_name']]['indexes'].append(dict(row))
+    return tables
+
+
+def exact_counts(engine, tables, workers=4):
+    """Räknar COUNT(*) för tabellerna parallellt, en anslutning per tråd"""
+    def count(table):
+        with Session(engine) as session:
+            return table, count_rows(session, table, exact=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tables)))) as executor:
+        return dict(executor.map(count, tables))
+
+
+def format_bytes(size):
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def print_report(tables, samples=None):
     print("\nTabeller i databasen:")
     print("=" * 50)
-    
+    for name, table in tables.items():
+        print(f"\nTabell: {name}")
+        print("-" * 30)
+
+        if 'exact_rows' in table:
+            print(f"Antal rader: {table['exact_rows']}")
+        else:
+            print(f"Antal rader: ca. {max(table['estimated_rows'], 0)}")
+        print(f"Storlek: {format_bytes(table['total_bytes'])} "
+              f"(data {format_bytes(table['table_bytes'])}, index {format_bytes(table['index_bytes'])})")
+        if table['dead_tuples']:
+            print(f"Döda rader: {table['dead_tuples']} (senaste vacuum: {table['last_vacuum'] or 'aldrig'})")
+
+        if samples and samples.get(name):
+            print("\nExempel på data:")
+            for row in samples[name]:
+                print(row)
+
+        print("\nKolumner:")
+        for col in table['columns']:
+            length = f"({col['character_maximum_length']})" if col['character_maximum_length'] else ""
+            nullable = "" if col['is_nullable'] == 'YES' else " NOT NULL"
+            print(f"  - {col['column_name']}: {col['data_type']}{length}{nullable}")
+
+        if table['constraints']:
+            print("\nConstraints:")
+            for const in table['constraints']:
+                print(f"  - {const['name']} ({const['type']}): {const['definition']}")
+
+        if table['indexes']:
+            print("\nIndex:")
+            for index in table['indexes']:
+                print(f"  - {index['name']}: {format_bytes(index['bytes'])}, {index['scans']} scans")
+
+
+def check_database_tables(exact=False, workers=4, samples=False, as_json=False, schema='public'):
+    """Kontrollerar vilka tabeller som finns i databasen och deras struktur"""
+    engine = get_engine()
     with engine.connect() as connection:
-        for table in tables:
-            print(f"\nTabell: {table}")
-            print("-" * 30)
-            
-            # Visa antal rader
-            result = connection.execute(text(f"SELECT COUNT(*) FROM {table}"))
-            count = result.scalar()
-            print(f"Antal rader: {count}")
-            
-            if count > 0:
-                # Visa exempel på data
-                result = connection.execute(text(f"SELECT * FROM {table} LIMIT 3"))
-                rows = result.fetchall()
-                print("\nExempel på data:")
-                for row in rows:
-                    print(row)
-            
-            # Visa kolumner för varje tabell
-            columns = inspector.get_columns(table)
-            print("\nKolumner:")
-            for col in columns:
-                print(f"  - {col['name']}: {col['type']}")
-                
-            # Visa foreign keys
-            fks = inspector.get_foreign_keys(table)
-            if fks:
-                print("\nForeign Keys:")
-                for fk in fks:
-                    print(f"  - {fk['constrained_columns']} -> {fk['referred_table']}.{fk['referred_columns']}")
-            
-            # Visa constraints
-            constraints = inspector.get_check_constraints(table)
-            if constraints:
-                print("\nCheck Constraints:")
-                for const in constraints:
-                    print(f"  - {const['name']}: {const['sqltext']}")
+        tables = collect_catalog(connection, schema)
+        sample_rows = {}
+        if samples:
+            for name in tables:
+                quoted = engine.dialect.identifier_preparer.quote(name)
+                sample_rows[name] = connection.execute(text(f"SELECT * FROM {quoted} LIMIT 3")).fetchall()
+
+    if exact:
+        # Exakt antal är dyrt på stora tabeller, så räkningarna körs parallellt
+        for name, count in exact_counts(engine, list(tables), workers).items():
+            tables[name]['exact_rows'] = count
+
+    if as_json:
+        print(json.dumps(tables, indent=2, default=str))
+    else:
+        print_report(tables, sample_rows)
+    return tables
+
 
 if __name__ == "__main__":
-    check_database_tables() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Visa tabeller och deras struktur")
+    parser.add_argument('--exact', action='store_true', help="Räkna exakt med COUNT(*) istället för statistik")
+    parser.add_argument('--workers', type=int, default=4, help="Antal parallella räkningar med --exact")
+    parser.add_argument('--samples', action='store_true', help="Visa tre exempelrader per tabell")
+    parser.add_argument('--json', dest='as_json', action='store_true', help="Skriv rapporten som JSON")
+    parser.add_argument('--schema', default='public')
+    args = parser.parse_args()
+    check_database_tables(exact=args.exact, workers=args.workers, samples=args.samples,
+                          as_json=args.as_json, schema=args.schema)
@@ -0,0 +1,199 @@
+"""
+Asynchronous, pipelined variant of the database export in workflow.py.
+
+Customers and accounts are upserted batch by batch with set-based statements.
+Transactions are streamed through a two-stage pipeline: chunk k+1 is validated
+and prepared in a worker thread while chunk k is written. At most
+max_in_flight prepared chunks wait for a writer, which bounds memory and
+applies backpressure to the validation stage when the database falls behind.
+"""
+import asyncio
+from decimal import Decimal
+from typing import Dict, List, Tuple
+import logging
+
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.data_processing.transaction_validator import TransactionValidator
+from src.data_processing.data_preparation import (
+    prepare_customer_data, prepare_account_data, prepare_transaction_data, build_transaction_entries
+)
+from src.models.balances import balance_deltas, balance_upsert_statement
+from src.models.daily_stats import daily_stats_rows, daily_stats_upsert_statement
+from src.models.async_database import async_session_scope, configure_async_engine, dispose_async_engine
+from src.models.database_models import Customer, Account, Transaction
+from src.models.partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # End-of-stream marker for the writer queue
+
+
+def _records(frame: pd.DataFrame) -> List[Dict]:
+    """Rows as dicts with NaN replaced by None, which asyncpg binds as NULL."""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+async def upsert_customers_async(valid_customers: pd.DataFrame, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Insert or update customers batch by batch and return personnummer -> customer id.
+    """
+    db_ready_customers = prepare_customer_data(valid_customers)
+    customer_id_map = {}
+    for start_idx in range(0, len(db_ready_customers), batch_size):
+        records = _records(db_ready_customers.iloc[start_idx:start_idx + batch_size])
+        stmt = pg_insert(Customer).values(records)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Customer.personnummer],
+            set_={column: stmt.excluded[column] for column in records[0] if column != 'personnummer'}
+        ).returning(Customer.id, Customer.personnummer)
+        async with async_session_scope() as session:
+            result = await session.execute(stmt)
+            customer_id_map.update({personnummer: id_ for id_, personnummer in result})
+        logger.info(f"Upserted customer rows {start_idx} to {start_idx + len(records)}")
+    return customer_id_map
+
+
+async def upsert_accounts_async(valid_customers: pd.DataFrame, customer_id_map: Dict[str, int],
+                                batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Insert or update accounts batch by batch and return account_number -> account id.
+    """
+    # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement
+    db_ready_accounts = prepare_account_data(valid_customers).drop_duplicates(subset=['account_number'], keep='last')
+    db_ready_accounts['customer_id'] = db_ready_accounts['personnummer'].map(customer_id_map)
+    db_ready_accounts = db_ready_accounts.dropna(subset=['customer_id']).drop(columns=['personnummer'])
+    db_ready_accounts['customer_id'] = db_ready_accounts['customer_id'].astype(int)
+
+    account_number_map = {}
+    for start_idx in range(0, len(db_ready_accounts), batch_size):
+        records = _records(db_ready_accounts.iloc[start_idx:start_idx + batch_size])
+        stmt = pg_insert(Account).values(records)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Account.account_number],
+            set_={
+                'customer_id': stmt.excluded.customer_id,
+                'bank_id': stmt.excluded.bank_id,
+                'type': stmt.excluded.type
+            }
+        ).returning(Account.id, Account.account_number)
+        async with async_session_scope() as session:
+            result = await session.execute(stmt)
+            account_number_map.update({number: id_ for id_, number in result})
+        logger.info(f"Upserted account rows {start_idx} to {start_idx + len(records)}")
+    return account_number_map
+
+
+def validate_and_prepare_chunk(chunk: pd.DataFrame, account_number_map: Dict[str, int]) -> Tuple[List[Dict], int]:
+    """
+    Validate one chunk of raw transactions and build its double-entry rows.
+
+    CPU-bound; runs in a worker thread. Returns the entries and the number of
+    invalid transactions that were dropped.
+    """
+    validator = TransactionValidator()
+    valid_mask = [not validator.validate_transaction(row) for row in chunk.to_dict('records')]
+    valid_chunk = chunk[valid_mask]
+    if valid_chunk.empty:
+        return [], len(chunk)
+    entries = build_transaction_entries(prepare_transaction_data(valid_chunk), account_number_map)
+    for entry in entries:
+        # asyncpg binds NUMERIC columns from Decimal
+        entry['amount'] = Decimal(str(entry['amount']))
+    return entries, len(chunk) - len(valid_chunk)
+
+
+async def export_transactions_async(transactions_df: pd.DataFrame, account_number_map: Dict[str, int],
+                                    batch_size: int = 1000, max_in_flight: int = 2,
+                                    writers: int = 1) -> Dict:
+    """
+    Validate, prepare and write transactions with validation overlapping the writes.
+
+    max_in_flight is the number of prepared chunks allowed to wait for a writer;
+    writers is the number of chunks written concurrently (one connection each).
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_in_flight)
+    stats = {'chunks': 0, 'entries_written': 0, 'invalid_transactions': 0}
+
+    async def produce():
+        for start_idx in range(0, len(transactions_df), batch_size):
+            chunk = transactions_df.iloc[start_idx:start_idx + batch_size]
+            entries, invalid = await asyncio.to_thread(validate_and_prepare_chunk, chunk, account_number_map)
+            stats['invalid_transactions'] += invalid
+            await queue.put((start_idx, entries))  # Waits while max_in_flight chunks are queued
+        for _ in range(writers):
+            await queue.put(_DONE)
+
+    async def write():
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            start_idx, entries = item
+            if entries:
+                timestamps = [entry['timestamp'] for entry in entries]
+                async with async_session_scope() as session:
+                    await session.run_sync(
+                        lambda sync_session: ensure_partitions(sync_session.connection(),
+                                                               min(timestamps), max(timestamps))
+                    )
+                    await session.execute(insert(Transaction), entries)
+                    # Balance deltas and the daily rollup commit together with the chunk
+                    await session.execute(balance_upsert_statement(balance_deltas(entries)))
+                    await session.execute(daily_stats_upsert_statement(daily_stats_rows(entries)))
+            stats['chunks'] += 1
+            stats['entries_written'] += len(entries)
+            logger.info(f"Wrote transaction chunk starting at row {start_idx} ({len(entries)} entries)")
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(write()) for _ in range(writers)]
+    try:
+        await asyncio.gather(*tasks)
+    except Exception:
+        # A failed stage would leave the other one blocked on the queue
+        for task in tasks:
+            task.cancel()
+        raise
+    return stats
+
+
+async def export_to_database_async(transactions_df: pd.DataFrame, valid_customers: pd.DataFrame,
+                                   batch_size: int = 1000, max_in_flight: int = 2,
+                                   writers: int = 1) -> Dict:
+    """
+    Async counterpart of workflow.export_to_database.
+
+    Takes raw transactions (they are validated inside the pipeline) and already
+    validated customers. Returns a small report of what was written.
+    """
+    customer_id_map = await upsert_customers_async(valid_customers, batch_size)
+    account_number_map = await upsert_accounts_async(valid_customers, customer_id_map, batch_size)
+    transaction_stats = await export_transactions_async(
+        transactions_df, account_number_map, batch_size, max_in_flight, writers
+    )
+    return {
+        'customers_upserted': len(customer_id_map),
+        'accounts_upserted': len(account_number_map),
+        **transaction_stats
+    }
+
+
+def run_async_export(transactions_df: pd.DataFrame, valid_customers: pd.DataFrame,
+                     batch_size: int = 1000, max_in_flight: int = 2, writers: int = 1) -> Dict:
+    """
+    Run export_to_database_async from synchronous code in its own event loop.
+
+    The async engine's connection pool is sized for the number of writers;
+    the shared synchronous engine is not touched.
+    """
+    async def main():
+        await configure_async_engine(workers=writers)
+        try:
+            return await export_to_database_async(
+                transactions_df, valid_customers, batch_size, max_in_flight, writers
+            )
+        finally:
+            await dispose_async_engine()
+
+    return asyncio.run(main())
@@ -0,0 +1,209 @@
+"""
+Per-account closing balance snapshots.
+
+build_snapshots() computes daily or monthly closing balances from the
+transaction ledger in one streamed, vectorized pass (group by account and
+period, then a cumulative sum per account) and upserts them into
+balance_snapshots. balance_as_of() then answers point-in-time queries from
+the nearest snapshot plus the transactions after it, instead of scanning the
+account's history.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Optional
+import argparse
+import logging
+
+import pandas as pd
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.database_models import BalanceSnapshot, Transaction, session_scope
+from src.models.streaming import stream_frames
+
+logger = logging.getLogger(__name__)
+
+FREQUENCIES = ('daily', 'monthly')
+SNAPSHOT_BATCH_SIZE = 5000
+
+
+def period_start(day: date, freq: str) -> date:
+    """First day of the period containing day."""
+    return day.replace(day=1) if freq == 'monthly' else day
+
+
+def period_sums(ledger: pd.DataFrame, freq: str = 'daily') -> pd.Series:
+    """
+    Sum ledger amounts in whole öre per account_id and snapshot_date (last day of the period).
+
+    Sums of separate ledger chunks can be added up with
+    pd.concat(...).groupby(level=[0, 1]).sum() before closing_balances().
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"freq must be one of {FREQUENCIES}, got {freq!r}")
+    timestamps = pd.to_datetime(ledger['timestamp'])
+    if freq == 'monthly':
+        snapshot_dates = timestamps.dt.to_period('M').dt.end_time.dt.normalize()
+    else:
+        snapshot_dates = timestamps.dt.normalize()
+    # Sum in whole öre so that the cumulative sum stays exact
+    cents = pd.to_numeric(ledger['amount']).mul(100).round().astype('int64')
+    return (
+        pd.DataFrame({'account_id': ledger['account_id'].to_numpy(),
+                      'snapshot_date': snapshot_dates.to_numpy(),
+                      'cents': cents.to_numpy()})
+        .groupby(['account_id', 'snapshot_date'], sort=True)['cents'].sum()
+    )
+
+
+def closing_balances(sums: pd.Series, opening: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Turn per-period sums from period_sums() into cumulative closing balances.
+
+    opening is an optional Series of balances indexed by account_id that the
+    period sums are added to.
+    """
+    if sums.empty:
+        return pd.DataFrame(columns=['account_id', 'snapshot_date', 'balance'])
+    closing = sums.sort_index().groupby(level='account_id').cumsum().reset_index()
+
+    if opening is not None and not opening.empty:
+        opening_cents = pd.to_numeric(opening).mul(100).round().astype('int64')
+        closing['cents'] += closing['account_id'].map(opening_cents).fillna(0).astype('int64')
+
+    closing['snapshot_date'] = closing['snapshot_date'].dt.date
+    closing['balance'] = closing.pop('cents') / 100
+    return closing
+
+
+def compute_snapshots(ledger: pd.DataFrame, freq: str = 'daily',
+                      opening: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Compute closing balances per account and period from ledger entries.
+
+    ledger needs the columns account_id, timestamp and amount. Returns
+    account_id, snapshot_date (last day of the period) and balance, with one
+    row per account and period that has transactions.
+    """
+    if ledger.empty:
+        return closing_balances(pd.Series(dtype='int64'), opening)
+    return closing_balances(period_sums(ledger, freq), opening)
+
+
+def _opening_balances(session, before: date) -> pd.Series:
+    """Latest snapshot balance per account dated before the given day."""
+    rows = session.execute(text("""
+        SELECT DISTINCT ON (account_id) account_id, balance
+        FROM balance_snapshots
+        WHERE snapshot_date < :before
+        ORDER BY account_id, snapshot_date DESC
+    """), {'before': before}).all()
+    return pd.Series({account_id: balance for account_id, balance in rows}, dtype=object)
+
+
+def build_snapshots(session, freq: str = 'monthly', since: Optional[date] = None,
+                    until: Optional[date] = None, batch_size: int = SNAPSHOT_BATCH_SIZE) -> int:
+    """
+    Compute and store closing balances for all closed periods before until.
+
+    until defaults to today, so the current (still open) period is never
+    snapshotted. With since, the sums continue from the existing snapshots
+    before the start of since's period and only transactions after the
+    latest of them are read. Periods between that snapshot and since that
+    were never built are therefore built as well instead of being left out
+    of the balances. Without since, or without earlier snapshots, the whole
+    ledger is processed.
+
+    Returns the number of snapshot rows written.
+    """
+    until = until or date.today()
+    # Only periods that have ended before until are complete
+    cutoff = period_start(until, freq)
+
+    query = select(Transaction.account_id, Transaction.timestamp, Transaction.amount).where(
+        Transaction.timestamp < datetime.combine(cutoff, time.min)
+    )
+    opening = None
+    if since is not None:
+        start = period_start(since, freq)
+        last_snapshot = session.execute(
+            select(func.max(BalanceSnapshot.snapshot_date)).where(BalanceSnapshot.snapshot_date < start)
+        ).scalar()
+        if last_snapshot is None:
+            logger.warning(f"No snapshots before {start}, processing the whole ledger")
+        else:
+            # The opening balances cover everything up to last_snapshot, not up to start
+            ledger_from = last_snapshot + timedelta(days=1)
+            if ledger_from < start:
+                logger.warning(f"No snapshots between {ledger_from} and {start}, building them as well")
+            query = query.where(Transaction.timestamp >= datetime.combine(ledger_from, time.min))
+            opening = _opening_balances(session, start)
+
+    # The ledger is streamed; only the per-account period sums are kept in memory
+    chunk_sums, ledger_rows = [], 0
+    for chunk in stream_frames(session, query):
+        chunk_sums.append(period_sums(chunk, freq))
+        ledger_rows += len(chunk)
+    sums = pd.concat(chunk_sums).groupby(level=[0, 1]).sum() if chunk_sums else pd.Series(dtype='int64')
+    snapshots = closing_balances(sums, opening)
+    logger.info(f"Computed {len(snapshots)} {freq} snapshots from {ledger_rows} transactions")
+
+    for start_idx in range(0, len(snapshots), batch_size):
+        batch = snapshots.iloc[start_idx:start_idx + batch_size]
+        stmt = pg_insert(BalanceSnapshot).values([
+            {'account_id': int(account_id), 'snapshot_date': snapshot_date,
+             'balance': Decimal(str(balance))}
+            for account_id, snapshot_date, balance in batch.itertuples(index=False)
+        ])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[BalanceSnapshot.account_id, BalanceSnapshot.snapshot_date],
+            set_={'balance': stmt.excluded.balance}
+        ))
+    return len(snapshots)
+
+
+def balance_as_of(session, account_id: int, as_of: datetime) -> Decimal:
+    """
+    Return the balance of an account including all transactions up to as_of.
+
+    Reads the latest snapshot that closes before as_of and adds only the
+    transactions after it.
+    """
+    # A snapshot covers everything before midnight after its snapshot_date
+    snapshot = session.execute(
+        select(BalanceSnapshot.snapshot_date, BalanceSnapshot.balance)
+        .where(BalanceSnapshot.account_id == account_id,
+               BalanceSnapshot.snapshot_date <= (as_of - timedelta(days=1)).date())
+        .order_by(BalanceSnapshot.snapshot_date.desc())
+        .limit(1)
+    ).first()
+
+    query = select(func.coalesce(func.sum(Transaction.amount), 0)).where(
+        Transaction.account_id == account_id,
+        Transaction.timestamp <= as_of
+    )
+    opening = Decimal('0')
+    if snapshot is not None:
+        opening = snapshot.balance
+        query = query.where(
+            Transaction.timestamp >= datetime.combine(snapshot.snapshot_date + timedelta(days=1), time.min)
+        )
+    return opening + session.execute(query).scalar_one()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-account balance snapshots")
+    parser.add_argument('--freq', choices=FREQUENCIES, default='monthly')
+    parser.add_argument('--since', type=date.fromisoformat,
+                        help="Recompute from this period on, continuing from earlier snapshots")
+    parser.add_argument('--until', type=date.fromisoformat, help="Defaults to today")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with session_scope() as session:
+        written = build_snapshots(session, freq=args.freq, since=args.since, until=args.until)
+    print(f"Wrote {written} snapshots")
+
+
+if __name__ == "__main__":
+    main()
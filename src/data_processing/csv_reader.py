@@ -0,0 +1,84 @@
+"""
+Typed CSV reading for the pipeline's input files.
+
+Every source has an explicit schema instead of letting pandas infer object
+columns: low-cardinality fields (currency, country, municipality,
+transaction_type) are categories, identifiers and account numbers are
+Arrow-backed strings and timestamps are parsed as datetimes. Files are
+parsed with the pyarrow engine, which is multi-threaded.
+"""
+from typing import Dict
+import logging
+
+import pandas as pd
+
+from src.data_processing.parse_cache import parse_cache
+
+logger = logging.getLogger(__name__)
+
+ARROW_STRING = 'string[pyarrow]'
+
+SCHEMAS = {
+    'transactions': {
+        'dtype': {
+            'transaction_id': ARROW_STRING,
+            'amount': 'float64',
+            'currency': 'category',
+            'sender_account': ARROW_STRING,
+            'receiver_account': ARROW_STRING,
+            'sender_country': 'category',
+            'sender_municipality': 'category',
+            'receiver_country': 'category',
+            'receiver_municipality': 'category',
+            'transaction_type': 'category',
+            'notes': ARROW_STRING,
+        },
+        'parse_dates': ['timestamp'],
+    },
+    'customers': {
+        'dtype': {
+            'Customer': ARROW_STRING,
+            'Address': ARROW_STRING,
+            'Phone': ARROW_STRING,
+            'Personnummer': ARROW_STRING,
+            'BankAccount': ARROW_STRING,
+        },
+        'parse_dates': [],
+    },
+}
+
+TIMESTAMP_COLUMN = 'timestamp'
+
+
+def csv_options(source: str) -> Dict:
+    """pd.read_csv keyword arguments for a source in SCHEMAS."""
+    if source not in SCHEMAS:
+        raise ValueError(f"Unknown source {source!r}, expected one of {sorted(SCHEMAS)}")
+    schema = SCHEMAS[source]
+    options = {'engine': 'pyarrow', 'dtype': dict(schema['dtype'])}
+    if schema['parse_dates']:
+        options['parse_dates'] = list(schema['parse_dates'])
+    return options
+
+
+def apply_schema(frame: pd.DataFrame, source: str) -> pd.DataFrame:
+    """
+    Cast the columns of a frame read from another format (e.g. Parquet) to the source's schema.
+    """
+    dtype = SCHEMAS[source]['dtype']
+    changed = {column: wanted for column, wanted in dtype.items()
+               if column in frame and str(frame[column].dtype) != str(wanted)}
+    return frame.astype(changed) if changed else frame
+
+
+def read_typed_csv(path, source: str, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Read a transactions or customers CSV file with its schema.
+
+    With use_cache the parsed frame is served from parse_cache when the
+    file's content has not changed.
+    """
+    options = csv_options(source)
+    if use_cache:
+        return parse_cache.read_csv(path, **options)
+    return pd.read_csv(path, **options)
@@ -5,7 +5,8 @@ from typing import Dict, List, Set, Tuple
 
 class CustomerDataAnalyzer:
     def __init__(self, file_path: str):
-        self.df = pd.read_csv(file_path)
+        from src.data_processing.csv_reader import read_typed_csv
+        self.df = read_typed_csv(file_path, 'customers')
         self.total_rows = len(self.df)
         self.unique_customers = len(self.df['Personnummer'].unique())
         
@@ -0,0 +1,214 @@
+"""
+Preparation of validated data frames for database import.
+
+Kept separate from workflow.py so that callers that only need the column
+mapping and formatting helpers do not have to import Prefect.
+"""
+import pandas as pd
+from typing import Dict, List
+
+def format_phone_number(phone: str) -> str:
+    """
+    Format phone numbers to international format: +XX(Y)ZZZZ...
+    where:
+    - XX is country code (1-3 digits)
+    - Y is area code (1-4 digits)
+    - Z is the rest of the number
+    
+    Handles:
+    1. Local Swedish numbers (0X-XXX XX XX -> +46(X)XXX XX XX)
+    2. International numbers (keeps them as is, just reformats if needed)
+    3. Numbers with or without spaces/dashes
+    """
+    if not phone or pd.isna(phone):
+        return None
+        
+    # Remove all non-digit characters except + if it exists at the start
+    has_plus = phone.startswith('+')
+    digits = ''.join(filter(str.isdigit, phone))
+    
+    # Handle Swedish local format (starting with 0)
+    if digits.startswith('0'):
+        # For Swedish numbers, we know the exact format:
+        # 0XX-XXX XX XX or 0XXX-XXX XX XX
+        if len(digits) < 9:  # Too short for a Swedish number
+            return None
+            
+        # Remove leading 0 and split into area code and main number
+        digits = digits[1:]  # Remove leading 0
+        if len(digits) == 10:  # 3-digit area code
+            area_code = digits[:3]
+            main_number = digits[3:]
+        else:  # 2-digit area code
+            area_code = digits[:2]
+            main_number = digits[2:]
+            
+        return f"+46({area_code}){main_number}"
+    
+    # Handle international format
+    elif has_plus:
+        # First 1-3 digits are country code
+        if len(digits) < 4:  # Need at least: 1 digit country code, 1 digit area code, 1 digit number
+            return None
+            
+        # Try to determine country code length (usually 1-3 digits)
+        if digits.startswith('1'):  # North America
+            country_code = digits[:1]
+            rest = digits[1:]
+        elif digits.startswith('7'):  # Russia
+            country_code = digits[:1]
+            rest = digits[1:]
+        elif digits[:3] in ['380', '381']:  # Some 3-digit country codes
+            country_code = digits[:3]
+            rest = digits[3:]
+        else:  # Most European/Asian countries (2 digits)
+            country_code = digits[:2]
+            rest = digits[2:]
+            
+        # For international numbers, take first 2-3 digits as area code
+        area_code = rest[:3]
+        main_number = rest[3:]
+        
+        return f"+{country_code}({area_code}){main_number}"
+    
+    # If number doesn't start with + or 0, it's invalid
+    return None
+
+def prepare_customer_data(customers_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepare customer data for database import by mapping CSV columns to database columns
+    and extracting address components.
+    """
+    # Create a copy to avoid modifying the original data
+    db_ready_df = customers_df.copy()
+    
+    # Drop duplicates based on personnummer to get unique customers
+    db_ready_df = db_ready_df.drop_duplicates(subset=['Personnummer'])
+    
+    # Extract address components using regex
+    address_pattern = r'(.*?),\s*(\d{5})\s*(.*)'
+    address_components = db_ready_df['Address'].str.extract(address_pattern)
+    db_ready_df['address'] = address_components[0]
+    db_ready_df['postal_code'] = address_components[1]
+    db_ready_df['city'] = address_components[2]
+    
+    # Map columns to match database schema
+    db_ready_df = db_ready_df.rename(columns={
+        'Customer': 'name',  # Changed back to 'Customer' to match the actual CSV column name
+        'Phone': 'phone',
+        'Personnummer': 'personnummer'
+    })
+    
+    # Format phone numbers
+    db_ready_df['phone'] = db_ready_df['phone'].apply(format_phone_number)
+    
+    # Add guardian_info as NULL for adults
+    db_ready_df['guardian_info'] = None
+    
+    # Add bank_id
+    db_ready_df['bank_id'] = 1
+    
+    # Select only the columns we need in the exact order they appear in the database
+    # Order from database: id, bank_id, personnummer, name, phone, address, city, postal_code, guardian_info
+    # Note: id is auto-generated, so we exclude it
+    return db_ready_df[['bank_id', 'personnummer', 'name', 'phone', 'address', 'city', 'postal_code', 'guardian_info']]
+
+def prepare_account_data(customers_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepare account data for database import.
+    """
+    # Create a copy to avoid modifying the original data
+    db_ready_df = customers_df.copy()
+    
+    # Use existing account numbers from BankAccount column
+    db_ready_df['account_number'] = db_ready_df['BankAccount']
+    
+    # Add other required fields
+    db_ready_df['type'] = 'checking'  # Default account type
+    db_ready_df['created_at'] = pd.Timestamp.now()
+    db_ready_df['bank_id'] = 1  # Add bank_id
+    
+    # Keep personnummer for mapping to customer_id later
+    db_ready_df['personnummer'] = customers_df['Personnummer']
+    
+    # Select only the columns we need in the exact order they appear in the database
+    # plus personnummer for mapping
+    return db_ready_df[['account_number', 'type', 'created_at', 'bank_id', 'personnummer']]
+
+def prepare_transaction_data(transactions_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepare transaction data for database import
+    """
+    # Create a copy to avoid modifying the original data
+    db_ready_df = transactions_df.copy()
+    
+    # Map columns to match database schema
+    db_ready_df = db_ready_df.rename(columns={
+        'TransactionID': 'transaction_id',
+        'Amount': 'amount',
+        'Currency': 'currency',
+        'Timestamp': 'timestamp',
+        'SenderCountry': 'sender_country',
+        'SenderMunicipality': 'sender_municipality',
+        'ReceiverCountry': 'receiver_country',
+        'ReceiverMunicipality': 'receiver_municipality',
+        'TransactionType': 'transaction_type'
+    })
+    
+    # Convert old transaction types to new debit/credit system
+    type_mapping = {
+        'incoming': 'debit',   # Money coming in (positive amount)
+        'outgoing': 'credit'   # Money going out (negative amount)
+    }
+    db_ready_df['transaction_type'] = db_ready_df['transaction_type'].map(type_mapping)
+    
+    # Ensure correct data types
+    db_ready_df['transaction_id'] = db_ready_df['transaction_id'].astype(str)
+    db_ready_df['sender_account'] = db_ready_df['sender_account'].astype(str)
+    db_ready_df['receiver_account'] = db_ready_df['receiver_account'].astype(str)
+    db_ready_df['amount'] = pd.to_numeric(db_ready_df['amount'], errors='coerce')
+    db_ready_df['currency'] = db_ready_df['currency'].astype(str)
+    db_ready_df['timestamp'] = pd.to_datetime(db_ready_df['timestamp'])
+    db_ready_df['sender_country'] = db_ready_df['sender_country'].astype(str)
+    db_ready_df['sender_municipality'] = db_ready_df['sender_municipality'].astype(str)
+    db_ready_df['receiver_country'] = db_ready_df['receiver_country'].astype(str)
+    db_ready_df['receiver_municipality'] = db_ready_df['receiver_municipality'].astype(str)
+    db_ready_df['transaction_type'] = db_ready_df['transaction_type'].astype(str)
+    
+    # Handle missing values
+    db_ready_df['notes'] = db_ready_df['notes'].fillna('') if 'notes' in db_ready_df else ''
+    
+    return db_ready_df
+
+def build_transaction_entries(transactions_df: pd.DataFrame, account_number_map: Dict[str, int]) -> List[Dict]:
+    """
+    Turn prepared transactions into double-entry rows for the transactions table.
+
+    Every transfer becomes a credit entry (negative amount) on the sender's account
+    followed by a debit entry (positive amount) on the receiver's account, both with
+    the same transaction_id. Transfers whose accounts are not in account_number_map
+    are skipped.
+    """
+    sender_ids = transactions_df['sender_account'].map(account_number_map)
+    receiver_ids = transactions_df['receiver_account'].map(account_number_map)
+    known = sender_ids.notna() & receiver_ids.notna()
+    if not known.any():
+        return []
+    
+    columns = ['transaction_id', 'currency', 'timestamp', 'sender_country', 'sender_municipality',
+               'receiver_country', 'receiver_municipality', 'notes']
+    transfers = transactions_df.loc[known, columns]
+    credit_entries = transfers.assign(
+        account_id=sender_ids[known].astype(int),
+        amount=-transactions_df.loc[known, 'amount'],  # Negative for credit (money leaving)
+        transaction_type='credit'
+    )
+    debit_entries = transfers.assign(
+        account_id=receiver_ids[known].astype(int),
+        amount=transactions_df.loc[known, 'amount'],  # Positive for debit (money entering)
+        transaction_type='debit'
+    )
+    
+    # Stable sort keeps each transfer's credit entry directly before its debit entry
+    entries = pd.concat([credit_entries, debit_entries]).sort_index(kind='stable')
+    return entries.to_dict('records')
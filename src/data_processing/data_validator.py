@@ -7,7 +7,8 @@ class DataValidator:
     def __init__(self, data: str | pd.DataFrame):
         """Initialize validator with data file path or DataFrame"""
         if isinstance(data, str):
-            self.df = pd.read_csv(data)
+            from src.data_processing.csv_reader import read_typed_csv
+            self.df = read_typed_csv(data, 'customers')
         else:
             self.df = data
         self.validation_results = {
@@ -0,0 +1,128 @@
+"""
+High-water marks for incremental CSV ingestion.
+
+The source files only grow: new rows are appended at the end. For every
+source ingestion_state records the byte offset up to which the file has been
+loaded, a fingerprint of the file's beginning and of the bytes just before
+that offset, and (for transaction files) the latest timestamp loaded.
+read_delta() then parses only the bytes after the offset. If the file was
+rewritten instead of appended to, the fingerprint no longer matches and the
+whole file is read again, keeping only rows newer than the recorded
+max_timestamp.
+"""
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+import hashlib
+import logging
+import os
+
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.database_models import IngestionState
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_HEAD_BYTES = 64 * 1024
+FINGERPRINT_TAIL_BYTES = 4 * 1024
+
+
+class SourceDelta(NamedTuple):
+    """The new rows of a source and the state to record once they are loaded."""
+    source: str
+    frame: pd.DataFrame
+    byte_offset: int
+    fingerprint: str
+    row_count: int
+    max_timestamp: Optional[datetime]
+
+
+def file_fingerprint(path, offset: int) -> str:
+    """
+    SHA-256 of the first bytes of the file and of the bytes just before offset.
+
+    Appending to the file leaves the fingerprint at an earlier offset
+    unchanged; rewriting or truncating it does not.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(offset, FINGERPRINT_HEAD_BYTES)))
+        tail_start = max(0, offset - FINGERPRINT_TAIL_BYTES)
+        f.seek(tail_start)
+        digest.update(f.read(offset - tail_start))
+    return digest.hexdigest()
+
+
+def source_key(path) -> str:
+    return str(Path(path).resolve())
+
+
+def get_state(session, path) -> Optional[IngestionState]:
+    return session.execute(
+        select(IngestionState).where(IngestionState.source == source_key(path))
+    ).scalar_one_or_none()
+
+
+def read_delta(path, state: Optional[IngestionState] = None,
+               timestamp_column: Optional[str] = None, read_options: Optional[Dict] = None) -> SourceDelta:
+    """
+    Parse the rows appended to a CSV file since the recorded state.
+
+    Without a state the whole file is read. A trailing line without a
+    newline may still be being written and is left for the next run.
+    read_options are passed on to pd.read_csv.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start, prior_rows, since = f.tell(), 0, None
+        if state is not None:
+            if state.byte_offset <= size and file_fingerprint(path, state.byte_offset) == state.fingerprint:
+                start, prior_rows = state.byte_offset, state.row_count
+            else:
+                logger.warning(f"{path} was rewritten since the last run, re-reading rows "
+                               f"after {state.max_timestamp}")
+                since = state.max_timestamp
+        f.seek(start)
+        data = f.read(size - start)
+
+    # Only complete lines are consumed
+    data = data[:data.rfind(b'\n') + 1]
+    end = start + len(data)
+    frame = pd.read_csv(BytesIO(header + data), **(read_options or {}))
+    rows_read = len(frame)
+
+    max_timestamp = state.max_timestamp if state is not None else None
+    if timestamp_column and timestamp_column in frame:
+        timestamps = pd.to_datetime(frame[timestamp_column])
+        if since is not None:
+            frame = frame[timestamps > since]
+            timestamps = timestamps[timestamps > since]
+        if not timestamps.empty:
+            latest = timestamps.max().to_pydatetime()
+            max_timestamp = latest if max_timestamp is None else max(max_timestamp, latest)
+
+    logger.info(f"{path}: {len(frame)} new rows from byte {start} to {end}")
+    return SourceDelta(source_key(path), frame, end, file_fingerprint(path, end),
+                       prior_rows + rows_read, max_timestamp)
+
+
+def save_state(session, delta: SourceDelta) -> None:
+    """Record the high-water mark of a loaded delta."""
+    stmt = pg_insert(IngestionState).values(
+        source=delta.source, fingerprint=delta.fingerprint, byte_offset=delta.byte_offset,
+        row_count=delta.row_count, max_timestamp=delta.max_timestamp
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[IngestionState.source],
+        set_={
+            'fingerprint': stmt.excluded.fingerprint,
+            'byte_offset': stmt.excluded.byte_offset,
+            'row_count': stmt.excluded.row_count,
+            'max_timestamp': stmt.excluded.max_timestamp,
+            'updated_at': func.now()
+        }
+    ))
@@ -0,0 +1,175 @@
+"""
+Content-addressed cache of parsed input files.
+
+read_csv() returns the parsed frame of a CSV file from a Feather file on
+local disk when the same content was parsed with the same options before.
+The cache key is derived from the file's SHA-256, its size and the parser
+options, so a file changed in place gets a new key and an unchanged file
+keeps its entry however long ago it was parsed. The content hash itself is
+remembered per path together with size and mtime, so unchanged files are
+not re-hashed either.
+
+Entries are evicted least recently used first once the cache grows beyond
+max_bytes.
+"""
+from pathlib import Path
+from typing import Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "data/cache/parsed"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(target: Path, write) -> None:
+    # Readers never see a partly written file
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=target.name, suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_name)
+        os.replace(tmp_name, target)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+class ParseCache:
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or os.getenv('PARSE_CACHE_DIR', DEFAULT_CACHE_DIR))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('PARSE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _frames_dir(self) -> Path:
+        path = self.cache_dir / 'frames'
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _hashes_dir(self) -> Path:
+        path = self.cache_dir / 'hashes'
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def content_hash(self, path) -> str:
+        """
+        SHA-256 of the file, re-computed only when its size or mtime changed.
+        """
+        stat = os.stat(path)
+        resolved = str(Path(path).resolve())
+        memo = self._hashes_dir() / f"{hashlib.sha1(resolved.encode()).hexdigest()}.json"
+        try:
+            known = json.loads(memo.read_text())
+            if known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                return known['sha256']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        sha256 = file_sha256(path)
+        record = json.dumps({'path': resolved, 'size': stat.st_size,
+                             'mtime_ns': stat.st_mtime_ns, 'sha256': sha256})
+        _atomic_write(memo, lambda tmp_name: Path(tmp_name).write_text(record))
+        return sha256
+
+    def cache_key(self, path, options: Dict) -> str:
+        key = json.dumps({
+            'sha256': self.content_hash(path),
+            'size': os.path.getsize(path),
+            'options': options,
+        }, sort_keys=True, default=repr)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def read_csv(self, path, **options) -> pd.DataFrame:
+        """
+        pd.read_csv(path, **options), served from the cache when possible.
+        """
+        entry = self._frames_dir() / f"{self.cache_key(path, options)}.feather"
+        try:
+            frame = pd.read_feather(entry)
+        except (OSError, ValueError):
+            frame = None
+        if frame is not None:
+            os.utime(entry)  # Mark as recently used
+            frame = self._restore_dtypes(frame, options.get('dtype'))
+            self.stats['hits'] += 1
+            logger.info(f"Parse cache hit for {path}")
+            return frame
+
+        self.stats['misses'] += 1
+        frame = pd.read_csv(path, **options)
+        self.put(entry, frame)
+        return frame
+
+    @staticmethod
+    def _restore_dtypes(frame: pd.DataFrame, dtype) -> pd.DataFrame:
+        # Feather reads Arrow-backed strings back as string[python]
+        if not isinstance(dtype, dict):
+            return frame
+        changed = {column: wanted for column, wanted in dtype.items()
+                   if column in frame and str(frame[column].dtype) != str(wanted)}
+        return frame.astype(changed) if changed else frame
+
+    def put(self, entry: Path, frame: pd.DataFrame) -> None:
+        if not isinstance(frame.index, pd.RangeIndex) or frame.index.start != 0 or frame.index.step != 1:
+            logger.info(f"Not caching {entry.name}: Feather needs a default index")
+            return
+        try:
+            _atomic_write(entry, lambda tmp_name: frame.to_feather(tmp_name))
+        except Exception as e:
+            # Columns pyarrow cannot serialize (e.g. mixed object types) are simply not cached
+            logger.warning(f"Could not cache parsed frame: {e}")
+            return
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            entries = []
+            for entry in self._frames_dir().glob('*.feather'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    entry.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self.stats['evictions'] += removed
+            return removed
+
+    def clear(self) -> None:
+        for entry in self._frames_dir().glob('*.feather'):
+            entry.unlink(missing_ok=True)
+
+
+# Create global cache instance
+parse_cache = ParseCache()
@@ -0,0 +1,40 @@
+"""
+Simple test to verify that snapshots hold the cumulative closing balance per period.
+"""
+from datetime import date
+
+import pandas as pd
+
+from src.data_processing.balance_snapshots import compute_snapshots
+
+
+LEDGER = pd.DataFrame({
+    'account_id': [1, 1, 2, 1, 2, 1],
+    'timestamp': pd.to_datetime(['2024-01-03 10:00', '2024-01-03 18:30', '2024-01-15 09:00',
+                                 '2024-01-31 23:59', '2024-02-01 00:00', '2024-03-10 12:00']),
+    'amount': [100.10, -20.05, 50.00, 0.20, -10.00, 5.00],
+})
+
+
+def test_daily_snapshots():
+    snapshots = compute_snapshots(LEDGER, freq='daily')
+    account_1 = snapshots[snapshots['account_id'] == 1]
+    assert list(account_1['snapshot_date']) == [date(2024, 1, 3), date(2024, 1, 31), date(2024, 3, 10)]
+    assert list(account_1['balance']) == [80.05, 80.25, 85.25]
+
+
+def test_monthly_snapshots_with_opening_balance():
+    snapshots = compute_snapshots(LEDGER, freq='monthly', opening=pd.Series({2: 1000.0}))
+    balances = {(row.account_id, row.snapshot_date): row.balance for row in snapshots.itertuples()}
+    assert balances == {
+        (1, date(2024, 1, 31)): 80.25,
+        (1, date(2024, 3, 31)): 85.25,
+        (2, date(2024, 1, 31)): 1050.0,
+        (2, date(2024, 2, 29)): 1040.0,
+    }
+    print("Balance snapshot tests passed")
+
+
+if __name__ == "__main__":
+    test_daily_snapshots()
+    test_monthly_snapshots_with_opening_balance()
@@ -0,0 +1,54 @@
+"""
+Simple test to verify that read_delta only returns rows appended since the last run.
+"""
+from types import SimpleNamespace
+import tempfile
+from pathlib import Path
+
+from src.data_processing.ingestion_state import read_delta
+
+
+HEADER = "transaction_id,amount,Timestamp\n"
+
+
+def _state(delta):
+    return SimpleNamespace(byte_offset=delta.byte_offset, fingerprint=delta.fingerprint,
+                           row_count=delta.row_count, max_timestamp=delta.max_timestamp)
+
+
+def test_appended_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'transactions.csv'
+        # The last line is still being written and must be left for the next run
+        path.write_text(HEADER + "a,1,2024-01-01 10:00\nb,2,2024-01-02 10:00\nc,3,2024-01-0")
+        first = read_delta(path, timestamp_column='Timestamp')
+        assert list(first.frame['transaction_id']) == ['a', 'b']
+
+        with open(path, 'a') as f:
+            f.write("3 10:00\nd,4,2024-01-04 10:00\n")
+        second = read_delta(path, _state(first), timestamp_column='Timestamp')
+        assert list(second.frame['transaction_id']) == ['c', 'd']
+        assert second.row_count == 4
+        assert str(second.max_timestamp) == '2024-01-04 10:00:00'
+
+        third = read_delta(path, _state(second), timestamp_column='Timestamp')
+        assert third.frame.empty
+        assert list(third.frame.columns) == ['transaction_id', 'amount', 'Timestamp']
+
+
+def test_rewritten_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'transactions.csv'
+        path.write_text(HEADER + "a,1,2024-01-01 10:00\nb,2,2024-01-02 10:00\n")
+        first = read_delta(path, timestamp_column='Timestamp')
+
+        # A rewritten file is read again, keeping only rows newer than the high-water mark
+        path.write_text(HEADER + "x,9,2024-01-01 09:00\nb,2,2024-01-02 10:00\ne,5,2024-01-05 10:00\n")
+        second = read_delta(path, _state(first), timestamp_column='Timestamp')
+        assert list(second.frame['transaction_id']) == ['e']
+
+
+if __name__ == "__main__":
+    test_appended_rows()
+    test_rewritten_file()
+    print("All tests passed!")
@@ -0,0 +1,81 @@
+"""
+Simple test to verify that staged partitions are replaced, appended to and read back.
+"""
+from datetime import date
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from src.data_processing.staging import read_stage, write_stage
+
+
+def _transactions(ids, timestamps):
+    return pd.DataFrame({
+        'transaction_id': ids,
+        'amount': [float(i) for i in range(len(ids))],
+        'timestamp': timestamps,
+    })
+
+
+def _ids(frame):
+    return sorted(frame['transaction_id'])
+
+
+def test_replace_and_append():
+    with tempfile.TemporaryDirectory() as tmp:
+        first = _transactions(['a', 'b'], pd.to_datetime(['2024-01-01 10:00', '2024-01-02 10:00']))
+        write_stage(first, 'validated', 'transactions', root=tmp)
+
+        # An incremental delta adds to the day's partition
+        delta = _transactions(['c'], pd.to_datetime(['2024-01-02 12:00']))
+        write_stage(delta, 'validated', 'transactions', root=tmp, append=True)
+        assert _ids(read_stage('validated', 'transactions', root=tmp)) == ['a', 'b', 'c']
+
+        # A full reload replaces the partitions it covers and keeps the others
+        reload = _transactions(['d'], pd.to_datetime(['2024-01-02 09:00']))
+        write_stage(reload, 'validated', 'transactions', root=tmp)
+        assert _ids(read_stage('validated', 'transactions', root=tmp)) == ['a', 'd']
+
+
+def test_malformed_timestamps():
+    with tempfile.TemporaryDirectory() as tmp:
+        frame = _transactions(['a', 'b', 'c'], ['2024-01-01 10:00', 'not a date', None])
+        write_stage(frame, 'loaded', 'transactions', root=tmp)
+        assert (Path(tmp) / 'loaded' / 'transactions' / 'date=__HIVE_DEFAULT_PARTITION__').is_dir()
+
+        staged = read_stage('loaded', 'transactions', root=tmp).set_index('transaction_id')
+        assert list(staged.index.sort_values()) == ['a', 'b', 'c']
+        assert staged.loc['b', 'raw_timestamp'] == 'not a date'
+        assert pd.isna(staged.loc['b', 'timestamp'])
+        assert pd.isna(staged.loc['c', 'raw_timestamp'])
+
+        # Later files without raw_timestamp are read together with this one
+        write_stage(_transactions(['d'], pd.to_datetime(['2024-01-03'])), 'loaded', 'transactions',
+                    root=tmp, append=True)
+        assert _ids(read_stage('loaded', 'transactions', root=tmp)) == ['a', 'b', 'c', 'd']
+
+
+def test_columns_and_filters():
+    with tempfile.TemporaryDirectory() as tmp:
+        frame = _transactions(['a', 'b', 'c'],
+                              pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01']))
+        write_stage(frame, 'validated', 'transactions', root=tmp)
+        customers = pd.DataFrame({'Customer': ['x'], 'BankAccount': ['SE1']})
+        write_stage(customers, 'validated', 'customers', run_date=date(2024, 1, 5), root=tmp)
+
+        staged = read_stage('validated', 'transactions', columns=['transaction_id', 'amount'],
+                            filters=[('date', '>=', '2024-02-01')], root=tmp)
+        assert list(staged.columns) == ['transaction_id', 'amount']
+        assert _ids(staged) == ['b', 'c']
+        assert str(staged['transaction_id'].dtype) == 'string'
+
+        staged = read_stage('validated', 'customers', root=tmp)
+        assert list(staged['date'].astype(str)) == ['2024-01-05']
+
+
+if __name__ == "__main__":
+    test_replace_and_append()
+    test_malformed_timestamps()
+    test_columns_and_filters()
+    print("All tests passed!")
@@ -0,0 +1,97 @@
+"""
+Simple test to verify that transaction types are remapped in chunks without losing unknown values.
+"""
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from src.data_processing.staging import read_stage, stage_path, write_stage
+from src.data_processing.update_transaction_types import update_many, update_transaction_types
+
+
+CSV = (
+    "transaction_id,amount,transaction_type\n"
+    "a1,100.50,incoming\n"
+    "a2,50,outgoing\n"
+    "a3,75,debit\n"
+    "a4,20,refund\n"
+)
+
+
+def test_streaming_update():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'transactions.csv'
+        path.write_text(CSV)
+        report = update_transaction_types(str(path), chunk_size=2)
+
+        assert report['rows'] == 4
+        assert report['mapped'] == {'incoming': 1, 'outgoing': 1}
+        assert report['already_migrated'] == {'debit': 1}
+        assert report['unmapped'] == {'refund': 1}
+        # Other values are written back exactly as they were read
+        assert path.read_text() == CSV.replace('incoming', 'debit').replace('outgoing', 'credit')
+        assert list(Path(tmp).iterdir()) == [path]
+
+
+def test_keeps_file_mode():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'transactions.csv'
+        path.write_text(CSV)
+        path.chmod(0o644)
+        update_transaction_types(str(path))
+        assert path.stat().st_mode & 0o777 == 0o644
+
+
+def test_strict_keeps_original():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'transactions.csv'
+        path.write_text(CSV)
+        try:
+            update_transaction_types(str(path), strict=True)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        assert path.read_text() == CSV
+
+
+def test_partitions_keep_their_paths():
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = []
+        for day in ('2024-01-01', '2024-01-02'):
+            path = Path(tmp) / 'staged' / f'date={day}' / 'part-0.csv'
+            path.parent.mkdir(parents=True)
+            path.write_text(CSV)
+            inputs.append(str(path))
+        output_dir = Path(tmp) / 'migrated'
+        update_many(inputs, str(output_dir), workers=2)
+
+        outputs = sorted(p.relative_to(output_dir).as_posix() for p in output_dir.rglob('*.csv'))
+        assert outputs == ['date=2024-01-01/part-0.csv', 'date=2024-01-02/part-0.csv']
+
+
+def test_staged_parquet_partition():
+    with tempfile.TemporaryDirectory() as tmp:
+        frame = pd.DataFrame({
+            'transaction_id': ['a1', 'a2', 'a3'],
+            'amount': [100.5, -50.0, 75.0],
+            'transaction_type': pd.Categorical(['incoming', 'outgoing', 'incoming']),
+            'timestamp': pd.to_datetime(['2024-01-01 10:00', '2024-01-02 10:00', '2024-01-02 11:00']),
+        })
+        write_stage(frame, 'loaded', 'transactions', root=tmp)
+        partition = stage_path('loaded', 'transactions', tmp) / 'date=2024-01-02'
+        reports = update_many([str(p) for p in partition.glob('*.parquet')], workers=1)
+        assert reports[0]['mapped'] == {'incoming': 1, 'outgoing': 1}
+
+        # The migrated partition still reads together with the untouched one
+        staged = read_stage('loaded', 'transactions', root=tmp).set_index('transaction_id')
+        assert list(staged.loc[['a1', 'a2', 'a3'], 'transaction_type']) == ['incoming', 'credit', 'debit']
+
+
+if __name__ == "__main__":
+    test_streaming_update()
+    test_keeps_file_mode()
+    test_strict_keeps_original()
+    test_partitions_keep_their_paths()
+    test_staged_parquet_partition()
+    print("All tests passed!")
@@ -0,0 +1,34 @@
+"""
+Simple test to verify that customers with blank fields are validated instead of aborting the flow.
+"""
+import tempfile
+from pathlib import Path
+
+from src.data_processing.csv_reader import read_typed_csv
+from src.data_processing.workflow import validate_customers
+
+
+CSV = (
+    "Customer,Address,Phone,Personnummer,BankAccount\n"
+    'Sofie Ibrahim,"Ängsvägen 03, 14010 Gävle",061-608 60 88,400118-5901,SE8902EPWK73250364544965\n'
+    'Mona Lundgren,"Kyrkvägen 084, 49722 Göteborg",,391117-9285,SE8902OGIV86383792142837\n'
+    "Per Holm,,070-123 45 67,391117-9285,SE8902QZEZ52320024971424\n"
+)
+
+
+def test_blank_fields():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'customers.csv'
+        path.write_text(CSV, encoding='utf-8')
+        customers = read_typed_csv(path, 'customers', use_cache=False)
+        assert customers['Phone'].isna().sum() == 1
+        assert customers['Address'].isna().sum() == 1
+
+        valid, invalid = validate_customers.fn(customers)
+        assert len(valid) + len(invalid) == 3
+        assert list(valid.index.union(invalid.index)) == [0, 1, 2]
+
+
+if __name__ == "__main__":
+    test_blank_fields()
+    print("All tests passed!")
@@ -6,6 +6,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 class TransactionValidator:
@@ -88,7 +90,8 @@ class TransactionValidator:
         sender = transaction.get('sender_account', '')
         receiver = transaction.get('receiver_account', '')
         
-        if not sender or not receiver:
+        # Missing values in typed frames are pd.NA, which has no truth value
+        if pd.isna(sender) or pd.isna(receiver) or not sender or not receiver:
             errors.append("Both sender and receiver accounts are required")
             return errors
             
@@ -1,47 +1,211 @@
 """
 Script to update transaction types in the transactions CSV file from incoming/outgoing to debit/credit.
+
+Files are rewritten in bounded chunks (CSV) or record batches (Parquet), so
+memory use does not grow with the file size. Output goes to a temporary file
+next to the target that replaces it only when the whole file has been
+written. Types that are already debit/credit are kept, and unknown types are
+kept unchanged and counted instead of becoming NaN. Many files (e.g. staged
+Parquet partitions) can be migrated in parallel with update_many().
 """
-import pandas as pd
-import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+
+import pandas as pd
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def update_transaction_types(input_file: str, output_file: str) -> None:
+# Map old types to new types
+TYPE_MAPPING = {
+    'incoming': 'debit',   # Money coming in (positive amount)
+    'outgoing': 'credit'   # Money going out (negative amount)
+}
+NEW_TYPES = set(TYPE_MAPPING.values())
+TYPE_COLUMN = 'transaction_type'
+CHUNK_SIZE = 100_000
+MISSING = '<missing>'
+
+
+def remap_types(types: pd.Series) -> Tuple[pd.Series, Dict[str, Counter]]:
     """
-    Update transaction types in the CSV file.
+    Map old transaction types to new ones.
+
+    Returns the new values and per-value counts of mapped, already migrated
+    and unmapped types. Unmapped values are returned unchanged.
     """
-    logger.info(f"Reading transactions from {input_file}")
-    df = pd.read_csv(input_file)
-    
-    # Print column names
-    logger.info(f"Columns in CSV: {df.columns.tolist()}")
-    
-    # Map old types to new types
-    type_mapping = {
-        'incoming': 'debit',   # Money coming in (positive amount)
-        'outgoing': 'credit'   # Money going out (negative amount)
+    types = types.astype(object)
+    mapped = types.map(TYPE_MAPPING)
+    already = types.isin(NEW_TYPES)
+    unmapped = mapped.isna() & ~already
+    counts = {
+        'mapped': Counter(types[mapped.notna()].value_counts().to_dict()),
+        'already_migrated': Counter(types[already].value_counts().to_dict()),
+        'unmapped': Counter(types[unmapped].fillna(MISSING).replace('', MISSING).value_counts().to_dict()),
     }
-    
-    # Convert types
-    old_types = df['transaction_type'].unique()  # Using correct column name
-    logger.info(f"Found transaction types: {old_types}")
-    
-    df['transaction_type'] = df['transaction_type'].map(type_mapping)
-    
-    # Verify conversion
-    new_types = df['transaction_type'].unique()
-    logger.info(f"New transaction types: {new_types}")
-    
-    # Save updated file
-    logger.info(f"Saving updated transactions to {output_file}")
-    df.to_csv(output_file, index=False)
-    logger.info("Done!")
+    return mapped.where(mapped.notna(), types), counts
 
-if __name__ == "__main__":
+
+def _merge_counts(total: Dict[str, Counter], counts: Dict[str, Counter]) -> None:
+    for key, counter in counts.items():
+        total.setdefault(key, Counter()).update(counter)
+
+
+def _temp_path(output_file: Path) -> Path:
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix='.tmp')
+    os.close(fd)
+    return Path(tmp_name)
+
+
+def _rewrite_csv(input_file: Path, tmp_file: Path, chunk_size: int) -> Dict[str, Counter]:
+    total = {}
+    # Every column is read as text so that all other values are written back unchanged
+    chunks = pd.read_csv(input_file, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as out:
+        for chunk_num, chunk in enumerate(chunks):
+            chunk[TYPE_COLUMN], counts = remap_types(chunk[TYPE_COLUMN])
+            _merge_counts(total, counts)
+            chunk.to_csv(out, index=False, header=chunk_num == 0)
+    return total
+
+
+def _rewrite_parquet(input_file: Path, tmp_file: Path, chunk_size: int) -> Dict[str, Counter]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    total = {}
+    source = pq.ParquetFile(input_file)
+    writer = None
+    try:
+        for batch in source.iter_batches(batch_size=chunk_size):
+            index = batch.schema.get_field_index(TYPE_COLUMN)
+            field = batch.schema.field(index)
+            types, counts = remap_types(batch.column(index).cast(pa.string()).to_pandas())
+            _merge_counts(total, counts)
+            # Keep the column's Arrow type (staged files store it dictionary encoded),
+            # otherwise the file no longer reads together with the rest of its dataset
+            table = pa.Table.from_batches([batch]).set_column(
+                index, field, pa.array(types, type=pa.string()).cast(field.type)
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_file, table.schema)
+            writer.write_table(table)
+        if writer is None:
+            # Empty file: keep its schema
+            pq.write_table(source.schema_arrow.empty_table(), tmp_file)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+
+def update_transaction_types(input_file: str, output_file: Optional[str] = None,
+                             chunk_size: int = CHUNK_SIZE, strict: bool = False) -> Dict:
+    """
+    Update transaction types in a CSV or Parquet file.
+
+    output_file defaults to input_file (in-place). With strict the output is
+    discarded if any type could not be mapped. Returns the number of rows and
+    the counts of mapped, already migrated and unmapped types.
+    """
+    input_path = Path(input_file)
+    output_path = Path(output_file) if output_file else input_path
+    logger.info(f"Reading transactions from {input_path}")
+
+    tmp_path = _temp_path(output_path)
+    try:
+        if input_path.suffix == '.parquet':
+            counts = _rewrite_parquet(input_path, tmp_path, chunk_size)
+        else:
+            counts = _rewrite_csv(input_path, tmp_path, chunk_size)
+        if strict and counts.get('unmapped'):
+            raise ValueError(f"{input_path}: unmapped transaction types {dict(counts['unmapped'])}")
+        # mkstemp creates the file with mode 0600, keep the permissions of the file it replaces
+        shutil.copymode(output_path if output_path.exists() else input_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    report = {
+        'file': str(output_path),
+        'rows': sum(sum(counter.values()) for counter in counts.values()),
+        **{key: dict(counter) for key, counter in counts.items()},
+    }
+    if report.get('unmapped'):
+        logger.warning(f"{input_path}: unmapped transaction types kept as is: {report['unmapped']}")
+    logger.info(f"Saved updated transactions to {output_path} ({report['rows']} rows)")
+    return report
+
+
+def _output_paths(input_files: List[str], output_dir: Optional[str]) -> List[str]:
+    if not output_dir:
+        return list(input_files)
+    # Keep the layout below the inputs' common directory, e.g. the date=... partitions
+    parents = [Path(f).resolve().parent for f in input_files]
+    root = Path(os.path.commonpath(parents))
+    outputs = [str(Path(output_dir) / Path(f).resolve().relative_to(root)) for f in input_files]
+    duplicates = sorted({out for out in outputs if outputs.count(out) > 1})
+    if duplicates:
+        raise ValueError(f"Several input files map to the same output: {duplicates}")
+    return outputs
+
+
+def update_many(input_files: List[str], output_dir: Optional[str] = None, workers: int = 4,
+                chunk_size: int = CHUNK_SIZE, strict: bool = False) -> List[Dict]:
+    """
+    Update many files in parallel processes, in place or into output_dir.
+
+    In output_dir the files keep their paths relative to the inputs' common
+    directory, so partitions with the same file name do not overwrite each other.
+    """
+    if not input_files:
+        return []
+    outputs = _output_paths(input_files, output_dir)
+    for out in outputs:
+        Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(input_files)))) as executor:
+        futures = [executor.submit(update_transaction_types, f, out, chunk_size, strict)
+                   for f, out in zip(input_files, outputs)]
+        return [future.result() for future in futures]
+
+
+def main():
     data_dir = Path("data/working")
-    input_file = data_dir / "transactions.csv"
-    output_file = data_dir / "transactions_updated.csv"
-    
-    update_transaction_types(str(input_file), str(output_file)) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migrate transaction types from incoming/outgoing to debit/credit")
+    parser.add_argument('input_files', nargs='*', help="CSV or Parquet files (default: data/working/transactions.csv)")
+    parser.add_argument('--output', help="Output file for a single input "
+                                         "(default for the standard input: data/working/transactions_updated.csv)")
+    parser.add_argument('--output-dir', help="Write updated files here instead of in place")
+    parser.add_argument('--in-place', action='store_true', help="Replace the input files")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--strict', action='store_true', help="Fail instead of keeping unmapped types")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.input_files:
+        output = args.output or (None if args.in_place else str(data_dir / "transactions_updated.csv"))
+        reports = [update_transaction_types(str(data_dir / "transactions.csv"), output,
+                                            args.chunk_size, args.strict)]
+    elif len(args.input_files) == 1 and not args.output_dir:
+        if not (args.output or args.in_place):
+            parser.error("give --output or --in-place")
+        reports = [update_transaction_types(args.input_files[0], args.output, args.chunk_size, args.strict)]
+    else:
+        if not (args.output_dir or args.in_place):
+            parser.error("give --output-dir or --in-place for several files")
+        reports = update_many(args.input_files, args.output_dir, args.workers, args.chunk_size, args.strict)
+
+    for report in reports:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,40 +2,105 @@
 Automated workflow for data validation and processing using Prefect.
 """
 from prefect import flow, task
-from prefect.tasks import task_input_hash
-from datetime import timedelta, datetime
+from datetime import datetime
 import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import Tuple, Dict, List
 import logging
 from pathlib import Path
 import math
-import re
 
 from src.data_processing.transaction_validator import TransactionValidator
 from src.data_processing.data_validator import DataValidator
+from src.data_processing.csv_reader import TIMESTAMP_COLUMN, csv_options, read_typed_csv
+from src.data_processing.staging import write_stage
+from src.data_processing.ingestion_state import SourceDelta, get_state, read_delta, save_state
+from src.data_processing.data_preparation import (
+    format_phone_number, prepare_customer_data, prepare_account_data, prepare_transaction_data,
+    build_transaction_entries
+)
 from src.utils.monitoring import monitor
-from src.models.database_models import session_scope, Customer, Account, Transaction
+from src.utils.query_profiler import profiler
+from src.models.database_models import session_scope, bulk_session_scope, Customer, Account, Transaction
+from src.models.balances import apply_balance_deltas
+from src.models.daily_stats import apply_daily_stats
+from src.models.export_checkpoints import completed_batches, frame_fingerprint, record_batch
+from src.models.partitions import copy_transactions, ensure_partitions
 
 logger = logging.getLogger(__name__)
 
-@task(cache_key_fn=task_input_hash, cache_expiration=timedelta(hours=1))
+@task
 def load_data(transactions_path: str = None, customers_path: str = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Load data from CSV files.
+    
+    Files are read with their typed schema (see csv_reader). Parsed files are
+    served from parse_cache, keyed on their content, so an unchanged file is
+    not parsed again and a changed one always is.
     """
     transactions_df = pd.DataFrame()  # Empty DataFrame as default
     customers_df = pd.DataFrame()     # Empty DataFrame as default
     
     if transactions_path:
-    transactions_df = pd.read_csv(transactions_path)
+        transactions_df = read_typed_csv(transactions_path, 'transactions')
         logger.info(f"Loaded {len(transactions_df)} transactions")
     
     if customers_path:
-    customers_df = pd.read_csv(customers_path)
+        customers_df = read_typed_csv(customers_path, 'customers')
         logger.info(f"Loaded {len(customers_df)} customer records")
     
     return transactions_df, customers_df
 
+@task
+def load_new_data(transactions_path: str = None,
+                  customers_path: str = None) -> Tuple[pd.DataFrame, pd.DataFrame, List[SourceDelta]]:
+    """
+    Load only the rows appended to the CSV files since their recorded high-water marks.
+    
+    Returns the new rows and the deltas to pass to save_ingestion_state()
+    once they have been exported.
+    """
+    transactions_df = pd.DataFrame()
+    customers_df = pd.DataFrame()
+    deltas = []
+    
+    with session_scope() as session:
+        if transactions_path:
+            delta = read_delta(transactions_path, get_state(session, transactions_path),
+                               timestamp_column=TIMESTAMP_COLUMN, read_options=csv_options('transactions'))
+            transactions_df = delta.frame
+            deltas.append(delta)
+            logger.info(f"Loaded {len(transactions_df)} new transactions")
+        
+        if customers_path:
+            delta = read_delta(customers_path, get_state(session, customers_path),
+                               read_options=csv_options('customers'))
+            customers_df = delta.frame
+            deltas.append(delta)
+            logger.info(f"Loaded {len(customers_df)} new customer records")
+    
+    return transactions_df, customers_df, deltas
+
+@task
+def save_ingestion_state(deltas: List[SourceDelta]) -> None:
+    """
+    Record the high-water marks of exported deltas.
+    """
+    with session_scope() as session:
+        for delta in deltas:
+            save_state(session, delta)
+
+@task
+def stage_frames(frames: List[Tuple[str, str, pd.DataFrame]], append: bool = False) -> None:
+    """
+    Write (stage, source, frame) triples to the Parquet staging area.
+    
+    Incremental deltas are appended to the staged partitions instead of replacing them.
+    """
+    for stage, source, frame in frames:
+        write_stage(frame, stage, source, append=append)
+
 @task
 def validate_transactions(transactions_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
@@ -63,11 +128,12 @@ def validate_transactions(transactions_df: pd.DataFrame) -> Tuple[pd.DataFrame,
             logger.warning(f"Transaction {idx} errors: {errors}")
     
     # Create mask for valid/invalid transactions
-    valid_mask = [r['valid'] for r in validation_results]
+    valid_mask = pd.Series([r['valid'] for r in validation_results],
+                           index=transactions_df.index, dtype=bool)
     
     # Split dataframe
     valid_transactions = transactions_df[valid_mask].copy()
-    invalid_transactions = transactions_df[~pd.Series(valid_mask)].copy()
+    invalid_transactions = transactions_df[~valid_mask].copy()
     
     # Log summary
     logger.info(f"Valid transactions: {len(valid_transactions)}")
@@ -86,6 +152,22 @@ def validate_customers(customers_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Dat
     # Run all validations
     validation_results = validator.validate_all()
     
+    # Lookup sets built once. Missing values are pd.NA in Arrow string columns and
+    # comparing with pd.NA has no truth value, so they are looked up as None
+    def listed(values) -> set:
+        return {value for value in values if isinstance(value, str)}
+    
+    def text_or_none(value):
+        return value if isinstance(value, str) else None
+    
+    pnr_results = validation_results['personnummer']
+    invalid_check_digits = listed(pnr_results.get('invalid_check_digits', []))
+    invalid_dates = listed(pnr_results.get('invalid_dates', []))
+    address_results = validation_results['address']
+    invalid_address_format = listed(address_results.get('invalid_format', []))
+    missing_postal_code = listed(address_results.get('missing_postal_code', []))
+    invalid_phones = listed(validation_results['phone'].get('invalid', []))
+    
     # Create validation results list for each customer
     results = []
     for idx, row in customers_df.iterrows():
@@ -94,26 +176,26 @@ def validate_customers(customers_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Dat
         errors = []
         
         # Check personnummer validation
-        pnr = row['Personnummer']
-        if pnr in validation_results['personnummer'].get('invalid_check_digits', []):
+        pnr = text_or_none(row['Personnummer'])
+        if pnr in invalid_check_digits:
             has_errors = True
             errors.append("Invalid personnummer check digit")
-        if pnr in validation_results['personnummer'].get('invalid_dates', []):
+        if pnr in invalid_dates:
             has_errors = True
             errors.append("Invalid personnummer date")
             
         # Check address validation
-        address = row['Address']
-        if address in validation_results['address'].get('invalid_format', []):
+        address = text_or_none(row['Address'])
+        if address in invalid_address_format:
             has_errors = True
             errors.append("Invalid address format")
-        if address in validation_results['address'].get('missing_postal_code', []):
+        if address in missing_postal_code:
             has_errors = True
             errors.append("Missing postal code")
             
         # Check phone validation
-        phone = row['Phone']
-        if phone in validation_results['phone'].get('invalid', []):
+        phone = text_or_none(row['Phone'])
+        if phone in invalid_phones:
             has_errors = True
             errors.append("Invalid phone number format")
         
@@ -131,11 +213,12 @@ def validate_customers(customers_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Dat
         )
     
     # Create mask for valid/invalid customers
-    valid_mask = [r['valid'] for r in results]
+    valid_mask = pd.Series([r['valid'] for r in results],
+                           index=customers_df.index, dtype=bool)
     
     # Split dataframe
     valid_customers = customers_df[valid_mask].copy()
-    invalid_customers = customers_df[~pd.Series(valid_mask)].copy()
+    invalid_customers = customers_df[~valid_mask].copy()
     
     return valid_customers, invalid_customers
 
@@ -155,322 +238,185 @@ def process_batch(df: pd.DataFrame, table_name: str, session, batch_size: int, s
         logger.error(f"Failed to export batch {start_idx//batch_size + 1} to {table_name}: {str(e)}")
         return False
 
-def format_phone_number(phone: str) -> str:
+def _records(frame: pd.DataFrame) -> List[Dict]:
+    """Rows as dicts of native Python values, with None for missing values."""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def _upsert_customers(session, customer_batch: pd.DataFrame) -> Dict[str, int]:
     """
-    Format phone numbers to international format: +XX(Y)ZZZZ...
-    where:
-    - XX is country code (1-3 digits)
-    - Y is area code (1-4 digits)
-    - Z is the rest of the number
-    
-    Handles:
-    1. Local Swedish numbers (0X-XXX XX XX -> +46(X)XXX XX XX)
-    2. International numbers (keeps them as is, just reformats if needed)
-    3. Numbers with or without spaces/dashes
+    Insert or update a batch of customers in one statement; returns personnummer -> id.
     """
-    if not phone or pd.isna(phone):
-        return None
-        
-    # Remove all non-digit characters except + if it exists at the start
-    has_plus = phone.startswith('+')
-    digits = ''.join(filter(str.isdigit, phone))
-    
-    # Handle Swedish local format (starting with 0)
-    if digits.startswith('0'):
-        # For Swedish numbers, we know the exact format:
-        # 0XX-XXX XX XX or 0XXX-XXX XX XX
-        if len(digits) < 9:  # Too short for a Swedish number
-            return None
-            
-        # Remove leading 0 and split into area code and main number
-        digits = digits[1:]  # Remove leading 0
-        if len(digits) == 10:  # 3-digit area code
-            area_code = digits[:3]
-            main_number = digits[3:]
-        else:  # 2-digit area code
-            area_code = digits[:2]
-            main_number = digits[2:]
-            
-        return f"+46({area_code}){main_number}"
-    
-    # Handle international format
-    elif has_plus:
-        # First 1-3 digits are country code
-        if len(digits) < 4:  # Need at least: 1 digit country code, 1 digit area code, 1 digit number
-            return None
-            
-        # Try to determine country code length (usually 1-3 digits)
-        if digits.startswith('1'):  # North America
-            country_code = digits[:1]
-            rest = digits[1:]
-        elif digits.startswith('7'):  # Russia
-            country_code = digits[:1]
-            rest = digits[1:]
-        elif digits[:3] in ['380', '381']:  # Some 3-digit country codes
-            country_code = digits[:3]
-            rest = digits[3:]
-        else:  # Most European/Asian countries (2 digits)
-            country_code = digits[:2]
-            rest = digits[2:]
-            
-        # For international numbers, take first 2-3 digits as area code
-        area_code = rest[:3]
-        main_number = rest[3:]
-        
-        return f"+{country_code}({area_code}){main_number}"
-    
-    # If number doesn't start with + or 0, it's invalid
-    return None
+    stmt = pg_insert(Customer)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Customer.personnummer],
+        set_={column: stmt.excluded[column]
+              for column in ('name', 'address', 'postal_code', 'city', 'phone', 'bank_id', 'guardian_info')}
+    ).returning(Customer.personnummer, Customer.id)
+    return dict(session.execute(stmt, _records(customer_batch)).tuples().all())
 
-def prepare_customer_data(customers_df: pd.DataFrame) -> pd.DataFrame:
+def _upsert_accounts(session, account_batch: pd.DataFrame, customer_id_map: Dict[str, int]) -> Dict[str, int]:
     """
-    Prepare customer data for database import by mapping CSV columns to database columns
-    and extracting address components.
+    Insert or update the accounts of known customers; returns account_number -> id.
     """
-    # Create a copy to avoid modifying the original data
-    db_ready_df = customers_df.copy()
-    
-    # Drop duplicates based on personnummer to get unique customers
-    db_ready_df = db_ready_df.drop_duplicates(subset=['Personnummer'])
-    
-    # Extract address components using regex
-    address_pattern = r'(.*?),\s*(\d{5})\s*(.*)'
-    address_components = db_ready_df['Address'].str.extract(address_pattern)
-    db_ready_df['address'] = address_components[0]
-    db_ready_df['postal_code'] = address_components[1]
-    db_ready_df['city'] = address_components[2]
-    
-    # Map columns to match database schema
-    db_ready_df = db_ready_df.rename(columns={
-        'Customer': 'name',  # Changed back to 'Customer' to match the actual CSV column name
-        'Phone': 'phone',
-        'Personnummer': 'personnummer'
-    })
-    
-    # Format phone numbers
-    db_ready_df['phone'] = db_ready_df['phone'].apply(format_phone_number)
-    
-    # Add guardian_info as NULL for adults
-    db_ready_df['guardian_info'] = None
-    
-    # Add bank_id
-    db_ready_df['bank_id'] = 1
-    
-    # Select only the columns we need in the exact order they appear in the database
-    # Order from database: id, bank_id, personnummer, name, phone, address, city, postal_code, guardian_info
-    # Note: id is auto-generated, so we exclude it
-    return db_ready_df[['bank_id', 'personnummer', 'name', 'phone', 'address', 'city', 'postal_code', 'guardian_info']]
+    account_batch = account_batch.assign(customer_id=account_batch['personnummer'].map(customer_id_map))
+    account_batch = account_batch[account_batch['customer_id'].notna()].drop_duplicates('account_number', keep='last')
+    if account_batch.empty:
+        return {}
+    account_batch = account_batch.astype({'customer_id': int}).drop(columns=['personnummer'])
+    stmt = pg_insert(Account)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Account.account_number],
+        set_={column: stmt.excluded[column] for column in ('customer_id', 'bank_id', 'type')}
+    ).returning(Account.account_number, Account.id)
+    return dict(session.execute(stmt, _records(account_batch)).tuples().all())
 
-def prepare_account_data(customers_df: pd.DataFrame) -> pd.DataFrame:
+def _inserted_entries(entries: List[Dict], inserted_keys) -> List[Dict]:
     """
-    Prepare account data for database import.
-    """
-    # Create a copy to avoid modifying the original data
-    db_ready_df = customers_df.copy()
-    
-    # Use existing account numbers from BankAccount column
-    db_ready_df['account_number'] = db_ready_df['BankAccount']
-    
-    # Add other required fields
-    db_ready_df['type'] = 'checking'  # Default account type
-    db_ready_df['created_at'] = pd.Timestamp.now()
-    db_ready_df['bank_id'] = 1  # Add bank_id
-    
-    # Keep personnummer for mapping to customer_id later
-    db_ready_df['personnummer'] = customers_df['Personnummer']
-    
-    # Select only the columns we need in the exact order they appear in the database
-    # plus personnummer for mapping
-    return db_ready_df[['account_number', 'type', 'created_at', 'bank_id', 'personnummer']]
+    The entries whose (transaction_id, transaction_type, timestamp) was returned by an insert.
 
-def prepare_transaction_data(transactions_df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Prepare transaction data for database import
-    """
-    # Create a copy to avoid modifying the original data
-    db_ready_df = transactions_df.copy()
-    
-    # Map columns to match database schema
-    db_ready_df = db_ready_df.rename(columns={
-        'TransactionID': 'transaction_id',
-        'Amount': 'amount',
-        'Currency': 'currency',
-        'Timestamp': 'timestamp',
-        'SenderCountry': 'sender_country',
-        'SenderMunicipality': 'sender_municipality',
-        'ReceiverCountry': 'receiver_country',
-        'ReceiverMunicipality': 'receiver_municipality',
-        'TransactionType': 'transaction_type'
-    })
-    
-    # Convert old transaction types to new debit/credit system
-    type_mapping = {
-        'incoming': 'debit',   # Money coming in (positive amount)
-        'outgoing': 'credit'   # Money going out (negative amount)
+    An entry repeated within the batch is returned once, like the row it inserted.
+    """
+    remaining = {
+        (transaction_id, transaction_type, pd.Timestamp(timestamp))
+        for transaction_id, transaction_type, timestamp in inserted_keys
     }
-    db_ready_df['transaction_type'] = db_ready_df['transaction_type'].map(type_mapping)
-    
-    # Ensure correct data types
-    db_ready_df['transaction_id'] = db_ready_df['transaction_id'].astype(str)
-    db_ready_df['sender_account'] = db_ready_df['sender_account'].astype(str)
-    db_ready_df['receiver_account'] = db_ready_df['receiver_account'].astype(str)
-    db_ready_df['amount'] = pd.to_numeric(db_ready_df['amount'], errors='coerce')
-    db_ready_df['currency'] = db_ready_df['currency'].astype(str)
-    db_ready_df['timestamp'] = pd.to_datetime(db_ready_df['timestamp'])
-    db_ready_df['sender_country'] = db_ready_df['sender_country'].astype(str)
-    db_ready_df['sender_municipality'] = db_ready_df['sender_municipality'].astype(str)
-    db_ready_df['receiver_country'] = db_ready_df['receiver_country'].astype(str)
-    db_ready_df['receiver_municipality'] = db_ready_df['receiver_municipality'].astype(str)
-    db_ready_df['transaction_type'] = db_ready_df['transaction_type'].astype(str)
-    
-    # Handle missing values
-    db_ready_df['notes'] = db_ready_df.get('notes', '').fillna('')
-    
-    return db_ready_df
+    inserted = []
+    for entry in entries:
+        key = (entry['transaction_id'], entry['transaction_type'], pd.Timestamp(entry['timestamp']))
+        if key in remaining:
+            remaining.discard(key)
+            inserted.append(entry)
+    return inserted
+
+def _insert_new_transactions(session, entries: List[Dict]) -> List[Dict]:
+    """
+    Insert transaction entries, skipping ones already stored; returns the inserted entries.
+    """
+    stmt = pg_insert(Transaction).on_conflict_do_nothing(
+        constraint='transactions_transaction_id_type_key'
+    ).returning(Transaction.transaction_id, Transaction.transaction_type, Transaction.timestamp)
+    return _inserted_entries(entries, session.execute(stmt, entries).tuples())
 
 @task
 def export_to_database(valid_transactions: pd.DataFrame, valid_customers: pd.DataFrame, 
-                      batch_size: int = 1000) -> bool:
+                      batch_size: int = 1000, bulk_mode: bool = False, resume: bool = True) -> bool:
     """
     Export validated data to database with batch processing support.
+    
+    Every batch is idempotent (customers and accounts are upserted, stored
+    transactions are skipped) and is committed together with a checkpoint
+    for its row range. With resume, batches already checkpointed for the
+    same input are skipped, so a failed export restarts at the first
+    incomplete batch.
+    
+    With bulk_mode the export runs in bulk_session_scope() (no autoflush, no
+    expiry on commit, synchronous_commit off), meant for large re-runnable loads,
+    and transactions are COPYed into their monthly partitions (through a staging
+    table, so already stored rows are skipped here as well).
     """
+    scope = bulk_session_scope if bulk_mode else session_scope
+    customers_fingerprint = frame_fingerprint(valid_customers)
+    transactions_fingerprint = frame_fingerprint(valid_transactions)
     try:
-        with session_scope() as session:
+        with scope() as session:
             # Prepare data for database import
             db_ready_customers = prepare_customer_data(valid_customers)
             db_ready_accounts = prepare_account_data(valid_customers)
             db_ready_transactions = prepare_transaction_data(valid_transactions)
             
+            def completed(fingerprint, table_name):
+                return completed_batches(session, fingerprint, table_name) if resume else set()
+            
             # Process customers first
             logger.info(f"Starting customer export in batches of {batch_size}")
             total_customer_batches = math.ceil(len(db_ready_customers) / batch_size)
+            done = completed(customers_fingerprint, 'customers')
             
             customer_id_map = {}
             
             for batch_num in range(total_customer_batches):
                 start_idx = batch_num * batch_size
-                end_idx = start_idx + batch_size
+                end_idx = min(start_idx + batch_size, len(db_ready_customers))
                 customer_batch = db_ready_customers.iloc[start_idx:end_idx]
                 
-                for _, row in customer_batch.iterrows():
-                    # Check if customer already exists
-                    existing_customer = session.query(Customer).filter_by(personnummer=row['personnummer']).first()
-                    
-                    if existing_customer:
-                        # Update existing customer
-                        existing_customer.name = row['name']
-                        existing_customer.address = row['address']
-                        existing_customer.postal_code = row['postal_code']
-                        existing_customer.city = row['city']
-                        existing_customer.phone = row['phone']
-                        existing_customer.bank_id = row['bank_id']
-                        existing_customer.guardian_info = row['guardian_info']
-                        customer_id_map[row['personnummer']] = existing_customer.id
-                    else:
-                        # Create new customer
-                        customer = Customer(
-                            name=row['name'],
-                            address=row['address'],
-                            postal_code=row['postal_code'],
-                            city=row['city'],
-                            phone=row['phone'],
-                            personnummer=row['personnummer'],
-                            bank_id=row['bank_id'],
-                            guardian_info=row['guardian_info']
-                        )
-                        session.add(customer)
-                        session.flush()  # Get the ID without committing
-                        customer_id_map[row['personnummer']] = customer.id
+                if (start_idx, end_idx) in done:
+                    # Committed by an earlier run, only the ids are needed
+                    customer_id_map.update(session.execute(
+                        select(Customer.personnummer, Customer.id)
+                        .where(Customer.personnummer.in_(customer_batch['personnummer'].tolist()))
+                    ).tuples().all())
+                    continue
                 
+                customer_id_map.update(_upsert_customers(session, customer_batch))
+                record_batch(session, customers_fingerprint, 'customers', start_idx, end_idx, len(customer_batch))
                 session.commit()
                 logger.info(f"Processed customer batch {batch_num + 1}/{total_customer_batches}")
             
             # Process accounts next
             logger.info(f"Starting account export in batches of {batch_size}")
             total_account_batches = math.ceil(len(db_ready_accounts) / batch_size)
+            done = completed(customers_fingerprint, 'accounts')
             
             account_number_map = {}  # To store account_number -> account_id mapping
             
             for batch_num in range(total_account_batches):
                 start_idx = batch_num * batch_size
-                end_idx = start_idx + batch_size
+                end_idx = min(start_idx + batch_size, len(db_ready_accounts))
                 account_batch = db_ready_accounts.iloc[start_idx:end_idx]
                 
-                for _, row in account_batch.iterrows():
-                    customer_id = customer_id_map.get(row['personnummer'])
-                    if customer_id:
-                        # Check if account already exists
-                        existing_account = session.query(Account).filter_by(account_number=row['account_number']).first()
-                        
-                        if existing_account:
-                            # Update existing account
-                            existing_account.customer_id = customer_id
-                            existing_account.bank_id = row['bank_id']
-                            existing_account.type = row['type']
-                            account_number_map[row['account_number']] = existing_account.id
-                        else:
-                            # Create new account
-                            account = Account(
-                                account_number=row['account_number'],
-                                customer_id=customer_id,
-                                bank_id=row['bank_id'],
-                                type=row['type'],
-                                created_at=row['created_at']
-                            )
-                            session.add(account)
-                            session.flush()  # Get the ID without committing
-                            account_number_map[row['account_number']] = account.id
+                if (start_idx, end_idx) in done:
+                    account_number_map.update(session.execute(
+                        select(Account.account_number, Account.id)
+                        .where(Account.account_number.in_(account_batch['account_number'].tolist()))
+                    ).tuples().all())
+                    continue
                 
+                account_number_map.update(_upsert_accounts(session, account_batch, customer_id_map))
+                record_batch(session, customers_fingerprint, 'accounts', start_idx, end_idx, len(account_batch))
                 session.commit()
                 logger.info(f"Processed account batch {batch_num + 1}/{total_account_batches}")
             
+            # Transactions may reference accounts loaded in earlier runs
+            if not db_ready_transactions.empty:
+                referenced = set(db_ready_transactions['sender_account']) | set(db_ready_transactions['receiver_account'])
+                missing = list(referenced - set(account_number_map))
+                for start_idx in range(0, len(missing), batch_size):
+                    account_number_map.update(session.execute(
+                        select(Account.account_number, Account.id)
+                        .where(Account.account_number.in_(missing[start_idx:start_idx + batch_size]))
+                    ).tuples().all())
+            
             # Finally process transactions
             logger.info(f"Starting transaction export in batches of {batch_size}")
             total_transaction_batches = math.ceil(len(db_ready_transactions) / batch_size)
+            done = completed(transactions_fingerprint, 'transactions')
+            if done:
+                logger.info(f"Resuming: {len(done)} transaction batches were exported by an earlier run")
             
             for batch_num in range(total_transaction_batches):
                 start_idx = batch_num * batch_size
-                end_idx = start_idx + batch_size
+                end_idx = min(start_idx + batch_size, len(db_ready_transactions))
+                if (start_idx, end_idx) in done:
+                    continue
                 transaction_batch = db_ready_transactions.iloc[start_idx:end_idx]
                 
-                for _, row in transaction_batch.iterrows():
-                    # Get account IDs from the mapping
-                    sender_account_id = account_number_map.get(row['sender_account'])
-                    receiver_account_id = account_number_map.get(row['receiver_account'])
-                    
-                    if sender_account_id and receiver_account_id:
-                        # Create credit entry (money leaving sender's account)
-                        credit_entry = Transaction(
-                            transaction_id=row['transaction_id'],  # Same transaction_id for both entries
-                            account_id=sender_account_id,
-                            amount=-row['amount'],  # Negative for credit (money leaving)
-                            currency=row['currency'],
-                            transaction_type='credit',  # This entry is a credit
-                            timestamp=row['timestamp'],
-                            sender_country=row['sender_country'],
-                            sender_municipality=row['sender_municipality'],
-                            receiver_country=row['receiver_country'],
-                            receiver_municipality=row['receiver_municipality'],
-                            notes=row.get('notes')
-                        )
-                        session.add(credit_entry)
-
-                        # Create debit entry (money entering receiver's account)
-                        debit_entry = Transaction(
-                            transaction_id=row['transaction_id'],  # Same transaction_id for both entries
-                            account_id=receiver_account_id,
-                            amount=row['amount'],  # Positive for debit (money entering)
-                            currency=row['currency'],
-                            transaction_type='debit',  # This entry is a debit
-                            timestamp=row['timestamp'],
-                            sender_country=row['sender_country'],
-                            sender_municipality=row['sender_municipality'],
-                            receiver_country=row['receiver_country'],
-                            receiver_municipality=row['receiver_municipality'],
-                            notes=row.get('notes')
-                        )
-                        session.add(debit_entry)
+                # One executemany INSERT per batch instead of one ORM object per entry
+                entries = build_transaction_entries(transaction_batch, account_number_map)
+                if entries:
+                    if bulk_mode:
+                        # COPY via a staging table into the monthly partitions; rows
+                        # stored by an earlier run are skipped like in the regular path
+                        entries = _inserted_entries(entries, copy_transactions(session.connection(), entries))
+                    else:
+                        timestamps = [entry['timestamp'] for entry in entries]
+                        ensure_partitions(session.connection(), min(timestamps), max(timestamps))
+                        # Entries stored by an earlier, unrecorded run are skipped and not counted twice
+                        entries = _insert_new_transactions(session, entries)
+                    # Balances and the daily rollup are updated in the same database transaction as the batch
+                    apply_balance_deltas(session, entries)
+                    apply_daily_stats(session, entries)
                 
+                record_batch(session, transactions_fingerprint, 'transactions', start_idx, end_idx, len(entries))
                 session.commit()
                 logger.info(f"Processed transaction batch {batch_num + 1}/{total_transaction_batches}")
             
@@ -491,33 +437,61 @@ def generate_report() -> Dict:
 def validate_and_load(
     transactions_path: str = "data/working/transactions.csv",
     customers_path: str = "data/working/sebank_customers_with_accounts.csv",
-    batch_size: int = 500  # Changed default to 500 for safer initial testing
+    batch_size: int = 500,  # Changed default to 500 for safer initial testing
+    bulk_mode: bool = False,
+    incremental: bool = False,
+    staging: bool = False
 ) -> Dict:
     """
     Main workflow for data validation and loading.
+    
+    With incremental only the rows appended to the files since the last
+    incremental run are validated and exported, and the new high-water
+    marks are recorded after a successful export.
+    
+    With staging the loaded, validated and rejected frames are also written
+    to the Parquet staging area (see staging.py) for later stages and notebooks.
     """
     logger.info("Starting data validation workflow")
+    profiler.reset()
     
     # Load data
-    transactions_df, customers_df = load_data(transactions_path, customers_path)
+    if incremental:
+        transactions_df, customers_df, deltas = load_new_data(transactions_path, customers_path)
+    else:
+        transactions_df, customers_df = load_data(transactions_path, customers_path)
     logger.info(f"Loaded {len(transactions_df)} transactions and {len(customers_df)} customer records")
     
     # Validate both transactions and customers
     valid_transactions, invalid_transactions = validate_transactions(transactions_df)
     valid_customers, invalid_customers = validate_customers(customers_df)
     
+    if staging:
+        stage_frames([
+            ('loaded', 'transactions', transactions_df),
+            ('loaded', 'customers', customers_df),
+            ('validated', 'transactions', valid_transactions),
+            ('validated', 'customers', valid_customers),
+            ('rejected', 'transactions', invalid_transactions),
+            ('rejected', 'customers', invalid_customers),
+        ], append=incremental)
+    
     # Export valid data to database with batch processing
     export_success = export_to_database(
         valid_transactions, 
         valid_customers,
-        batch_size=batch_size
+        batch_size=batch_size,
+        bulk_mode=bulk_mode
     )
+    if incremental and export_success:
+        save_ingestion_state(deltas)
     
     # Generate validation report
     validation_report = generate_report()
     
     # Prepare final report
     report = {
+        'incremental': incremental,
         'total_transactions': len(transactions_df),
         'valid_transactions': len(valid_transactions),
         'invalid_transactions': len(invalid_transactions),
@@ -525,54 +499,56 @@ def validate_and_load(
         'valid_customers': len(valid_customers),
         'invalid_customers': len(invalid_customers),
         'database_export_success': export_success,
-        'validation_details': validation_report
+        'validation_details': validation_report,
+        'query_profile': profiler.get_report(top_n=10)
     }
     
     logger.info(f"Workflow completed. Report: {report}")
     return report
 
 @task
-def export_accounts_to_database(valid_customers: pd.DataFrame, batch_size: int = 1000) -> bool:
+def export_accounts_to_database(valid_customers: pd.DataFrame, batch_size: int = 1000,
+                                bulk_mode: bool = False, resume: bool = True) -> bool:
     """
     Export only account data to database with batch processing support.
+    
+    Accounts are upserted a batch at a time for customers already in the
+    database. A batch is checkpointed like in export_to_database, unless some
+    of its accounts were skipped because their customer is missing, so a
+    later run retries it. See export_to_database for resume and bulk_mode.
     """
+    scope = bulk_session_scope if bulk_mode else session_scope
+    customers_fingerprint = frame_fingerprint(valid_customers)
     try:
-        with session_scope() as session:
+        with scope() as session:
             # Prepare account data
             db_ready_accounts = prepare_account_data(valid_customers)
             
-            # Get existing customer IDs from database
-            customer_id_map = {}
-            for _, row in valid_customers.iterrows():
-                customer = session.query(Customer).filter_by(personnummer=row['Personnummer']).first()
-                if customer:
-                    customer_id_map[row['Personnummer']] = customer.id
-            
             # Process accounts
             logger.info(f"Starting account export in batches of {batch_size}")
             total_account_batches = math.ceil(len(db_ready_accounts) / batch_size)
-            
-            account_number_map = {}  # To store account_number -> account_id mapping
+            done = completed_batches(session, customers_fingerprint, 'accounts') if resume else set()
             
             for batch_num in range(total_account_batches):
                 start_idx = batch_num * batch_size
-                end_idx = start_idx + batch_size
+                end_idx = min(start_idx + batch_size, len(db_ready_accounts))
+                if (start_idx, end_idx) in done:
+                    continue
                 account_batch = db_ready_accounts.iloc[start_idx:end_idx]
                 
-                for _, row in account_batch.iterrows():
-                    customer_id = customer_id_map.get(row['personnummer'])
-                    if customer_id:
-                        account = Account(
-                            account_number=row['account_number'],
-                            customer_id=customer_id,
-                            bank_id=row['bank_id'],
-                            type=row['type'],
-                            created_at=row['created_at']
-                        )
-                        session.add(account)
-                        session.flush()  # Get the ID without committing
-                        account_number_map[row['account_number']] = account.id
+                # Existing customer IDs for this batch in one query
+                customer_id_map = dict(session.execute(
+                    select(Customer.personnummer, Customer.id)
+                    .where(Customer.personnummer.in_(account_batch['personnummer'].unique().tolist()))
+                ).tuples().all())
+                stored = _upsert_accounts(session, account_batch, customer_id_map)
                 
+                skipped = account_batch['account_number'].nunique() - len(stored)
+                if skipped:
+                    logger.warning(f"Account batch {batch_num + 1}: {skipped} accounts have no customer "
+                                   f"in the database, the batch will be retried on the next run")
+                else:
+                    record_batch(session, customers_fingerprint, 'accounts', start_idx, end_idx, len(account_batch))
                 session.commit()
                 logger.info(f"Processed account batch {batch_num + 1}/{total_account_batches}")
             
@@ -585,7 +561,8 @@ def export_accounts_to_database(valid_customers: pd.DataFrame, batch_size: int =
 @flow(name="account_import_flow")
 def import_accounts(
     customers_path: str = "data/working/sebank_customers_with_accounts.csv",
-    batch_size: int = 500
+    batch_size: int = 500,
+    bulk_mode: bool = False
 ) -> Dict:
     """
     Workflow specifically for importing accounts.
@@ -602,7 +579,8 @@ def import_accounts(
     # Export only accounts to database
     export_success = export_accounts_to_database(
         valid_customers,
-        batch_size=batch_size
+        batch_size=batch_size,
+        bulk_mode=bulk_mode
     )
     
     # Prepare final report
@@ -617,4 +595,8 @@ def import_accounts(
     return report
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     validate_and_load() 
\ No newline at end of file
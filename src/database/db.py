@@ -1,23 +1,52 @@
 import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import errors, extensions
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Singleton to reuse the same connection across instances
+# Connections idle for longer than this are pinged before they are handed out
+HEALTH_CHECK_IDLE_SECONDS = 30
+
+# Errors after which the whole transaction can simply be run again
+RETRYABLE_ERRORS = (errors.SerializationFailure, errors.DeadlockDetected)
+MAX_TRANSACTION_ATTEMPTS = 5
+
+
+# Singleton owning a thread-safe connection pool shared by all model instances.
+# Every operation checks out its own connection, so threads no longer share one socket.
 class Db:
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(Db, cls).__new__(cls)
-            cls._instance.conn = cls._create_conn()
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(Db, cls).__new__(cls)
+                    instance._init_pool()
+                    cls._instance = instance
         return cls._instance
 
+    def _init_pool(self):
+        self.max_connections = int(os.getenv('DB_POOL_SIZE', '5')) + int(os.getenv('DB_MAX_OVERFLOW', '10'))
+        self.checkout_timeout = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+        self.pool = ThreadedConnectionPool(1, self.max_connections, **self._connect_kwargs())
+        # ThreadedConnectionPool raises instead of waiting when it is exhausted;
+        # the semaphore makes callers wait for a free connection instead.
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._last_used = {}
+
     @staticmethod
-    def _create_conn():
-        return psycopg2.connect(
+    def _connect_kwargs():
+        return dict(
             dbname=os.getenv('DB_NAME', 'bank_db'),
             user=os.getenv('DB_USER', 'postgres'),
             password=os.getenv('DB_PASSWORD', 'postgres'),
@@ -25,5 +54,82 @@ class Db:
             port=os.getenv('DB_PORT', '5432')
         )
 
-    def get_conn(self):
-        return self.conn
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0) > HEALTH_CHECK_IDLE_SECONDS:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _checkout(self):
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolError(f"No database connection available within {self.checkout_timeout} s")
+        try:
+            conn = self.pool.getconn()
+            if not self._is_healthy(conn):
+                # Drop the broken connection; the pool opens a fresh one
+                self.pool.putconn(conn, close=True)
+                self._last_used.pop(id(conn), None)
+                conn = self.pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn):
+        self._last_used[id(conn)] = time.monotonic()
+        self.pool.putconn(conn, close=bool(conn.closed))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for one operation.
+
+        Commits when the block succeeds, rolls back when it raises, and always
+        returns the connection to the pool.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def cursor(self):
+        """Shortcut for a cursor on a freshly checked out connection, see connection()."""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+
+    def run_in_transaction(self, operation, attempts=MAX_TRANSACTION_ATTEMPTS):
+        """
+        Run operation(cursor) in its own transaction and return its result.
+
+        Serialization failures and deadlocks roll back and retry the whole
+        operation with jittered exponential backoff.
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                with self.cursor() as cursor:
+                    return operation(cursor)
+            except RETRYABLE_ERRORS:
+                if attempt == attempts:
+                    raise
+                time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+    def close(self):
+        """Close all pooled connections."""
+        self.pool.closeall()
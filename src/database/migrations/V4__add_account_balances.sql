@@ -0,0 +1,14 @@
+-- Running balance per account, maintained by Transaction.create
+CREATE TABLE account_balances (
+    account_nr text PRIMARY KEY REFERENCES accounts(nr),
+    balance bigint NOT NULL DEFAULT 0,
+    updated_at timestamp NOT NULL DEFAULT now()
+);
+
+-- Backfill from existing transactions
+INSERT INTO account_balances (account_nr, balance)
+SELECT account_nr, SUM(amount)
+FROM transactions
+GROUP BY account_nr;
+
+COMMENT ON TABLE account_balances IS 'Incrementally maintained account balances, reconcilable with SUM(transactions.amount)';
@@ -0,0 +1,10 @@
+-- Account numbers are handed out in blocks: every nextval reserves the
+-- next 1000 numbers for one allocator (see src/models/account_numbers.py).
+-- INCREMENT BY must match ACCOUNT_NUMBER_BLOCK_SIZE in the allocator.
+CREATE SEQUENCE account_number_seq
+    INCREMENT BY 1000
+    MINVALUE 1
+    START WITH 1
+    NO CYCLE;
+
+COMMENT ON SEQUENCE account_number_seq IS 'Block allocator for the 12-digit serial part of account numbers';
@@ -1,4 +1,4 @@
-from src.models.database_models import session_scope, Bank, engine, retry_on_error
+from src.models.database_models import session_scope, Bank, get_engine, retry_on_error
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
 import time
@@ -30,6 +30,7 @@ def test_connection_pooling():
         logger.info("Testar connection pooling...")
         
         # Test 1: Verifiera att poolen skapas
+        engine = get_engine()
         if not hasattr(engine, 'pool'):
             raise SQLAlchemyError("Connection pool saknas")
         
@@ -2,6 +2,12 @@
 Database models and connection management.
 """
 
-from .database_models import session_scope, Bank, engine, retry_on_error
+from .database_models import session_scope, bulk_session_scope, Bank, get_engine, retry_on_error
  
-__all__ = ['session_scope', 'Bank', 'engine', 'retry_on_error'] 
\ No newline at end of file
+__all__ = ['session_scope', 'bulk_session_scope', 'Bank', 'get_engine', 'retry_on_error']
+
+def __getattr__(name):
+    # engine skapas lazily, se database_models.get_engine
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,74 +3,153 @@
 # has interest
 # has balance
 # has currency
-import random
+from psycopg2 import errors
+from psycopg2.extras import execute_values
 
 from database.db import Db
+from models.account_numbers import ACCOUNT_NUMBER_PATTERN, get_allocator
 from models.transaction import Transaction
 
+# Check and debit in one statement: the row lock makes concurrent withdrawals
+# re-evaluate the condition against the updated balance, so none can overdraw.
+CONDITIONAL_DEBIT = """
+    UPDATE account_balances b
+    SET balance = b.balance - %s, updated_at = now()
+    FROM accounts a
+    WHERE b.account_nr = %s AND a.nr = b.account_nr AND b.balance + a.credit >= %s
+    RETURNING b.balance
+"""
 
 class Account:
 
     def __init__(self):
-        self.conn = Db().get_conn()
+        self.db = Db()
         self.balance = 0
 
     @staticmethod
     def generate_nr():
-        return str(random.randint(10 ** 9, 10 ** 10 - 1))
+        # Reserved from account_number_seq, so it never collides with an existing account
+        return get_allocator().next()
 
-    def create(self, customer, bank, type, nr):
+    def create(self, customer, bank, type, nr=None):
+        if nr is None:
+            nr = self.generate_nr()
+        elif not ACCOUNT_NUMBER_PATTERN.match(nr) and not nr.startswith(bank.banknr + "-"):
+            # Local numbers are prefixed with the bank number, full account numbers are kept as is
+            nr = bank.banknr + "-" + nr
         customer = customer.id
-        type = type
-        nr = bank.banknr + "-" + nr
         bank = bank.id
         credit = 0
 
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self.db.cursor() as cursor:
                 cursor.execute("INSERT INTO accounts (customer, bank, type, nr, credit) VALUES (%s, %s, %s, %s, %s)", [customer, bank, type, nr, credit])
-                self.conn.commit()
-                print(f"Account '{nr}' created successfully. Getting data.")
-        except:
+            print(f"Account '{nr}' created successfully. Getting data.")
+        except errors.UniqueViolation:
             print(f"[Warning] Account with number {nr} already exists. Getting data.")
         return self.get(nr)
 
+    @classmethod
+    def create_many(cls, customer, bank, type, count):
+        """
+        Create count accounts with freshly allocated numbers in one INSERT.
+        """
+        numbers = get_allocator().take(count)
+        with Db().cursor() as cursor:
+            rows = execute_values(
+                cursor,
+                f"INSERT INTO accounts (customer, bank, type, nr, credit) VALUES %s RETURNING {cls.ACCOUNT_COLUMNS}",
+                [(customer.id, bank.id, type, nr, 0) for nr in numbers],
+                page_size=1000, fetch=True)
+        return [cls.from_row(row) for row in rows]
+
+    ACCOUNT_COLUMNS = "id, customer, bank, type, nr, credit"
+
+    @classmethod
+    def from_row(cls, row):
+        """Build an Account from an already fetched accounts row without querying."""
+        account = cls()
+        account.id, account.customer, account.bank, account.type, account.nr, account.credit = row
+        return account
+
     def get(self, nr):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM accounts WHERE nr = %s", [nr])
-        account = cursor.fetchone()
-        if(account[0]):
-            print(f"Customer loaded.")
-            self.id = account[0]
-            self.customer = account[1]
-            self.bank = account[2]
-            self.type = account[3]
-            self.nr = account[4]
-            self.credit = account[5]
-            self.transactions = self.get_transactions()
+        with self.db.cursor() as cursor:
+            cursor.execute(f"SELECT {self.ACCOUNT_COLUMNS} FROM accounts WHERE nr = %s", [nr])
+            account = cursor.fetchone()
+        if account:
+            print(f"Account loaded.")
+            self.id, self.customer, self.bank, self.type, self.nr, self.credit = account
+            self._transactions = None
             return self
         else:
             print(f"[Warning] Account {nr} not found.")
             return None
 
-    def get_transactions(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM transactions WHERE account_nr = %s", [self.nr,])
-        transactions = cursor.fetchall()
+    @property
+    def transactions(self):
+        # Full history is only fetched when someone actually asks for it
+        if getattr(self, '_transactions', None) is None:
+            self._transactions = self.get_transactions()
+        return self._transactions
+
+    def get_transactions(self, since=None, until=None, limit=None, offset=0):
+        """
+        Fetch the account's transactions ordered by time.
+
+        since/until limit the time range (since inclusive, until exclusive) and
+        limit/offset page through the result.
+        """
+        query = "SELECT id, amount, account_nr, time FROM transactions WHERE account_nr = %s"
+        params = [self.nr]
+        if since is not None:
+            query += " AND time >= %s"
+            params.append(since)
+        if until is not None:
+            query += " AND time < %s"
+            params.append(until)
+        query += " ORDER BY time, id"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        if offset:
+            query += " OFFSET %s"
+            params.append(offset)
+
+        with self.db.cursor() as cursor:
+            cursor.execute(query, params)
+            transactions = cursor.fetchall()
         ts = []
         for transaction in transactions:
             ts.append({
                 "id": transaction[0],
                 "amount": transaction[1],
-                "account": transaction[2]
+                "account": transaction[2],
+                "time": transaction[3]
             })
         return ts
 
     def get_balance(self):
-        balance = 0
-        for transaction in self.get_transactions():
-            balance += transaction['amount']
+        # O(1): read the maintained balance instead of summing the history
+        with self.db.cursor() as cursor:
+            cursor.execute("SELECT balance FROM account_balances WHERE account_nr = %s", [self.nr])
+            row = cursor.fetchone()
+        self.balance = row[0] if row else 0
+        return self.balance
+
+    def reconcile_balance(self):
+        """
+        Recompute the balance with SUM over the transactions and repair the stored value.
+        """
+        with self.db.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE account_nr = %s", [self.nr])
+            balance = cursor.fetchone()[0]
+            cursor.execute(
+                "INSERT INTO account_balances (account_nr, balance) VALUES (%s, %s) "
+                "ON CONFLICT (account_nr) DO UPDATE SET balance = EXCLUDED.balance, updated_at = now() "
+                "WHERE account_balances.balance IS DISTINCT FROM EXCLUDED.balance",
+                [self.nr, balance])
+            if cursor.rowcount:
+                print(f"[Warning] Balance for account {self.nr} was out of sync, corrected to {balance}.")
         self.balance = balance
         return balance
 
@@ -79,9 +158,50 @@ class Account:
             Transaction().create(amount, self)
 
     def withdraw(self, amount):
-        if(amount <= self.get_balance() + self.credit):
-            Transaction().create(-amount, self)
-            return -amount
-        else:
+        """
+        Withdraw atomically. Returns -amount, or 0 when balance + credit does not cover it.
+        """
+        if amount <= 0:
+            return 0
+        balance = self.db.run_in_transaction(lambda cursor: self._debit(cursor, amount))
+        if balance is None:
             return 0
+        self.balance = balance
+        return -amount
+
+    def transfer(self, amount, to_account):
+        """
+        Move amount to another account in one database transaction.
 
+        Returns amount, or 0 when balance + credit does not cover it.
+        """
+        if amount <= 0 or to_account.nr == self.nr:
+            return 0
+        balance = self.db.run_in_transaction(lambda cursor: self._transfer(cursor, amount, to_account.nr))
+        if balance is None:
+            return 0
+        self.balance = balance
+        return amount
+
+    def _debit(self, cursor, amount):
+        cursor.execute(CONDITIONAL_DEBIT, [amount, self.nr, amount])
+        row = cursor.fetchone()
+        if row is None:
+            # Accounts without transactions have no balance row yet
+            cursor.execute("INSERT INTO account_balances (account_nr) VALUES (%s) ON CONFLICT DO NOTHING", [self.nr])
+            if cursor.rowcount:
+                cursor.execute(CONDITIONAL_DEBIT, [amount, self.nr, amount])
+                row = cursor.fetchone()
+        if row is None:
+            return None
+        Transaction.insert(cursor, -amount, self.nr, update_balance=False)
+        return row[0]
+
+    def _transfer(self, cursor, amount, to_nr):
+        # Lock both balance rows in account number order so opposite transfers cannot deadlock
+        if to_nr < self.nr:
+            cursor.execute("SELECT 1 FROM account_balances WHERE account_nr = %s FOR UPDATE", [to_nr])
+        balance = self._debit(cursor, amount)
+        if balance is not None:
+            Transaction.insert(cursor, amount, to_nr)
+        return balance
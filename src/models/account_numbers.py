@@ -0,0 +1,97 @@
+import os
+import re
+import threading
+
+from database.db import Db
+
+# Must match INCREMENT BY of account_number_seq (V5__add_account_number_sequence.sql)
+ACCOUNT_NUMBER_BLOCK_SIZE = 1000
+
+ACCOUNT_NUMBER_PATTERN = re.compile(r'^SE8902[A-Z]{4}\d{14}$')
+COUNTRY_CODE = "SE"
+CHECK_DIGITS = "89"
+CLEARING_PREFIX = "02"
+SERIAL_DIGITS = 12
+
+# IBAN check: move "SE89" to the end, replace letters with 10..35 and the
+# number must be 1 mod 97. Since the check digits are fixed at 89, the last two
+# digits of the number are chosen to satisfy the check instead.
+_TRAILER = int("".join(str(int(char, 36)) for char in COUNTRY_CODE + CHECK_DIGITS))
+_TRAILER_SCALE = 10 ** len(str(_TRAILER))
+_TRAILER_SCALE_INVERSE = pow(_TRAILER_SCALE, -1, 97)
+
+
+def _iban_digits(text):
+    return int("".join(str(int(char, 36)) for char in text))
+
+
+def format_account_number(code, serial):
+    """
+    Build SE8902 + code + 12-digit serial + 2 adjustment digits so the number passes the IBAN mod-97 check.
+    """
+    if not re.fullmatch(r'[A-Z]{4}', code):
+        raise ValueError(f"Account number code must be four letters A-Z, got {code!r}")
+    if not 0 <= serial < 10 ** SERIAL_DIGITS:
+        raise ValueError(f"Serial {serial} does not fit in {SERIAL_DIGITS} digits")
+    prefix = f"{CLEARING_PREFIX}{code}{serial:0{SERIAL_DIGITS}d}"
+    # (prefix * 100 + d) * scale + trailer == 1 (mod 97)  =>  solve for d
+    adjustment = ((1 - _TRAILER) * _TRAILER_SCALE_INVERSE - _iban_digits(prefix) * 100) % 97
+    return f"{COUNTRY_CODE}{CHECK_DIGITS}{prefix}{adjustment:02d}"
+
+
+def is_valid_account_number(nr):
+    """Format and IBAN checksum check."""
+    if not ACCOUNT_NUMBER_PATTERN.match(nr):
+        return False
+    return _iban_digits(nr[4:] + nr[:4]) % 97 == 1
+
+
+# Hands out account numbers from blocks reserved with one nextval per block,
+# so concurrent allocators (threads or processes) never collide and need no retries.
+class AccountNumberAllocator:
+
+    def __init__(self, code=None, block_size=ACCOUNT_NUMBER_BLOCK_SIZE):
+        self.code = code or os.getenv('ACCOUNT_NUMBER_CODE', 'BANK')
+        self.block_size = block_size
+        self.db = Db()
+        self._lock = threading.Lock()
+        self._blocks = []  # Reserved (next serial, end) ranges
+
+    def next(self):
+        return self.take(1)[0]
+
+    def take(self, count):
+        """Return count new account numbers, reserving all missing blocks in one round trip."""
+        with self._lock:
+            available = sum(end - start for start, end in self._blocks)
+            if count > available:
+                self._reserve_blocks(-(-(count - available) // self.block_size))
+            serials = []
+            while len(serials) < count:
+                start, end = self._blocks[0]
+                used = min(end - start, count - len(serials))
+                serials.extend(range(start, start + used))
+                if start + used == end:
+                    self._blocks.pop(0)
+                else:
+                    self._blocks[0] = (start + used, end)
+        return [format_account_number(self.code, serial) for serial in serials]
+
+    def _reserve_blocks(self, blocks):
+        with self.db.cursor() as cursor:
+            cursor.execute("SELECT nextval('account_number_seq') FROM generate_series(1, %s)", [blocks])
+            starts = sorted(row[0] for row in cursor.fetchall())
+        self._blocks.extend((start, start + self.block_size) for start in starts)
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_allocator(code=None):
+    """Shared allocator per code, so blocks are not wasted by short-lived instances."""
+    code = code or os.getenv('ACCOUNT_NUMBER_CODE', 'BANK')
+    with _allocators_lock:
+        if code not in _allocators:
+            _allocators[code] = AccountNumberAllocator(code)
+        return _allocators[code]
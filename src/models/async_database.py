@@ -0,0 +1,86 @@
+"""
+Asynchronous engine and session management (SQLAlchemy asyncio with asyncpg).
+
+Mirrors get_engine()/session_scope() in database_models for code that wants to
+overlap database round trips with CPU-bound work, see
+src.data_processing.async_export.
+"""
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict
+import logging
+
+from src.models.database_models import get_database_url, get_pool_settings, pool_settings_for_workers
+
+logger = logging.getLogger(__name__)
+
+_async_engine = None
+_async_session_factory = None
+_async_pool_overrides: Dict[str, int] = {}
+
+def get_async_database_url() -> str:
+    """Same database as get_database_url(), but through the asyncpg driver."""
+    return get_database_url().replace('postgresql://', 'postgresql+asyncpg://', 1)
+
+def get_async_pool_settings() -> Dict[str, int]:
+    """get_pool_settings() with the overrides from configure_async_engine() on top."""
+    return {**get_pool_settings(), **_async_pool_overrides}
+
+def get_async_engine() -> AsyncEngine:
+    """Return the shared async engine, creating it on first use."""
+    global _async_engine
+    if _async_engine is None:
+        from src.utils.pool_metrics import InstrumentedAsyncQueuePool, instrument_pool
+
+        url = get_async_database_url()
+        _async_engine = create_async_engine(
+            url, poolclass=InstrumentedAsyncQueuePool, **get_async_pool_settings()
+        )
+        # Samma poolmått till monitorn som för den synkrona enginen
+        instrument_pool(_async_engine)
+    return _async_engine
+
+async def configure_async_engine(workers: int = None, **pool_settings) -> None:
+    """
+    Change the pool configuration of the async engine only.
+
+    Same arguments as database_models.configure_engine(); the synchronous
+    engine and its pool are left alone. An existing async engine is disposed.
+    """
+    overrides = pool_settings_for_workers(workers) if workers is not None else {}
+    overrides.update(pool_settings)
+    await dispose_async_engine()
+    _async_pool_overrides.clear()
+    _async_pool_overrides.update(overrides)
+    logger.info(f"Async connection pool configured: {get_async_pool_settings()}")
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Return the async session factory bound to get_async_engine()."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        # expire_on_commit=False: lazy refresh is not possible on an AsyncSession
+        _async_session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_session_factory
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    """Provide a transactional scope around a series of async operations."""
+    session = get_async_session_factory()()
+    try:
+        yield session
+        await session.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Database error occurred: {str(e)}")
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+async def dispose_async_engine() -> None:
+    """Close all pooled connections, e.g. before the event loop shuts down."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
@@ -0,0 +1,131 @@
+"""
+Incrementally maintained account balances.
+
+Exporters add the per-account sum of every transaction batch to
+account_balances in the same database transaction as the batch itself, so a
+balance read is a single primary key lookup. reconcile_balances() recomputes
+the balances with SUM over the transactions table to detect and repair drift;
+history in detached partitions is taken from balance_snapshots.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List
+import logging
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.database_models import AccountBalance
+from src.models.partitions import oldest_attached_month
+
+logger = logging.getLogger(__name__)
+
+
+def balance_deltas(entries: Iterable[Dict]) -> Dict[int, Decimal]:
+    """
+    Sum transaction entries (dicts with account_id and amount) per account.
+    """
+    deltas = defaultdict(Decimal)
+    for entry in entries:
+        deltas[entry['account_id']] += Decimal(str(entry['amount']))
+    return dict(deltas)
+
+
+def balance_upsert_statement(deltas: Dict[int, Decimal]):
+    """
+    Build one INSERT ... ON CONFLICT statement adding deltas to the stored balances.
+
+    Rows are ordered by account_id so that concurrent writers lock the
+    balance rows in the same order.
+    """
+    stmt = pg_insert(AccountBalance).values([
+        {'account_id': account_id, 'balance': delta}
+        for account_id, delta in sorted(deltas.items())
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[AccountBalance.account_id],
+        set_={
+            'balance': AccountBalance.balance + stmt.excluded.balance,
+            'updated_at': func.now()
+        }
+    )
+
+
+def apply_balance_deltas(session, entries: List[Dict]) -> int:
+    """
+    Add the entries' amounts to account_balances within the session's transaction.
+
+    Returns the number of accounts updated.
+    """
+    deltas = balance_deltas(entries)
+    if deltas:
+        session.execute(balance_upsert_statement(deltas))
+    return len(deltas)
+
+
+def get_balance(session, account_id: int) -> Decimal:
+    """
+    Return the stored balance of an account (0 for accounts without transactions).
+    """
+    balance = session.execute(
+        select(AccountBalance.balance).where(AccountBalance.account_id == account_id)
+    ).scalar_one_or_none()
+    return balance if balance is not None else Decimal('0')
+
+
+def reconcile_balances(session, fix: bool = True) -> List[Dict]:
+    """
+    Compare the stored balances with SUM(amount) over the transactions table.
+
+    Months detached with detach_partitions() are no longer in transactions.
+    Each account therefore starts from its latest balance snapshot before
+    the oldest attached partition, and only the transactions after that
+    snapshot are summed. detach_partitions() refuses to detach months
+    without snapshots, so this covers the whole history.
+
+    Returns the accounts whose stored balance differs. With fix=True the
+    stored balances are overwritten with the expected values.
+    """
+    # Without attached partitions every transaction is archived in the snapshots
+    attached_from = oldest_attached_month(session.connection()) or date.max
+    drift = session.execute(text("""
+        WITH opening AS (
+            SELECT DISTINCT ON (account_id) account_id, snapshot_date, balance
+            FROM balance_snapshots
+            WHERE snapshot_date < :attached_from
+            ORDER BY account_id, snapshot_date DESC
+        ),
+        sums AS (
+            SELECT t.account_id, SUM(t.amount) AS balance
+            FROM transactions t
+            LEFT JOIN opening o ON o.account_id = t.account_id
+            WHERE o.snapshot_date IS NULL OR t.timestamp >= o.snapshot_date + 1
+            GROUP BY t.account_id
+        ),
+        expected AS (
+            SELECT COALESCE(o.account_id, s.account_id) AS account_id,
+                   COALESCE(o.balance, 0) + COALESCE(s.balance, 0) AS balance
+            FROM opening o
+            FULL OUTER JOIN sums s ON s.account_id = o.account_id
+        )
+        SELECT COALESCE(e.account_id, b.account_id) AS account_id,
+               COALESCE(e.balance, 0) AS expected,
+               b.balance AS stored
+        FROM expected e
+        FULL OUTER JOIN account_balances b ON b.account_id = e.account_id
+        WHERE b.balance IS DISTINCT FROM COALESCE(e.balance, 0)
+    """), {'attached_from': attached_from}).mappings().all()
+
+    mismatches = [dict(row) for row in drift]
+    if mismatches:
+        logger.warning(f"{len(mismatches)} account balances differ from the transaction history")
+        if fix:
+            stmt = pg_insert(AccountBalance).values([
+                {'account_id': row['account_id'], 'balance': row['expected']} for row in mismatches
+            ])
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=[AccountBalance.account_id],
+                set_={'balance': stmt.excluded.balance, 'updated_at': func.now()}
+            ))
+    return mismatches
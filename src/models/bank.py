@@ -3,32 +3,93 @@
 # can lend (from its own accounts)
 # can transfer (to/from other banks)
 
+import re
+from typing import NamedTuple, Optional
+
+from psycopg2.extras import execute_values
+
 from models.account import Account
+from models.account_numbers import get_allocator
 from database.db import Db
 
+SSN_PATTERN = re.compile(r'^\d{6}-\d{4}$')
+ONBOARD_CHUNK_SIZE = 5000
+
+
+class OnboardedCustomer(NamedTuple):
+    ssn: str
+    customer_id: int
+    account_id: int
+    account_nr: str
+    created: bool  # False when the customer already existed
+
+
+class RejectedRecord(NamedTuple):
+    index: int
+    ssn: Optional[str]
+    reason: str
+
+
+class OnboardingReport(NamedTuple):
+    onboarded: list
+    rejected: list
+
+
+def _ssn_check_digit_valid(ssn):
+    digits = ssn.replace('-', '')
+    total = 0
+    for i, char in enumerate(digits[:9]):
+        value = int(char) * (2 if i % 2 == 0 else 1)
+        total += value // 10 + value % 10
+    return (10 - total % 10) % 10 == int(digits[9])
+
+
+def validate_records(records):
+    """
+    Validate onboarding records (dicts with name, ssn and optionally type) in one pass.
+
+    Returns the accepted records as (index, record) pairs and the rejections.
+    Later duplicates of an ssn in the same input are rejected.
+    """
+    accepted, rejected, seen = [], [], set()
+    for index, record in enumerate(records):
+        ssn = (record.get('ssn') or '').strip()
+        name = (record.get('name') or '').strip()
+        if not name:
+            rejected.append(RejectedRecord(index, ssn or None, "Missing name"))
+        elif not SSN_PATTERN.match(ssn):
+            rejected.append(RejectedRecord(index, ssn or None, "Invalid ssn format, expected YYMMDD-XXXX"))
+        elif not _ssn_check_digit_valid(ssn):
+            rejected.append(RejectedRecord(index, ssn, "Invalid ssn check digit"))
+        elif ssn in seen:
+            rejected.append(RejectedRecord(index, ssn, "Duplicate ssn in input"))
+        else:
+            seen.add(ssn)
+            accepted.append((index, dict(record, ssn=ssn, name=name)))
+    return accepted, rejected
+
+
 class Bank:
     customers = []
     accounts = []
 
     def __init__(self):
-        self.conn = Db().get_conn()
+        self.db = Db()
 
     def create(self, name, banknr):
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self.db.cursor() as cursor:
                 cursor.execute("INSERT INTO banks (name, banknr) VALUES (%s, %s)", [name, banknr])
-                self.conn.commit()
-                print(f"Bank '{name}' created successfully. Getting data.")
+            print(f"Bank '{name}' created successfully. Getting data.")
         except:
             print(f"[Warning] Bank with name {name} already exists. Getting data.")
         return self.get(banknr)
 
     def get(self, banknr):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM banks WHERE banknr = %s", [banknr])
-        bank = cursor.fetchone()
-        if(bank[0]):
+        with self.db.cursor() as cursor:
+            cursor.execute("SELECT * FROM banks WHERE banknr = %s", [banknr])
+            bank = cursor.fetchone()
+        if bank:
             print(f"Bank loaded.")
             self.id = bank[0]
             self.name = bank[1]
@@ -46,4 +107,61 @@ class Bank:
     def add_account(self, customer, type, nr):
         new_account = Account().create(customer, self, type, nr)
         self.accounts.append(new_account)
-        return new_account
\ No newline at end of file
+        return new_account
+
+    def onboard_many(self, records, account_type="Personal_account", chunk_size=ONBOARD_CHUNK_SIZE):
+        """
+        Create customers with one account each using set-based statements.
+
+        records are dicts with name, ssn and optionally type. Customers that
+        already exist are reused, and they only get an account if they have
+        none of that type yet, so a re-run is safe. Each chunk is committed
+        on its own. Returns an OnboardingReport.
+        """
+        accepted, rejected = validate_records(records)
+        onboarded = []
+        for start in range(0, len(accepted), chunk_size):
+            chunk = [record for _, record in accepted[start:start + chunk_size]]
+            onboarded.extend(self._onboard_chunk(chunk, account_type))
+        print(f"Onboarded {len(onboarded)} customers, rejected {len(rejected)} records.")
+        return OnboardingReport(onboarded, rejected)
+
+    def _onboard_chunk(self, records, default_type):
+        ssns = [record['ssn'] for record in records]
+        types = {record['ssn']: record.get('type') or default_type for record in records}
+        with self.db.cursor() as cursor:
+            inserted = execute_values(
+                cursor,
+                "INSERT INTO customers (name, ssn) VALUES %s ON CONFLICT (ssn) DO NOTHING RETURNING id, ssn",
+                [(record['name'], record['ssn']) for record in records],
+                page_size=1000, fetch=True)
+            customer_ids = {ssn: customer_id for customer_id, ssn in inserted}
+            new_ssns = set(customer_ids)
+
+            existing_accounts = {}
+            if len(customer_ids) < len(ssns):
+                cursor.execute("SELECT id, ssn FROM customers WHERE ssn = ANY(%s)",
+                               [[ssn for ssn in ssns if ssn not in new_ssns]])
+                existing = {ssn: customer_id for customer_id, ssn in cursor.fetchall()}
+                customer_ids.update(existing)
+                cursor.execute(
+                    "SELECT customer, type, id, nr FROM accounts WHERE customer = ANY(%s) AND bank = %s",
+                    [list(existing.values()), self.id])
+                for customer_id, type, account_id, nr in cursor.fetchall():
+                    existing_accounts.setdefault((customer_id, type), (account_id, nr))
+
+            missing = [ssn for ssn in ssns if (customer_ids[ssn], types[ssn]) not in existing_accounts]
+            numbers = get_allocator().take(len(missing))
+            created_accounts = execute_values(
+                cursor,
+                "INSERT INTO accounts (customer, bank, type, nr, credit) VALUES %s RETURNING customer, type, id, nr",
+                [(customer_ids[ssn], self.id, types[ssn], nr, 0) for ssn, nr in zip(missing, numbers)],
+                page_size=1000, fetch=True) if missing else []
+            for customer_id, type, account_id, nr in created_accounts:
+                existing_accounts[(customer_id, type)] = (account_id, nr)
+
+        results = []
+        for ssn in ssns:
+            account_id, nr = existing_accounts[(customer_ids[ssn], types[ssn])]
+            results.append(OnboardedCustomer(ssn, customer_ids[ssn], account_id, nr, ssn in new_ssns))
+        return results
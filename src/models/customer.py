@@ -12,41 +12,66 @@ class Customer:
     accounts = []
 
     def __init__(self): # konstruktor
-        self.conn = Db().get_conn()
+        self.db = Db()
 
     def create(self, name, ssn):
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self.db.cursor() as cursor:
                 cursor.execute("INSERT INTO customers (name, ssn) VALUES (%s, %s)",[name, ssn])
-                self.conn.commit()
-                print(f"Customer '{name}' created successfully. Getting data.")
+            print(f"Customer '{name}' created successfully. Getting data.")
         except:
             print(f"[Warning] Customer {name} already exists. Getting data.")
         return self.get(ssn)
 
+    # Customer and its accounts in one round trip; customers without accounts get NULL account columns
+    CUSTOMER_WITH_ACCOUNTS = """
+        SELECT c.id, c.name, c.ssn, a.id, a.customer, a.bank, a.type, a.nr, a.credit
+        FROM customers c
+        LEFT JOIN accounts a ON a.customer = c.id
+        WHERE {condition}
+        ORDER BY c.id, a.id
+    """
+
     def get(self, ssn):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM customers WHERE ssn = %s", [ssn])
-        customer = cursor.fetchone()
-        if(customer[0]):
+        with self.db.cursor() as cursor:
+            cursor.execute(self.CUSTOMER_WITH_ACCOUNTS.format(condition="c.ssn = %s"), [ssn])
+            rows = cursor.fetchall()
+        if rows:
             print(f"Customer loaded.")
-            self.id = customer[0]
-            self.name = customer[1]
-            self.ssn = customer[2]
-            self.accounts = self.get_accounts()
+            self._load_rows(rows)
             return self
         else:
             print(f"[Warning] Customer with ssn {ssn} not found.")
             return None
 
-    def get_accounts(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM accounts WHERE customer = %s", [self.id,])
-        accounts = cursor.fetchall()
-        accs = []
-        for account in accounts:
-            accs.append(Account().get(account[4]))
-        return accs
+    @classmethod
+    def get_many(cls, ssns):
+        """
+        Load many customers with their accounts in a single query.
+
+        Returns a dict keyed by ssn; ssns that do not exist are left out.
+        """
+        db = Db()
+        with db.cursor() as cursor:
+            cursor.execute(cls.CUSTOMER_WITH_ACCOUNTS.format(condition="c.ssn = ANY(%s)"), [list(ssns)])
+            rows = cursor.fetchall()
 
+        rows_by_customer = {}
+        for row in rows:
+            rows_by_customer.setdefault(row[0], []).append(row)
+        customers = {}
+        for customer_rows in rows_by_customer.values():
+            customer = cls()
+            customer._load_rows(customer_rows)
+            customers[customer.ssn] = customer
+        return customers
 
+    def _load_rows(self, rows):
+        self.id, self.name, self.ssn = rows[0][:3]
+        self.accounts = [Account.from_row(row[3:]) for row in rows if row[3] is not None]
+
+    def get_accounts(self):
+        with self.db.cursor() as cursor:
+            cursor.execute(f"SELECT {Account.ACCOUNT_COLUMNS} FROM accounts WHERE customer = %s ORDER BY id", [self.id,])
+            accounts = cursor.fetchall()
+        return [Account.from_row(account) for account in accounts]
@@ -0,0 +1,174 @@
+"""
+Per-account daily transaction rollup.
+
+account_daily_stats holds, per account and calendar day, the number of
+transactions, the net and outgoing sums, the smallest and largest amount and
+the international count and amount. Exporters add every load batch to it in
+the same database transaction as the batch (apply_daily_stats), so daily
+limit checks and reports read one row per account and day instead of
+aggregating transactions. rebuild_daily_stats() recomputes a date range from
+the transactions table.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse
+import logging
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.database_models import AccountDailyStat, session_scope
+
+logger = logging.getLogger(__name__)
+
+HOME_COUNTRY = 'Sweden'
+
+SUM_COLUMNS = ('transaction_count', 'outgoing_count', 'total_amount', 'outgoing_amount',
+               'international_count', 'international_amount')
+
+# Same definitions as daily_stats_rows(), computed over a range of transactions
+REBUILD_QUERY = text(f"""
+    INSERT INTO account_daily_stats (account_id, stat_date, transaction_count, outgoing_count,
+                                     total_amount, outgoing_amount, min_amount, max_amount,
+                                     international_count, international_amount, updated_at)
+    SELECT account_id, timestamp::date,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE amount < 0),
+           SUM(amount),
+           COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0),
+           MIN(amount),
+           MAX(amount),
+           COUNT(*) FILTER (WHERE international),
+           COALESCE(SUM(abs(amount)) FILTER (WHERE international), 0),
+           now()
+    FROM (
+        SELECT account_id, timestamp, amount,
+               COALESCE(sender_country, '{HOME_COUNTRY}') <> '{HOME_COUNTRY}'
+               OR COALESCE(receiver_country, '{HOME_COUNTRY}') <> '{HOME_COUNTRY}' AS international
+        FROM transactions
+        WHERE timestamp >= :start AND timestamp < :end
+    ) t
+    GROUP BY account_id, timestamp::date
+""")
+
+
+def _is_international(entry: Dict) -> bool:
+    sender_country = entry.get('sender_country') or HOME_COUNTRY
+    receiver_country = entry.get('receiver_country') or HOME_COUNTRY
+    return sender_country != HOME_COUNTRY or receiver_country != HOME_COUNTRY
+
+
+def daily_stats_rows(entries: Iterable[Dict]) -> List[Dict]:
+    """
+    Aggregate transaction entries (dicts with account_id, timestamp, amount and
+    the country columns) into one rollup row per account and day.
+
+    Rows are ordered by (account_id, stat_date).
+    """
+    rows: Dict[Tuple[int, date], Dict] = {}
+    for entry in entries:
+        amount = Decimal(str(entry['amount']))
+        key = (entry['account_id'], entry['timestamp'].date())
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                'account_id': key[0], 'stat_date': key[1],
+                'transaction_count': 0, 'outgoing_count': 0,
+                'total_amount': Decimal('0'), 'outgoing_amount': Decimal('0'),
+                'min_amount': amount, 'max_amount': amount,
+                'international_count': 0, 'international_amount': Decimal('0'),
+            }
+        row['transaction_count'] += 1
+        row['total_amount'] += amount
+        if amount < 0:
+            row['outgoing_count'] += 1
+            row['outgoing_amount'] -= amount
+        row['min_amount'] = min(row['min_amount'], amount)
+        row['max_amount'] = max(row['max_amount'], amount)
+        if _is_international(entry):
+            row['international_count'] += 1
+            row['international_amount'] += abs(amount)
+    return [rows[key] for key in sorted(rows)]
+
+
+def daily_stats_upsert_statement(rows: List[Dict]):
+    """
+    Build one INSERT ... ON CONFLICT statement merging rollup rows into account_daily_stats.
+
+    Counts and sums are added to the stored values and min/max are widened.
+    Rows should be ordered by key (as daily_stats_rows() returns them) so
+    that concurrent writers lock them in the same order.
+    """
+    stmt = pg_insert(AccountDailyStat).values(rows)
+    set_ = {column: getattr(AccountDailyStat, column) + getattr(stmt.excluded, column)
+            for column in SUM_COLUMNS}
+    set_.update({
+        'min_amount': func.least(AccountDailyStat.min_amount, stmt.excluded.min_amount),
+        'max_amount': func.greatest(AccountDailyStat.max_amount, stmt.excluded.max_amount),
+        'updated_at': func.now(),
+    })
+    return stmt.on_conflict_do_update(
+        index_elements=[AccountDailyStat.account_id, AccountDailyStat.stat_date],
+        set_=set_
+    )
+
+
+def apply_daily_stats(session, entries: List[Dict]) -> int:
+    """
+    Add the entries to account_daily_stats within the session's transaction.
+
+    Returns the number of rollup rows touched.
+    """
+    rows = daily_stats_rows(entries)
+    if rows:
+        session.execute(daily_stats_upsert_statement(rows))
+    return len(rows)
+
+
+def rebuild_daily_stats(session, since: date, until: date) -> int:
+    """
+    Recompute the rollup for all days from since through until (inclusive).
+
+    The existing rows of those days are replaced in the session's
+    transaction. Returns the number of rows written.
+    """
+    start = datetime.combine(since, time.min)
+    end = datetime.combine(until + timedelta(days=1), time.min)
+    session.execute(text("""
+        DELETE FROM account_daily_stats WHERE stat_date >= :since AND stat_date <= :until
+    """), {'since': since, 'until': until})
+    written = session.execute(REBUILD_QUERY, {'start': start, 'end': end}).rowcount
+    logger.info(f"Rebuilt {written} daily stats rows for {since} to {until}")
+    return written
+
+
+def get_daily_stats(session, account_ids: Sequence[int], since: date,
+                    until: Optional[date] = None) -> List[AccountDailyStat]:
+    """
+    Rollup rows of the given accounts from since through until (defaults to since).
+    """
+    until = until or since
+    return session.execute(
+        select(AccountDailyStat)
+        .where(AccountDailyStat.account_id.in_(list(account_ids)),
+               AccountDailyStat.stat_date >= since,
+               AccountDailyStat.stat_date <= until)
+        .order_by(AccountDailyStat.account_id, AccountDailyStat.stat_date)
+    ).scalars().all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the per-account daily rollup")
+    parser.add_argument('--since', type=date.fromisoformat, required=True)
+    parser.add_argument('--until', type=date.fromisoformat, help="Defaults to today")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with session_scope() as session:
+        written = rebuild_daily_stats(session, args.since, args.until or date.today())
+    print(f"Wrote {written} daily stats rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,99 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, CheckConstraint, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Date, DateTime, Numeric, CheckConstraint, Index, UniqueConstraint, create_engine, event, func
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 from contextlib import contextmanager
 import os
-from dotenv import load_dotenv
 import logging
-from typing import Generator
+import threading
+from typing import Dict, Generator
 import time
 from functools import wraps
 
-# Konfigurera logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Ladda miljövariabler
-load_dotenv()
+# Engine och session factory skapas först vid första användning (se get_engine),
+# så att import av modellerna inte kostar en .env-läsning och en connection pool.
+_engine = None
+_session_factory = None
+_scoped_session = None
+_bulk_session_factory = None
+_engine_lock = threading.Lock()
 
-# Databasanslutningskonfiguration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'bank_db'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
+# Inställningar för connection pool, kan överstyras via miljövariabler eller configure_engine
+DEFAULT_POOL_SETTINGS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 1800  # Recycle connections after 30 minutes
 }
+_pool_overrides: Dict[str, int] = {}
 
-# Skapa connection URL
-DATABASE_URL = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+# Antal rader per INSERT-sats när bulk_session_scope batchar med insertmanyvalues
+BULK_INSERT_PAGE_SIZE = 5000
+
+def get_db_config() -> Dict[str, str]:
+    """Read the database connection settings from the environment (.env is loaded on first call)."""
+    from dotenv import load_dotenv
+
+    # Ladda miljövariabler
+    load_dotenv()
+
+    # Databasanslutningskonfiguration
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'database': os.getenv('DB_NAME', 'bank_db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean environment variable; only 1/true/yes/on (any case) count as true."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def pool_settings_for_workers(workers: int) -> Dict[str, int]:
+    """
+    Size the pool for a given number of parallel export workers.
+
+    Every worker gets its own pooled connection plus one for the coordinating
+    thread, so workers never wait on each other; a small overflow covers
+    short-lived extra checkouts such as lookups or profiling queries.
+    """
+    workers = max(int(workers), 1)
+    return {
+        'pool_size': workers + 1,
+        'max_overflow': max(2, workers // 2)
+    }
+
+def get_pool_settings() -> Dict[str, int]:
+    """
+    Resolve pool settings; later steps win over earlier ones:
+
+    1. DEFAULT_POOL_SETTINGS
+    2. DB_POOL_WORKERS, worker-based sizing (pool_settings_for_workers)
+    3. DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_TIMEOUT, single values
+    4. configure_engine() overrides, ordered the same way (workers, then keywords)
+
+    So DB_POOL_SIZE=20 with DB_POOL_WORKERS=4 gives pool_size 20 and the
+    worker-based max_overflow.
+    """
+    settings = dict(DEFAULT_POOL_SETTINGS)
+    if os.getenv('DB_POOL_WORKERS'):
+        settings.update(pool_settings_for_workers(int(os.getenv('DB_POOL_WORKERS'))))
+    for env_name, key in (('DB_POOL_SIZE', 'pool_size'), ('DB_MAX_OVERFLOW', 'max_overflow'),
+                          ('DB_POOL_TIMEOUT', 'pool_timeout')):
+        if os.getenv(env_name):
+            settings[key] = int(os.getenv(env_name))
+    settings.update(_pool_overrides)
+    return settings
+
+def get_database_url() -> str:
+    """Build the connection URL from get_db_config()."""
+    config = get_db_config()
+    return f"postgresql://{config['user']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
 
 # Retry decorator för databasoperationer
 def retry_on_error(max_retries: int = 3, delay: float = 1.0):
@@ -53,26 +115,143 @@ def retry_on_error(max_retries: int = 3, delay: float = 1.0):
         return wrapper
     return decorator
 
-# Skapa engine med connection pooling
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800,  # Recycle connections after 30 minutes
-    echo=bool(os.getenv('SQL_ECHO', 'False'))
-)
-
-# Skapa session factory
-SessionFactory = sessionmaker(bind=engine)
-ScopedSession = scoped_session(SessionFactory)
+def get_engine():
+    """Return the shared engine, creating it and its connection pool on first use."""
+    global _engine
+    if _engine is None:
+        from src.utils.pool_metrics import InstrumentedQueuePool, instrument_pool
+        from src.utils.query_profiler import profiler
+
+        url = get_database_url()  # Läser .env, måste ske före get_pool_settings
+        with _engine_lock:
+            if _engine is None:
+                # Skapa engine med connection pooling
+                engine = create_engine(
+                    url,
+                    poolclass=InstrumentedQueuePool,
+                    **get_pool_settings(),
+                    executemany_mode='values_plus_batch',  # Batcha executemany (även UPDATE) i psycopg2
+                    echo=env_flag('SQL_ECHO')  # bool('False') är True, därför env_flag
+                )
+                # Checkout-väntetid, in-use/overflow och anslutningarnas livslängd till monitorn
+                instrument_pool(engine)
+                # Tid och antal anrop per SQL-fingerprint, långsamma frågor loggas med EXPLAIN
+                if env_flag('SQL_PROFILE', default=True):
+                    profiler.attach(engine)
+                _engine = engine
+    return _engine
+
+def configure_engine(workers: int = None, **pool_settings) -> None:
+    """
+    Change the pool configuration used by get_engine().
+
+    workers sizes the pool for that many parallel export workers (see
+    pool_settings_for_workers); keyword arguments such as pool_size or
+    pool_timeout override single settings. An already created engine is
+    disposed, so the next get_engine() call builds one with the new pool.
+    """
+    global _engine, _session_factory, _scoped_session, _bulk_session_factory
+    overrides = pool_settings_for_workers(workers) if workers is not None else {}
+    overrides.update(pool_settings)
+    with _engine_lock:
+        _pool_overrides.clear()
+        _pool_overrides.update(overrides)
+        if _scoped_session is not None:
+            _scoped_session.remove()
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+        _scoped_session = None
+        _bulk_session_factory = None
+    logger.info(f"Connection pool configured: {get_pool_settings()}")
+
+def get_session_factory() -> sessionmaker:
+    """Return the session factory bound to get_engine()."""
+    global _session_factory
+    if _session_factory is None:
+        engine = get_engine()
+        with _engine_lock:
+            if _session_factory is None:
+                # Skapa session factory
+                _session_factory = sessionmaker(bind=engine)
+    return _session_factory
+
+def get_scoped_session() -> scoped_session:
+    """Return the thread-local session registry used by session_scope()."""
+    global _scoped_session
+    if _scoped_session is None:
+        factory = get_session_factory()
+        with _engine_lock:
+            if _scoped_session is None:
+                _scoped_session = scoped_session(factory)
+    return _scoped_session
+
+def get_bulk_session_factory() -> sessionmaker:
+    """
+    Return the session factory used by bulk_session_scope().
+
+    Sessions have autoflush and expire_on_commit turned off, batch INSERTs
+    in pages of BULK_INSERT_PAGE_SIZE rows and run every transaction with
+    synchronous_commit off.
+    """
+    global _bulk_session_factory
+    if _bulk_session_factory is None:
+        engine = get_engine()
+        with _engine_lock:
+            if _bulk_session_factory is None:
+                factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+                @event.listens_for(factory, 'after_begin')
+                def _configure_bulk_transaction(session, transaction, connection):
+                    # Gäller bara den pågående transaktionen; commit väntar inte på WAL-flush.
+                    connection.exec_driver_sql("SET LOCAL synchronous_commit TO OFF")
+                    connection.execution_options(insertmanyvalues_page_size=BULK_INSERT_PAGE_SIZE)
+
+                _bulk_session_factory = factory
+    return _bulk_session_factory
+
+def __getattr__(name):
+    # Bakåtkompatibilitet: engine, SessionFactory, ScopedSession, DB_CONFIG och
+    # DATABASE_URL var tidigare modulvariabler som skapades vid import.
+    lazy_attributes = {
+        'engine': get_engine,
+        'SessionFactory': get_session_factory,
+        'ScopedSession': get_scoped_session,
+        'DB_CONFIG': get_db_config,
+        'DATABASE_URL': get_database_url
+    }
+    if name in lazy_attributes:
+        return lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Context manager för sessionshantering
 @contextmanager
 def session_scope() -> Generator:
     """Provide a transactional scope around a series of operations."""
-    session = ScopedSession()
+    session = get_scoped_session()()
+    try:
+        yield session
+        session.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Database error occurred: {str(e)}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+# Context manager för högvolymsladdningar
+@contextmanager
+def bulk_session_scope() -> Generator:
+    """
+    Transactional scope for high-volume loads, see get_bulk_session_factory().
+
+    Objects stay loaded after commit and nothing is flushed implicitly, so
+    callers must flush() when they need generated ids. A crash can lose the
+    last commits before they reach disk, so only use this for loads that
+    can be re-run.
+    """
+    session = get_bulk_session_factory()()
     try:
         yield session
         session.commit()
@@ -133,28 +312,101 @@ class Account(Base):
     # Constraints
     __table_args__ = (
         CheckConstraint(r"account_number ~ '^SE8902[A-Z]{4}\d{14}$'", name='valid_account_number_format'),
+        Index('ix_accounts_customer_id', 'customer_id'),  # Kundens konton
     )
     
     # Relationships
     bank = relationship("Bank", back_populates="accounts")
     customer = relationship("Customer", back_populates="accounts")
     transactions = relationship("Transaction", back_populates="account")
+    balance = relationship("AccountBalance", back_populates="account", uselist=False)
 
 class Transaction(Base):
     __tablename__ = 'transactions'
     
-    id = Column(Integer, primary_key=True)
-    transaction_id = Column(String(36), unique=True, nullable=False)  # UUID format
+    # Tabellen är partitionerad per månad på timestamp, så partitionsnyckeln
+    # måste ingå i primärnyckeln och i unika constraints (se src/models/partitions.py)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    transaction_id = Column(String(36), nullable=False)  # UUID format, unik tillsammans med transaction_type
     account_id = Column(Integer, ForeignKey('accounts.id'), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     currency = Column(String(3), nullable=False)
-    timestamp = Column(DateTime, nullable=False)
+    timestamp = Column(DateTime, primary_key=True)
     sender_country = Column(String(50))
     sender_municipality = Column(String(50))
     receiver_country = Column(String(50))
     receiver_municipality = Column(String(50))
-    transaction_type = Column(String(20), nullable=False)  # incoming/outgoing
+    transaction_type = Column(String(20), nullable=False)  # credit/debit
     notes = Column(String(200))
     
+    __table_args__ = (
+        # Varje överföring ger en credit- och en debit-rad med samma transaction_id
+        UniqueConstraint('transaction_id', 'transaction_type', 'timestamp', name='transactions_transaction_id_type_key'),
+        # Saldo och kontoutdrag: ett kontos transaktioner i tidsordning
+        Index('ix_transactions_account_id_timestamp', 'account_id', 'timestamp'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+    
     # Relationships
-    account = relationship("Account", back_populates="transactions") 
\ No newline at end of file
+    account = relationship("Account", back_populates="transactions")
+
+class AccountBalance(Base):
+    __tablename__ = 'account_balances'
+    
+    # Löpande saldo per konto, uppdateras i samma transaktion som transaktionerna skrivs
+    account_id = Column(Integer, ForeignKey('accounts.id'), primary_key=True)
+    balance = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+    
+    # Relationships
+    account = relationship("Account", back_populates="balance")
+
+class BalanceSnapshot(Base):
+    __tablename__ = 'balance_snapshots'
+    
+    # Utgående saldo vid slutet av snapshot_date (dag- eller månadsskifte)
+    account_id = Column(Integer, ForeignKey('accounts.id'), primary_key=True)
+    snapshot_date = Column(Date, primary_key=True)
+    balance = Column(Numeric(14, 2), nullable=False)
+
+class AccountDailyStat(Base):
+    __tablename__ = 'account_daily_stats'
+    
+    # Förberäknad sammanställning av ett kontos transaktioner per dag, för
+    # dagsgränser och rapporter (se src/models/daily_stats.py)
+    account_id = Column(Integer, ForeignKey('accounts.id'), primary_key=True)
+    stat_date = Column(Date, primary_key=True)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    outgoing_count = Column(Integer, nullable=False, default=0)  # credit-rader (negativt belopp)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)  # Nettobelopp
+    outgoing_amount = Column(Numeric(14, 2), nullable=False, default=0)  # Summa av utgående belopp, positivt
+    min_amount = Column(Numeric(10, 2), nullable=False)
+    max_amount = Column(Numeric(10, 2), nullable=False)
+    international_count = Column(Integer, nullable=False, default=0)
+    international_amount = Column(Numeric(14, 2), nullable=False, default=0)  # Absolutbelopp
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+class IngestionState(Base):
+    __tablename__ = 'ingestion_state'
+    
+    # Hur långt en källfil har lästs in, för inkrementella körningar (se src/data_processing/ingestion_state.py)
+    source = Column(String(255), primary_key=True)  # Absolut sökväg till filen
+    fingerprint = Column(String(64), nullable=False)  # SHA-256 av filens början och bytes före byte_offset
+    byte_offset = Column(BigInteger, nullable=False)  # Första byte som inte har lästs in
+    row_count = Column(BigInteger, nullable=False)  # Antal inlästa rader totalt
+    max_timestamp = Column(DateTime)  # Senaste Timestamp i inlästa rader, om filen har en sådan kolumn
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+class ExportCheckpoint(Base):
+    __tablename__ = 'export_checkpoints'
+    
+    # Färdiga batcher i en databasexport, så att en avbruten körning kan fortsätta
+    # (se src/models/export_checkpoints.py). Skrivs i samma transaktion som batchen.
+    # batch_end ingår i nyckeln så att en körning med annan batchstorlek inte
+    # krockar med eller hoppar över batcher från en tidigare körning.
+    input_fingerprint = Column(String(64), primary_key=True)  # SHA-256 av indata
+    table_name = Column(String(50), primary_key=True)
+    batch_start = Column(Integer, primary_key=True)
+    batch_end = Column(Integer, primary_key=True)
+    row_count = Column(Integer, nullable=False)
+    completed_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -0,0 +1,64 @@
+"""
+Checkpoints of completed export batches.
+
+export_to_database records every batch it commits in export_checkpoints,
+keyed by a fingerprint of the input frame, the target table and the batch's
+row range (start and end, so a run with another batch size does not mistake
+the old batches for its own). The checkpoint row is written in the same database transaction
+as the batch, so a batch is either committed and recorded or neither. A
+restarted export of the same input skips the recorded batches and resumes at
+the first incomplete one.
+"""
+from typing import Optional, Set, Tuple
+import hashlib
+import logging
+
+import pandas as pd
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.models.database_models import ExportCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def frame_fingerprint(frame: pd.DataFrame) -> str:
+    """SHA-256 over the column names and row contents of a frame."""
+    digest = hashlib.sha256()
+    digest.update('\x1f'.join(map(str, frame.columns)).encode())
+    if not frame.empty:
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def completed_batches(session, fingerprint: str, table_name: str) -> Set[Tuple[int, int]]:
+    """(batch_start, batch_end) of the batches already exported for this input."""
+    rows = session.execute(
+        select(ExportCheckpoint.batch_start, ExportCheckpoint.batch_end)
+        .where(ExportCheckpoint.input_fingerprint == fingerprint,
+               ExportCheckpoint.table_name == table_name)
+    ).tuples().all()
+    return set(rows)
+
+
+def record_batch(session, fingerprint: str, table_name: str, batch_start: int,
+                 batch_end: int, row_count: int) -> None:
+    """Record a batch as done; call before committing the batch."""
+    session.execute(
+        pg_insert(ExportCheckpoint).values(
+            input_fingerprint=fingerprint, table_name=table_name, batch_start=batch_start,
+            batch_end=batch_end, row_count=row_count
+        ).on_conflict_do_nothing()
+    )
+
+
+def clear_checkpoints(session, fingerprint: Optional[str] = None) -> int:
+    """
+    Remove the checkpoints of one input, or all of them.
+
+    Returns the number of checkpoints removed.
+    """
+    stmt = delete(ExportCheckpoint)
+    if fingerprint is not None:
+        stmt = stmt.where(ExportCheckpoint.input_fingerprint == fingerprint)
+    return session.execute(stmt).rowcount
@@ -0,0 +1,293 @@
+"""
+Monthly range partitions of the transactions table.
+
+transactions is partitioned by RANGE (timestamp) with one partition per
+calendar month, named transactions_yYYYYmMM. This module creates partitions
+ahead of time (ensure_partitions / ensure_future_partitions), detaches and
+archives old ones, and copies prepared entries into the partition each month
+belongs to, skipping rows that are already stored (copy_transactions).
+
+Queries that filter on timestamp only touch the matching partitions, so
+statements and balance_as_of() stay fast as the table grows.
+"""
+from datetime import date, datetime
+from io import StringIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import csv
+import logging
+import os
+import re
+import threading
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'transactions'
+ARCHIVE_SCHEMA = 'archive'
+DEFAULT_MONTHS_AHEAD = 3
+PARTITION_PATTERN = re.compile(r'^transactions_y(\d{4})m(\d{2})$')
+COPY_STAGING_TABLE = 'transactions_copy_staging'
+
+COPY_COLUMNS = ['transaction_id', 'account_id', 'amount', 'currency', 'timestamp',
+                'sender_country', 'sender_municipality', 'receiver_country',
+                'receiver_municipality', 'transaction_type', 'notes']
+
+# Months known to have a partition; avoids a catalog lookup (and a lock on
+# the parent table) for every batch
+_known_months = set()
+_known_months_lock = threading.Lock()
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def months_between(start, end) -> List[date]:
+    """All month starts from start's month through end's month."""
+    months, month, last = [], month_start(start), month_start(end)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def list_partitions(connection) -> List[str]:
+    """Names of the monthly partitions currently attached to transactions."""
+    rows = connection.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = :parent
+        ORDER BY child.relname
+    """), {'parent': PARENT_TABLE}).scalars().all()
+    return [name for name in rows if PARTITION_PATTERN.match(name)]
+
+
+def _partition_month(name: str) -> date:
+    year, month = PARTITION_PATTERN.match(name).groups()
+    return date(int(year), int(month), 1)
+
+
+def oldest_attached_month(connection) -> Optional[date]:
+    """First month still attached to transactions, None when no partition is attached."""
+    partitions = list_partitions(connection)
+    return _partition_month(partitions[0]) if partitions else None
+
+
+def ensure_partitions(connection, start, end) -> List[str]:
+    """
+    Make sure a partition exists for every month from start through end.
+
+    Returns the names of the partitions that were created.
+    """
+    months = months_between(start, end)
+    with _known_months_lock:
+        missing = [month for month in months if month not in _known_months]
+    if not missing:
+        return []
+
+    existing = {_partition_month(name) for name in list_partitions(connection)}
+    created = []
+    for month in missing:
+        if month not in existing:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            created.append(partition_name(month))
+    # Newly created partitions are only cached once a later call sees them in
+    # the catalog, i.e. after the creating transaction has committed
+    with _known_months_lock:
+        _known_months.update(month for month in missing if month in existing)
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+def ensure_future_partitions(connection, months_ahead: int = DEFAULT_MONTHS_AHEAD) -> List[str]:
+    """Create the partitions for the current month and months_ahead months after it."""
+    this_month = month_start(date.today())
+    return ensure_partitions(connection, this_month, add_months(this_month, months_ahead))
+
+
+def detach_partitions(connection, older_than: date, archive_dir: Optional[str] = None) -> List[str]:
+    """
+    Detach the partitions of all months before older_than's month.
+
+    Detached partitions are moved to the archive schema. With archive_dir
+    each one is also written to <archive_dir>/<partition>.parquet and then
+    dropped. balance_as_of() and reconcile_balances() only see transactions
+    that are still attached and take the earlier history from
+    balance_snapshots, so a month is only detached once every account with
+    transactions in it has a snapshot (see build_snapshots()); otherwise
+    ValueError is raised and nothing is detached.
+    """
+    cutoff = month_start(older_than)
+    to_detach = [name for name in list_partitions(connection) if _partition_month(name) < cutoff]
+    unsnapshotted = [name for name in to_detach if not _covered_by_snapshots(connection, name)]
+    if unsnapshotted:
+        raise ValueError(f"No balance snapshots for all accounts in {', '.join(unsnapshotted)}; "
+                         f"run build_snapshots() for these months before detaching them")
+
+    detached = []
+    for name in to_detach:
+        connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        if archive_dir:
+            _write_parquet(connection, name, Path(archive_dir))
+            connection.execute(text(f"DROP TABLE {name}"))
+        else:
+            connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+            connection.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        detached.append(name)
+        with _known_months_lock:
+            _known_months.discard(_partition_month(name))
+    if detached:
+        logger.info(f"Detached partitions: {', '.join(detached)}")
+    return detached
+
+
+def _covered_by_snapshots(connection, name: str) -> bool:
+    """
+    True when every account with transactions in the partition has a balance
+    snapshot dated on or after its transactions within the partition's month.
+    """
+    month = _partition_month(name)
+    return not connection.execute(text(f"""
+        SELECT EXISTS (
+            SELECT 1
+            FROM {name} t
+            WHERE NOT EXISTS (
+                SELECT 1 FROM balance_snapshots s
+                WHERE s.account_id = t.account_id
+                  AND s.snapshot_date >= t.timestamp::date
+                  AND s.snapshot_date < :next_month
+            )
+        )
+    """), {'next_month': add_months(month, 1)}).scalar()
+
+
+def _write_parquet(connection, name: str, archive_dir: Path) -> Path:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    target = archive_dir / f"{name}.parquet"
+    tmp_target = target.with_name(target.name + '.tmp')
+    # stream_results on the statement only; set on the connection it would also
+    # apply to the DROP/DETACH statements that follow
+    query = text(f"SELECT * FROM {name}").execution_options(stream_results=True)
+    frames = pd.read_sql(query, connection, chunksize=50_000)
+    writer = None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_target, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp_target, target)
+    return target
+
+
+def _copy_value(value):
+    # Explicit NULL marker, so empty strings stay empty strings
+    if value is None or (isinstance(value, float) and value != value):
+        return '\\N'
+    return value
+
+
+def copy_transactions(connection, entries: Iterable[Dict]) -> List[Tuple[str, str, datetime]]:
+    """
+    COPY prepared transaction entries into their monthly partitions, skipping stored ones.
+
+    The entries are COPYed into a temporary staging table and moved into
+    each month's partition with INSERT ... ON CONFLICT DO NOTHING, so rows
+    that already exist (from an earlier or differently batched run) are
+    skipped instead of failing the batch. Writing to the partition skips the
+    per-row routing through the parent table. Missing partitions are created
+    first. Returns (transaction_id, transaction_type, timestamp) of the rows
+    actually inserted.
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+    months = sorted({month_start(entry['timestamp']) for entry in entries})
+    ensure_partitions(connection, months[0], months[-1])
+
+    columns = ', '.join(COPY_COLUMNS)
+    connection.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {COPY_STAGING_TABLE} ON COMMIT DELETE ROWS "
+        f"AS SELECT {columns} FROM {PARENT_TABLE} WITH NO DATA"
+    ))
+    # Rows of a failed earlier batch in the same transaction must not be inserted
+    connection.execute(text(f"TRUNCATE {COPY_STAGING_TABLE}"))
+
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for entry in entries:
+        writer.writerow([_copy_value(entry.get(column)) for column in COPY_COLUMNS])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {COPY_STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+    finally:
+        cursor.close()
+
+    inserted = []
+    for month in months:
+        inserted.extend(connection.execute(text(f"""
+            INSERT INTO {partition_name(month)} ({columns})
+            SELECT {columns} FROM {COPY_STAGING_TABLE}
+            WHERE timestamp >= :month_start AND timestamp < :next_month
+            ON CONFLICT (transaction_id, transaction_type, timestamp) DO NOTHING
+            RETURNING transaction_id, transaction_type, timestamp
+        """), {'month_start': month, 'next_month': add_months(month, 1)}).tuples().all())
+    connection.execute(text(f"TRUNCATE {COPY_STAGING_TABLE}"))
+    return inserted
+
+
+def main():
+    from src.models.database_models import get_engine
+
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of transactions")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="List attached partitions")
+    ensure_parser = subparsers.add_parser('ensure', help="Create partitions for the coming months")
+    ensure_parser.add_argument('--months-ahead', type=int, default=DEFAULT_MONTHS_AHEAD)
+    archive_parser = subparsers.add_parser('archive', help="Detach partitions older than a date")
+    archive_parser.add_argument('--older-than', type=date.fromisoformat, required=True)
+    archive_parser.add_argument('--parquet-dir', help="Write to Parquet and drop instead of moving to the archive schema")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with get_engine().begin() as connection:
+        if args.command == 'list':
+            for name in list_partitions(connection):
+                print(name)
+        elif args.command == 'ensure':
+            print(f"Created {len(ensure_future_partitions(connection, args.months_ahead))} partitions")
+        else:
+            print(f"Detached {len(detach_partitions(connection, args.older_than, args.parquet_dir))} partitions")
+
+
+if __name__ == "__main__":
+    main()
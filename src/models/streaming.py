@@ -0,0 +1,74 @@
+"""
+Streaming reads and cheap row counts for large tables.
+
+stream_query() and stream_frames() read through a server-side cursor, so
+only one batch of rows is held in memory at a time. count_rows() answers
+"how many rows" from the planner statistics in pg_class instead of a full
+COUNT(*) scan, unless an exact count is asked for.
+"""
+from typing import Iterator, Union
+import logging
+
+import pandas as pd
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# pg_partition_tree() returns a plain table as its own single leaf
+PARTITION_TREE_ESTIMATE = """
+    SELECT sum(GREATEST(c.reltuples, 0))::bigint
+    FROM pg_partition_tree(to_regclass(:table)) t
+    JOIN pg_class c ON c.oid = t.relid
+    WHERE t.isleaf
+"""
+
+
+def stream_query(session: Session, stmt, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator:
+    """
+    Execute a select and yield its results one by one, fetching batch_size rows at a time.
+
+    ORM entity selects yield the entities, other selects yield Row objects.
+    Unmodified objects are garbage collected once the caller drops them;
+    eager loading of collections cannot be combined with yield_per.
+    """
+    result = session.execute(stmt.execution_options(yield_per=batch_size))
+    descriptions = stmt.column_descriptions
+    # select(Model) yields Model instances rather than one-element rows
+    if len(descriptions) == 1 and descriptions[0]['type'] is descriptions[0].get('entity'):
+        result = result.scalars()
+    yield from result
+
+
+def stream_frames(session: Session, stmt, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+    """
+    Yield the result of a select as DataFrames of at most chunksize rows.
+    """
+    # Options on the statement only: Connection.execution_options() would change the
+    # session's connection in place and turn every later statement into a named cursor
+    stmt = stmt.execution_options(stream_results=True, max_row_buffer=chunksize)
+    yield from pd.read_sql(stmt, session.connection(), chunksize=chunksize)
+
+
+def count_rows(session: Session, table: Union[str, type], exact: bool = False) -> int:
+    """
+    Return the number of rows in a table (table name or ORM model).
+
+    By default this is the planner's estimate from pg_class.reltuples, which is
+    read in constant time and is accurate to within the last ANALYZE/autovacuum.
+    A partitioned table has no rows of its own, so the estimates of its leaf
+    partitions are summed. Tables that have never been analyzed, and
+    exact=True, use COUNT(*).
+    """
+    table_name = table if isinstance(table, str) else table.__tablename__
+    if not exact and session.get_bind().dialect.name == 'postgresql':
+        estimate = session.execute(
+            text(PARTITION_TREE_ESTIMATE),
+            {'table': table_name}
+        ).scalar()
+        # reltuples is -1 (PostgreSQL 14+) or 0 before the first ANALYZE
+        if estimate is not None and estimate > 0:
+            return estimate
+    return session.execute(select(func.count()).select_from(text(table_name))).scalar_one()
@@ -3,15 +3,43 @@ from database.db import Db
 class Transaction:
 
     def __init__(self):
-        self.conn = Db().get_conn()
+        self.db = Db()
 
     def create(self, amount, account):
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
-                cursor.execute("INSERT INTO transactions (amount, account_nr) VALUES (%s, %s)", [amount, account.nr])
-                self.conn.commit()
-                print(f"Transaction '{amount}' created successfully.")
+            with self.db.cursor() as cursor:
+                self.insert(cursor, amount, account.nr)
+            print(f"Transaction '{amount}' created successfully.")
         except:
             print(f"[Warning] Transaction blocked due to constraint violation, date or non approved customer.")
         return amount
+
+    @staticmethod
+    def insert(cursor, amount, account_nr, update_balance=True):
+        """
+        Insert a transaction on the caller's cursor, i.e. in the caller's database transaction.
+        Returns the new transaction id.
+
+        The balance is updated in the same transaction so it never drifts; pass
+        update_balance=False when the caller has already adjusted it.
+        """
+        cursor.execute("INSERT INTO transactions (amount, account_nr) VALUES (%s, %s) RETURNING id", [amount, account_nr])
+        transaction_id = cursor.fetchone()[0]
+        if update_balance:
+            cursor.execute(
+                "INSERT INTO account_balances (account_nr, balance) VALUES (%s, %s) "
+                "ON CONFLICT (account_nr) DO UPDATE "
+                "SET balance = account_balances.balance + EXCLUDED.balance, updated_at = now()",
+                [account_nr, amount])
+        return transaction_id
+
+    @staticmethod
+    def submit(amount, account):
+        """
+        Queue the transaction on the shared group-commit writer.
+
+        Returns a Future that resolves to the transaction id once the batch
+        containing it has been committed.
+        """
+        from models.transaction_writer import get_writer
+        return get_writer().submit(amount, account.nr)
@@ -0,0 +1,135 @@
+import atexit
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+from psycopg2.extras import execute_values
+
+from database.db import Db
+from models.transaction import Transaction
+
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_DELAY_MS = 5
+
+_STOP = object()
+
+
+# Group commit: many callers queue transactions, a background thread writes them
+# with one multi-row INSERT and one commit per batch. Each caller's future is
+# resolved with the new transaction id only after that commit has returned.
+class TransactionWriter:
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_delay_ms=DEFAULT_MAX_DELAY_MS):
+        self.db = Db()
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="transaction-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, amount, account_nr):
+        """
+        Queue a transaction and return a Future for its id.
+
+        Only for unconditional entries such as deposits; withdrawals that must
+        check the balance go through Account.withdraw.
+        """
+        if self._closed:
+            raise RuntimeError("TransactionWriter is closed")
+        future = Future()
+        self._queue.put((amount, account_nr, future))
+        return future
+
+    def write(self, amount, account_nr, timeout=None):
+        """Queue a transaction and wait until it is committed. Returns its id."""
+        return self.submit(amount, account_nr).result(timeout)
+
+    def close(self):
+        """Flush everything queued so far and stop the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # Collect until the batch is full or the oldest entry has waited max_delay
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        pending = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not pending:
+            return
+        try:
+            with self.db.cursor() as cursor:
+                ids = execute_values(
+                    cursor,
+                    "INSERT INTO transactions (amount, account_nr) VALUES %s RETURNING id",
+                    [(amount, account_nr) for amount, account_nr, _ in pending],
+                    page_size=len(pending), fetch=True)
+                deltas = defaultdict(int)
+                for amount, account_nr, _ in pending:
+                    deltas[account_nr] += amount
+                # Sorted so that concurrent writers lock balance rows in the same order
+                execute_values(
+                    cursor,
+                    "INSERT INTO account_balances (account_nr, balance) VALUES %s "
+                    "ON CONFLICT (account_nr) DO UPDATE "
+                    "SET balance = account_balances.balance + EXCLUDED.balance, updated_at = now()",
+                    sorted(deltas.items()), page_size=len(deltas))
+        except Exception as e:
+            if len(pending) == 1:
+                pending[0][2].set_exception(e)
+                return
+            # One bad row fails the whole batch; retry one by one so only its caller gets the error
+            for item in pending:
+                self._retry_single(item)
+            return
+        for (_, _, future), (transaction_id,) in zip(pending, ids):
+            future.set_result(transaction_id)
+
+    def _retry_single(self, item):
+        amount, account_nr, future = item
+        try:
+            with self.db.cursor() as cursor:
+                transaction_id = Transaction.insert(cursor, amount, account_nr)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        future.set_result(transaction_id)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Shared writer, started on first use and flushed at interpreter exit."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = TransactionWriter()
+                atexit.register(_writer.close)
+    return _writer
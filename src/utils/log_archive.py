@@ -0,0 +1,376 @@
+"""
+Rotation, indexing and querying of the daily validation logs.
+
+DataQualityMonitor appends one JSON object per line to
+``validation_log_YYYYMMDD.json``. Once a day is closed the file is rotated
+into a block-compressed archive (every block is an independent gzip member or
+zstd frame) with a sidecar index keyed by validation type, error code and time
+bucket. Queries use the index to decompress only the blocks that can contain
+matches. Old archives can be compacted into Parquet files.
+"""
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+LOG_PATTERN = re.compile(r'^validation_log_(\d{8})\.json$')
+ARCHIVE_PATTERN = re.compile(r'^validation_log_(\d{8})\.jsonl\.(gz|zst)$')
+PARQUET_PATTERN = re.compile(r'^validation_log_(\d{8})\.parquet$')
+
+COMPRESSION_SUFFIXES = {'gzip': 'gz', 'zstd': 'zst'}
+DEFAULT_BLOCK_SIZE = 5000  # log entries per compressed block
+DEFAULT_BUCKET_MINUTES = 60
+
+
+def error_code(message: str) -> str:
+    """
+    Reduce an error message to a stable code by dropping the value-specific parts.
+
+    "Invalid sender account format: SE8902..." -> "Invalid sender account format"
+    "Transaction amount 0.5 SEK is below minimum 1.00 SEK" -> "Transaction amount # SEK is below minimum # SEK"
+    """
+    code = message.split(':', 1)[0]
+    code = re.sub(r'-?\d+(?:[.,]\d+)?', '#', code)
+    return code.strip()
+
+
+def time_bucket(timestamp: str, bucket_minutes: int = DEFAULT_BUCKET_MINUTES) -> str:
+    """
+    Return the bucket label (start of the bucket, minute precision) for an ISO timestamp.
+    """
+    ts = datetime.fromisoformat(timestamp)
+    minutes = (ts.hour * 60 + ts.minute) // bucket_minutes * bucket_minutes
+    start = ts.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+    return start.strftime('%Y-%m-%dT%H:%M')
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == 'gzip':
+        return gzip.compress(data)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _index_path(archive: Path) -> Path:
+    return archive.with_name(archive.name.split('.')[0] + '.index.json')
+
+
+def rotate_log(log_file: Path, compression: str = 'gzip', block_size: int = DEFAULT_BLOCK_SIZE,
+               bucket_minutes: int = DEFAULT_BUCKET_MINUTES) -> Path:
+    """
+    Rotate one daily JSONL log into a block-compressed archive plus sidecar index.
+
+    The original file is removed once both the archive and the index are written.
+    """
+    log_file = Path(log_file)
+    archive = log_file.with_name(f"{log_file.stem}.jsonl.{COMPRESSION_SUFFIXES[compression]}")
+    index = {
+        'source': log_file.name,
+        'compression': compression,
+        'bucket_minutes': bucket_minutes,
+        'blocks': [],
+        'keys': {'validation_type': {}, 'error_code': {}, 'time_bucket': {}}
+    }
+
+    def add_key(kind: str, value: str, block_id: int):
+        blocks = index['keys'][kind].setdefault(value, [])
+        if not blocks or blocks[-1] != block_id:
+            blocks.append(block_id)
+
+    tmp_archive = archive.with_name(archive.name + '.tmp')
+    offset = 0
+    with open(log_file, 'rb') as src, open(tmp_archive, 'wb') as dst:
+        lines: List[bytes] = []
+
+        def flush_block():
+            nonlocal offset
+            block_id = len(index['blocks'])
+            timestamps = []
+            for line in lines:
+                entry = json.loads(line)
+                timestamps.append(entry['timestamp'])
+                add_key('validation_type', entry['validation_type'], block_id)
+                add_key('time_bucket', time_bucket(entry['timestamp'], bucket_minutes), block_id)
+                for error in entry.get('errors', []):
+                    add_key('error_code', error_code(error), block_id)
+            payload = _compress(b''.join(lines), compression)
+            dst.write(payload)
+            index['blocks'].append({
+                'offset': offset,
+                'length': len(payload),
+                'entries': len(lines),
+                'min_timestamp': min(timestamps),
+                'max_timestamp': max(timestamps)
+            })
+            offset += len(payload)
+            lines.clear()
+
+        for line in src:
+            if not line.strip():
+                continue
+            lines.append(line if line.endswith(b'\n') else line + b'\n')
+            if len(lines) >= block_size:
+                flush_block()
+        if lines:
+            flush_block()
+
+    tmp_index = _index_path(archive).with_suffix('.tmp')
+    with open(tmp_index, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_archive, archive)
+    os.replace(tmp_index, _index_path(archive))
+    log_file.unlink()
+
+    logger.info(f"Rotated {log_file.name} into {archive.name} ({len(index['blocks'])} blocks)")
+    return archive
+
+
+def rotate_logs(log_dir: str = "logs/data_quality", compression: str = 'gzip',
+                block_size: int = DEFAULT_BLOCK_SIZE) -> List[Path]:
+    """
+    Rotate every closed daily log in log_dir. Today's log is still being appended to and is left alone.
+    """
+    log_dir = Path(log_dir)
+    if not log_dir.exists():
+        return []
+
+    today = f"{datetime.now():%Y%m%d}"
+    rotated = []
+    for path in sorted(log_dir.iterdir()):
+        match = LOG_PATTERN.match(path.name)
+        if match and match.group(1) < today:
+            rotated.append(rotate_log(path, compression=compression, block_size=block_size))
+    return rotated
+
+
+def _matches(entry: Dict, validation_type: Optional[str], error: Optional[str],
+             start: Optional[datetime], end: Optional[datetime], passed: Optional[bool]) -> bool:
+    if validation_type is not None and entry['validation_type'] != validation_type:
+        return False
+    if passed is not None and entry['passed'] != passed:
+        return False
+    if error is not None and error not in (error_code(e) for e in entry.get('errors', [])):
+        return False
+    if start is not None or end is not None:
+        ts = datetime.fromisoformat(entry['timestamp'])
+        if start is not None and ts < start:
+            return False
+        if end is not None and ts >= end:
+            return False
+    return True
+
+
+def _candidate_blocks(index: Dict, validation_type: Optional[str], error: Optional[str],
+                      start: Optional[datetime], end: Optional[datetime]) -> List[int]:
+    """Intersect the block lists of every key that is constrained by the query."""
+    candidates = set(range(len(index['blocks'])))
+    if validation_type is not None:
+        candidates &= set(index['keys']['validation_type'].get(validation_type, []))
+    if error is not None:
+        candidates &= set(index['keys']['error_code'].get(error, []))
+    if start is not None or end is not None:
+        # Only blocks with entries in a bucket overlapping [start, end) are read,
+        # so a block spanning a gap in the logs is skipped as well
+        width = timedelta(minutes=index['bucket_minutes'])
+        in_range = set()
+        for bucket, blocks in index['keys']['time_bucket'].items():
+            bucket_start = datetime.fromisoformat(bucket)
+            if start is not None and bucket_start + width <= start:
+                continue
+            if end is not None and bucket_start >= end:
+                continue
+            in_range.update(blocks)
+        candidates &= in_range
+    return sorted(candidates)
+
+
+def _day_in_range(day: str, start: Optional[datetime], end: Optional[datetime]) -> bool:
+    day_start = datetime.strptime(day, '%Y%m%d')
+    if start is not None and day_start + timedelta(days=1) <= start:
+        return False
+    if end is not None and day_start >= end:
+        return False
+    return True
+
+
+def query_logs(log_dir: str = "logs/data_quality", validation_type: Optional[str] = None,
+               error: Optional[str] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, passed: Optional[bool] = None) -> Iterator[Dict]:
+    """
+    Stream log entries matching all given filters, oldest day first.
+
+    ``error`` is compared against error_code() of each message. Parquet archives,
+    compressed archives and live daily logs are all searched; days outside
+    [start, end) are skipped without being opened.
+    """
+    log_dir = Path(log_dir)
+    if not log_dir.exists():
+        return
+
+    days = {}
+    for path in log_dir.iterdir():
+        for kind, pattern in (('parquet', PARQUET_PATTERN), ('archive', ARCHIVE_PATTERN), ('live', LOG_PATTERN)):
+            match = pattern.match(path.name)
+            if match:
+                days.setdefault(match.group(1), []).append((kind, path))
+    parquet_dir = log_dir / 'parquet'
+    if parquet_dir.exists():
+        for path in parquet_dir.iterdir():
+            match = PARQUET_PATTERN.match(path.name)
+            if match:
+                days.setdefault(match.group(1), []).append(('parquet', path))
+
+    for day in sorted(days):
+        if not _day_in_range(day, start, end):
+            continue
+        for kind, path in sorted(days[day]):
+            if kind == 'archive':
+                yield from _query_archive(path, validation_type, error, start, end, passed)
+            elif kind == 'parquet':
+                yield from _query_parquet(path, validation_type, error, start, end, passed)
+            else:
+                with open(path) as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            if _matches(entry, validation_type, error, start, end, passed):
+                                yield entry
+
+
+def _query_archive(archive: Path, validation_type, error, start, end, passed) -> Iterator[Dict]:
+    with open(_index_path(archive)) as f:
+        index = json.load(f)
+
+    blocks = _candidate_blocks(index, validation_type, error, start, end)
+    if not blocks:
+        return
+    with open(archive, 'rb') as f:
+        for block_id in blocks:
+            block = index['blocks'][block_id]
+            f.seek(block['offset'])
+            data = _decompress(f.read(block['length']), index['compression'])
+            for line in data.splitlines():
+                entry = json.loads(line)
+                if _matches(entry, validation_type, error, start, end, passed):
+                    yield entry
+
+
+def _query_parquet(path: Path, validation_type, error, start, end, passed) -> Iterator[Dict]:
+    import pandas as pd
+
+    filters = []
+    if validation_type is not None:
+        filters.append(('validation_type', '==', validation_type))
+    if passed is not None:
+        filters.append(('passed', '==', passed))
+    df = pd.read_parquet(path, filters=filters or None)
+    for record in df.to_dict('records'):
+        entry = {
+            'timestamp': record['timestamp'],
+            'validation_type': record['validation_type'],
+            'passed': bool(record['passed']),
+            'errors': list(record['errors'])
+        }
+        if _matches(entry, validation_type, error, start, end, passed):
+            yield entry
+
+
+def compact_to_parquet(log_dir: str = "logs/data_quality", older_than_days: int = 30,
+                       archive_dir: Optional[str] = None) -> List[Path]:
+    """
+    Convert compressed archives older than older_than_days into Parquet files.
+
+    The archive and its index are removed once the Parquet file is written.
+    """
+    import pandas as pd
+
+    log_dir = Path(log_dir)
+    archive_dir = Path(archive_dir) if archive_dir else log_dir / 'parquet'
+    cutoff = f"{datetime.now() - timedelta(days=older_than_days):%Y%m%d}"
+
+    compacted = []
+    for path in sorted(log_dir.iterdir()):
+        match = ARCHIVE_PATTERN.match(path.name)
+        if not match or match.group(1) >= cutoff:
+            continue
+
+        entries = list(_query_archive(path, None, None, None, None, None))
+        df = pd.DataFrame(entries, columns=['timestamp', 'validation_type', 'passed', 'errors'])
+        df['validation_type'] = df['validation_type'].astype('category')
+        df['error_codes'] = df['errors'].apply(lambda errors: [error_code(e) for e in errors])
+
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        target = archive_dir / f"validation_log_{match.group(1)}.parquet"
+        tmp_target = target.with_name(target.name + '.tmp')
+        df.to_parquet(tmp_target, index=False)
+        os.replace(tmp_target, target)
+        _index_path(path).unlink()
+        path.unlink()
+
+        logger.info(f"Compacted {path.name} into {target} ({len(df)} entries)")
+        compacted.append(target)
+    return compacted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotate, query and compact validation logs")
+    parser.add_argument('--log-dir', default="logs/data_quality")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rotate_parser = subparsers.add_parser('rotate', help="Compress and index closed daily logs")
+    rotate_parser.add_argument('--compression', choices=sorted(COMPRESSION_SUFFIXES), default='gzip')
+    rotate_parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE)
+
+    query_parser = subparsers.add_parser('query', help="Print matching log entries as JSON lines")
+    query_parser.add_argument('--type', dest='validation_type')
+    query_parser.add_argument('--error', help="Error code, see error_code()")
+    query_parser.add_argument('--start', type=datetime.fromisoformat)
+    query_parser.add_argument('--end', type=datetime.fromisoformat)
+    query_parser.add_argument('--failed', action='store_true', help="Only failed validations")
+
+    compact_parser = subparsers.add_parser('compact', help="Convert old archives to Parquet")
+    compact_parser.add_argument('--older-than-days', type=int, default=30)
+    compact_parser.add_argument('--archive-dir')
+
+    args = parser.parse_args()
+    if args.command == 'rotate':
+        for archive in rotate_logs(args.log_dir, args.compression, args.block_size):
+            print(archive)
+    elif args.command == 'query':
+        entries = query_logs(args.log_dir, args.validation_type, args.error, args.start, args.end,
+                             False if args.failed else None)
+        for entry in entries:
+            print(json.dumps(entry))
+    else:
+        for target in compact_to_parquet(args.log_dir, args.older_than_days, args.archive_dir):
+            print(target)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -5,19 +5,20 @@ from typing import Dict, List, Optional
 from datetime import datetime
 import logging
 import json
+import threading
 from pathlib import Path
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.utils.log_archive import rotate_logs, query_logs
+
 logger = logging.getLogger(__name__)
 
 class DataQualityMonitor:
+    # Connection checkouts that wait longer than this are counted as slow
+    SLOW_CHECKOUT_SECONDS = 0.1
+    
     def __init__(self, log_dir: str = "logs/data_quality"):
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._log_dir_ready = False  # created on first write, not at import
         self.metrics = {
             'validation_counts': {
                 'total': 0,
@@ -27,6 +28,100 @@ class DataQualityMonitor:
             'error_types': {},
             'processing_times': []
         }
+        self._pool_lock = threading.Lock()  # pool events arrive from many threads
+        self.pool_metrics = self._empty_pool_metrics()
+    
+    @staticmethod
+    def _empty_pool_metrics() -> Dict:
+        return {
+            'checkouts': 0,
+            'checkout_wait_total': 0.0,
+            'checkout_wait_max': 0.0,
+            'slow_checkouts': 0,       # waits longer than SLOW_CHECKOUT_SECONDS
+            'checkout_timeouts': 0,
+            'checked_out': 0,          # gauge: connections currently in use
+            'checked_out_max': 0,
+            'overflow': 0,             # gauge: connections beyond pool_size
+            'overflow_max': 0,
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'lifetime_total': 0.0,
+            'lifetime_max': 0.0
+        }
+    
+    def record_pool_checkout(self, wait_seconds: float, checked_out: int, overflow: int):
+        """
+        Record how long a connection checkout waited and the pool gauges after it.
+        """
+        with self._pool_lock:
+            pool = self.pool_metrics
+            pool['checkouts'] += 1
+            pool['checkout_wait_total'] += wait_seconds
+            pool['checkout_wait_max'] = max(pool['checkout_wait_max'], wait_seconds)
+            if wait_seconds > self.SLOW_CHECKOUT_SECONDS:
+                pool['slow_checkouts'] += 1
+            self._update_pool_gauges(checked_out, overflow)
+    
+    def record_pool_timeout(self, wait_seconds: float):
+        """
+        Record a checkout that gave up after pool_timeout.
+        """
+        with self._pool_lock:
+            self.pool_metrics['checkout_timeouts'] += 1
+            self.pool_metrics['checkout_wait_max'] = max(self.pool_metrics['checkout_wait_max'], wait_seconds)
+        logger.warning(f"Connection pool checkout timed out after {wait_seconds:.1f}s")
+    
+    def record_pool_checkin(self, checked_out: int, overflow: int):
+        """
+        Record the pool gauges after a connection was returned.
+        """
+        with self._pool_lock:
+            self._update_pool_gauges(checked_out, overflow)
+    
+    def record_connection_opened(self):
+        with self._pool_lock:
+            self.pool_metrics['connections_opened'] += 1
+    
+    def record_connection_closed(self, lifetime_seconds: float):
+        """
+        Record that a pooled DBAPI connection was closed after lifetime_seconds.
+        """
+        with self._pool_lock:
+            pool = self.pool_metrics
+            pool['connections_closed'] += 1
+            pool['lifetime_total'] += lifetime_seconds
+            pool['lifetime_max'] = max(pool['lifetime_max'], lifetime_seconds)
+    
+    def _update_pool_gauges(self, checked_out: int, overflow: int):
+        pool = self.pool_metrics
+        pool['checked_out'] = checked_out
+        pool['checked_out_max'] = max(pool['checked_out_max'], checked_out)
+        pool['overflow'] = max(overflow, 0)  # negative while the pool is not yet full
+        pool['overflow_max'] = max(pool['overflow_max'], pool['overflow'])
+    
+    def get_pool_report(self) -> Dict:
+        """
+        Generate a report of connection pool metrics.
+        """
+        with self._pool_lock:
+            pool = dict(self.pool_metrics)
+        checkouts = pool['checkouts']
+        closed = pool['connections_closed']
+        return {
+            'checkouts': checkouts,
+            'checkout_wait_avg_ms': (pool['checkout_wait_total'] / checkouts * 1000) if checkouts else 0,
+            'checkout_wait_max_ms': pool['checkout_wait_max'] * 1000,
+            'slow_checkouts': pool['slow_checkouts'],
+            'checkout_timeouts': pool['checkout_timeouts'],
+            'checked_out': pool['checked_out'],
+            'checked_out_max': pool['checked_out_max'],
+            'overflow': pool['overflow'],
+            'overflow_max': pool['overflow_max'],
+            'connections_opened': pool['connections_opened'],
+            'connections_closed': closed,
+            'connection_lifetime_avg_s': (pool['lifetime_total'] / closed) if closed else 0,
+            'connection_lifetime_max_s': pool['lifetime_max']
+        }
     
     def log_validation_result(self, validation_type: str, passed: bool, errors: Optional[List[str]] = None):
         """
@@ -54,6 +149,9 @@ class DataQualityMonitor:
             'errors': errors or []
         }
         
+        if not self._log_dir_ready:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._log_dir_ready = True
         log_file = self.log_dir / f"validation_log_{datetime.now():%Y%m%d}.json"
         with open(log_file, 'a') as f:
             json.dump(log_entry, f)
@@ -82,9 +180,22 @@ class DataQualityMonitor:
                 self.metrics['error_types'].items(),
                 key=lambda x: x[1],
                 reverse=True
-            )[:5])
+            )[:5]),
+            'connection_pool': self.get_pool_report()
         }
     
+    def rotate_logs(self, compression: str = 'gzip') -> List[Path]:
+        """
+        Compress and index all closed daily logs, see src.utils.log_archive.
+        """
+        return rotate_logs(str(self.log_dir), compression=compression)
+    
+    def query_logs(self, **filters):
+        """
+        Stream logged validation results matching the given filters, see src.utils.log_archive.query_logs.
+        """
+        return query_logs(str(self.log_dir), **filters)
+    
     def reset_metrics(self):
         """
         Reset all metrics to initial state.
@@ -98,6 +209,8 @@ class DataQualityMonitor:
             'error_types': {},
             'processing_times': []
         }
+        with self._pool_lock:
+            self.pool_metrics = self._empty_pool_metrics()
 
 # Create global monitor instance
 monitor = DataQualityMonitor() 
\ No newline at end of file
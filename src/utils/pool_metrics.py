@@ -0,0 +1,74 @@
+"""
+Connection pool instrumentation.
+
+Feeds checkout latency, the in-use/overflow gauges and connection lifetimes of
+a SQLAlchemy QueuePool (or the asyncio variant used by the async engine) into
+the data quality monitor.
+"""
+import time
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from src.utils.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+
+class _TimedCheckout:
+    """
+    Measures how long each checkout waits for a free connection.
+
+    The pool events only fire after a connection has been handed out, so the
+    wait itself is timed around QueuePool._do_get.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection_record = super()._do_get()
+        except PoolTimeoutError:
+            monitor.record_pool_timeout(time.perf_counter() - start)
+            raise
+        connection_record.info['checkout_wait'] = time.perf_counter() - start
+        return connection_record
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool with checkout wait timing, for the synchronous engine."""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait timing, for the async engine."""
+
+
+def instrument_pool(engine) -> None:
+    """
+    Attach the pool event listeners that report to the monitor.
+
+    Works for both Engine and AsyncEngine, whose pool is the same kind of object.
+    """
+    pool = engine.pool
+
+    @event.listens_for(pool, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info['connected_at'] = time.monotonic()
+        monitor.record_connection_opened()
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        wait = connection_record.info.pop('checkout_wait', 0.0)
+        monitor.record_pool_checkout(wait, pool.checkedout(), pool.overflow())
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        # Fires just before the connection goes back into the queue
+        monitor.record_pool_checkin(max(pool.checkedout() - 1, 0), pool.overflow())
+
+    @event.listens_for(pool, 'close')
+    def on_close(dbapi_connection, connection_record):
+        connected_at = connection_record.info.pop('connected_at', None)
+        if connected_at is not None:
+            monitor.record_connection_closed(time.monotonic() - connected_at)
@@ -0,0 +1,175 @@
+"""
+Statement-level SQL profiling through SQLAlchemy cursor events.
+
+Every statement is reduced to a fingerprint (literals and bind parameters
+replaced by ?, IN lists and multi-row VALUES collapsed) and time and call
+count are aggregated per fingerprint. Statements slower than the threshold
+are logged together with their EXPLAIN plan.
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional
+import logging
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 500
+MAX_SLOW_QUERIES = 50  # Slow statements kept for the report
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_BIND_PARAMETER = re.compile(r'%\([^)]+\)s|%s|(?<!:):\w+|\$\d+')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a SQL statement so that executions differing only in values share one key.
+    """
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _BIND_PARAMETER.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    normalized = _VALUES_ROWS.sub(r'VALUES \1, ...', normalized)
+    return normalized
+
+
+class QueryProfiler:
+    def __init__(self, slow_threshold_ms: Optional[float] = None, explain_slow: bool = True):
+        if slow_threshold_ms is None:
+            slow_threshold_ms = float(os.getenv('SQL_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS))
+        self.slow_threshold_ms = slow_threshold_ms
+        self.explain_slow = explain_slow
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict] = {}
+        self.slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+
+    def attach(self, engine) -> None:
+        """
+        Start profiling all statements executed through engine.
+        """
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def detach(self, engine) -> None:
+        event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('query_start_times')
+        if not start_times:
+            return
+        elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+        key = fingerprint(statement)
+
+        with self._lock:
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            stat['calls'] += 1
+            stat['total_ms'] += elapsed_ms
+            stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+            if cursor.rowcount and cursor.rowcount > 0:
+                stat['rows'] += cursor.rowcount
+
+        if elapsed_ms >= self.slow_threshold_ms:
+            plan = None
+            if self.explain_slow and not executemany and conn.dialect.name == 'postgresql':
+                plan = self._explain(cursor, statement, parameters)
+            self.slow_queries.append({
+                'fingerprint': key,
+                'duration_ms': round(elapsed_ms, 2),
+                'statement': statement,
+                'plan': plan
+            })
+            logger.warning(f"Slow query ({elapsed_ms:.0f} ms): {key}" + (f"\n{plan}" if plan else ''))
+
+    @staticmethod
+    def _explain(cursor, statement: str, parameters) -> Optional[str]:
+        """
+        Fetch the plan of an already executed statement on the same DBAPI connection.
+
+        Runs inside a savepoint so that a failing EXPLAIN (e.g. for DDL) does not
+        abort the caller's transaction. The EXPLAIN is not seen by the events.
+        """
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')):
+            return None
+        dbapi_connection = cursor.connection
+        explain_cursor = dbapi_connection.cursor()
+        try:
+            explain_cursor.execute("SAVEPOINT query_profiler_explain")
+            try:
+                explain_cursor.execute("EXPLAIN " + statement, parameters)
+                plan = '\n'.join(row[0] for row in explain_cursor.fetchall())
+                explain_cursor.execute("RELEASE SAVEPOINT query_profiler_explain")
+                return plan
+            except Exception as e:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT query_profiler_explain")
+                logger.debug(f"Could not explain slow query: {str(e)}")
+                return None
+        except Exception as e:
+            logger.debug(f"Could not explain slow query: {str(e)}")
+            return None
+        finally:
+            explain_cursor.close()
+
+    def top_statements(self, n: int = 10) -> List[Dict]:
+        """
+        Return the n fingerprints with the highest total time.
+        """
+        with self._lock:
+            items = [(key, dict(stat)) for key, stat in self.stats.items()]
+        items.sort(key=lambda item: item[1]['total_ms'], reverse=True)
+        return [
+            {
+                'fingerprint': key,
+                'calls': stat['calls'],
+                'total_ms': round(stat['total_ms'], 2),
+                'avg_ms': round(stat['total_ms'] / stat['calls'], 3),
+                'max_ms': round(stat['max_ms'], 2),
+                'rows': stat['rows']
+            }
+            for key, stat in items[:n]
+        ]
+
+    def get_report(self, top_n: int = 10) -> Dict:
+        """
+        Generate a report of the top statements and the recorded slow queries.
+        """
+        with self._lock:
+            total_calls = sum(stat['calls'] for stat in self.stats.values())
+            total_ms = sum(stat['total_ms'] for stat in self.stats.values())
+        return {
+            'statements_executed': total_calls,
+            'distinct_statements': len(self.stats),
+            'total_sql_time_ms': round(total_ms, 2),
+            'slow_threshold_ms': self.slow_threshold_ms,
+            'top_statements': self.top_statements(top_n),
+            'slow_queries': [
+                {key: q[key] for key in ('fingerprint', 'duration_ms', 'plan')} for q in self.slow_queries
+            ]
+        }
+
+    def reset(self):
+        """
+        Reset all collected statistics.
+        """
+        with self._lock:
+            self.stats = {}
+            self.slow_queries.clear()
+
+# Create global profiler instance
+profiler = QueryProfiler()
@@ -0,0 +1,73 @@
+"""
+Simple test to rotate, query and compact validation logs in a temporary directory.
+"""
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from src.utils.log_archive import (rotate_logs, query_logs, compact_to_parquet, error_code,
+                                   _candidate_blocks, _index_path)
+
+
+def _write_log(log_dir: Path, day: str, entries):
+    with open(log_dir / f"validation_log_{day}.json", 'w') as f:
+        for entry in entries:
+            json.dump(entry, f)
+            f.write('\n')
+
+
+def test_log_archive():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        entries = []
+        for i in range(50):
+            failed = i % 10 == 0
+            entries.append({
+                'timestamp': f"2025-06-01T{i % 24:02d}:15:00",
+                'validation_type': 'customer' if i % 2 else 'transaction',
+                'passed': not failed,
+                'errors': ["Invalid sender account format: SE8902XXXX"] if failed else []
+            })
+        _write_log(log_dir, '20250601', entries)
+
+        archives = rotate_logs(str(log_dir), block_size=8)
+        assert [a.name for a in archives] == ['validation_log_20250601.jsonl.gz']
+        assert not (log_dir / 'validation_log_20250601.json').exists()
+
+        code = error_code("Invalid sender account format: SE8902XXXX")
+        failed = list(query_logs(str(log_dir), validation_type='transaction', error=code))
+        assert len(failed) == 5
+        assert all(not e['passed'] for e in failed)
+
+        window = list(query_logs(str(log_dir), start=datetime(2025, 6, 1, 10), end=datetime(2025, 6, 1, 12)))
+        assert len(window) == 4
+
+        compacted = compact_to_parquet(str(log_dir), older_than_days=0)
+        assert len(compacted) == 1
+        assert len(list(query_logs(str(log_dir), validation_type='transaction', error=code))) == 5
+        print("Log archive test passed")
+
+
+def test_time_buckets_prune_blocks():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        hours = [8, 14, 10, 11]
+        _write_log(log_dir, '20250601', [
+            {'timestamp': f"2025-06-01T{hour:02d}:30:00", 'validation_type': 'transaction',
+             'passed': True, 'errors': []}
+            for hour in hours
+        ])
+        archive, = rotate_logs(str(log_dir), block_size=2)
+        with open(_index_path(archive)) as f:
+            index = json.load(f)
+
+        # The first block spans 08:30-14:30 but has nothing between 10 and 12
+        start, end = datetime(2025, 6, 1, 10), datetime(2025, 6, 1, 12)
+        assert _candidate_blocks(index, None, None, start, end) == [1]
+        assert len(list(query_logs(str(log_dir), start=start, end=end))) == 2
+
+
+if __name__ == "__main__":
+    test_log_archive()
+    test_time_buckets_prune_blocks()
@@ -0,0 +1,38 @@
+"""
+Simple test of SQL fingerprinting and per-statement aggregation.
+"""
+from sqlalchemy import create_engine, text
+
+from src.utils.query_profiler import QueryProfiler, fingerprint
+
+
+def test_fingerprint():
+    assert fingerprint("SELECT * FROM customers WHERE personnummer = '400118-5901'") == \
+        fingerprint("SELECT *  FROM customers\nWHERE personnummer = '391117-9285'")
+    assert fingerprint("SELECT * FROM accounts WHERE id IN (%(id_1)s, %(id_2)s, %(id_3)s)") == \
+        "SELECT * FROM accounts WHERE id IN (...)"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)") == \
+        "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    assert fingerprint("SELECT amount::numeric FROM transactions LIMIT 5") == \
+        "SELECT amount::numeric FROM transactions LIMIT ?"
+
+
+def test_profiler_aggregates_by_fingerprint():
+    engine = create_engine("sqlite://")
+    profiler = QueryProfiler(slow_threshold_ms=10000)
+    profiler.attach(engine)
+    with engine.connect() as connection:
+        for value in range(5):
+            connection.execute(text("SELECT :value + 1"), {'value': value})
+        connection.execute(text("SELECT 42"))
+
+    top = profiler.top_statements(5)
+    calls = {entry['fingerprint']: entry['calls'] for entry in top}
+    assert calls['SELECT ? + ?'] == 5
+    assert calls['SELECT ?'] == 1
+    print("Query profiler test passed")
+
+
+if __name__ == "__main__":
+    test_fingerprint()
+    test_profiler_aggregates_by_fingerprint()
@@ -1,5 +1,5 @@
 import pandas as pd
-from src.data_processing.workflow import prepare_account_data
+from src.data_processing.data_preparation import prepare_account_data
 
 # Läs in CSV-filen
 df = pd.read_csv('data/working/sebank_customers_with_accounts.csv')
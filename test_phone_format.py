@@ -1,4 +1,4 @@
-from src.data_processing.workflow import format_phone_number
+from src.data_processing.data_preparation import format_phone_number
 import pandas as pd
 
 # Test cases